@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import zlib
+from datetime import datetime
+from time import perf_counter_ns
+from typing import Callable, List, Optional
+
+from utils import metrics
+
+TASK_SECONDS = metrics.Histogram("punch_background_task_seconds", "Time spent in background tasks.", ["task"])
+INGEST_TASK = TASK_SECONDS.labels("ingest")
+
+
+def shard_for(badge_id: str, shards: int) -> int:
+    return zlib.crc32(badge_id.encode()) % shards
+
+
+class PunchIngestQueue:
+    """Bounded punch queue drained by a fixed pool of asyncio workers.
+
+    Each worker owns one shard queue and punches are routed to a shard by
+    badge, so punches from the same badge (and therefore the same employee)
+    are handled one at a time in arrival order while different employees
+    proceed in parallel. ``handler`` runs in a worker thread so blocking
+    store calls do not stall the event loop.
+    """
+
+    def __init__(self, handler: Callable[[str, datetime], object], workers: int = 4, max_size: int = 10000):
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def shard_depths(self) -> List[int]:
+        return [q.qsize() for q in self._queues]
+
+    async def start(self) -> None:
+        per_shard = max(1, self.max_size // self.workers)
+        self._queues = [asyncio.Queue(maxsize=per_shard) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+
+    def submit(self, badge_id: str, timestamp: datetime) -> bool:
+        """Queue a punch; returns False when its shard is full."""
+        try:
+            self._queues[shard_for(badge_id, self.workers)].put_nowait((badge_id, timestamp))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def join(self) -> None:
+        """Wait until every punch submitted so far has been handled."""
+        await asyncio.gather(*(q.join() for q in self._queues))
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Drain every queued punch, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Punch ingest queue stopped with {self.depth} punches still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            badge_id, timestamp = await queue.get()
+            timed = metrics.enabled
+            if timed:
+                started = perf_counter_ns()
+            try:
+                await asyncio.to_thread(self.handler, badge_id, timestamp)
+            except Exception:
+                logging.exception(f"Failed to process punch for badge ID: {badge_id}")
+            finally:
+                queue.task_done()
+                if timed:
+                    INGEST_TASK.observe_ns(perf_counter_ns() - started)
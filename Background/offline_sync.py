@@ -0,0 +1,93 @@
+import heapq
+import threading
+import time as clock
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class ReorderBuffer:
+    """Per-badge buffer that releases offline-synced punches in timestamp order.
+
+    Each badge has a watermark ``lateness`` behind the newest timestamp seen
+    for it; punches at or below the watermark are released oldest first.
+    A punch that arrives below a watermark already passed is released at
+    once, to be handled as a late punch. ``flush`` releases a badge's
+    remaining punches, e.g. when its terminal finishes uploading, and
+    ``flush_idle`` those of badges that received nothing for ``idle_seconds``;
+    either way the badge's watermark is dropped with them.
+    Released punches that could not be processed are handed back with
+    ``restore``, so a failure never drops them.
+    Badges stand for employees here: every badge belongs to one employee.
+    """
+
+    def __init__(self, lateness: timedelta = timedelta(hours=1), idle_seconds: float = 300.0):
+        self.lateness = lateness
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[datetime]] = {}
+        self._newest: Dict[str, datetime] = {}
+        self._last_arrival: Dict[str, float] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, punches: Iterable[Tuple[str, datetime]]) -> List[Tuple[str, datetime]]:
+        """Buffer ``punches``; returns every punch released by the new watermarks."""
+        now = clock.monotonic()
+        released = []
+        with self._lock:
+            touched = set()
+            for badge_id, timestamp in punches:
+                newest = self._newest.get(badge_id)
+                if newest is not None and timestamp <= newest - self.lateness:
+                    released.append((badge_id, timestamp))
+                    continue
+                heapq.heappush(self._pending.setdefault(badge_id, []), timestamp)
+                self._size += 1
+                if newest is None or timestamp > newest:
+                    self._newest[badge_id] = timestamp
+                self._last_arrival[badge_id] = now
+                touched.add(badge_id)
+            for badge_id in touched:
+                released.extend(self._release(badge_id, self._newest[badge_id] - self.lateness))
+        return released
+
+    def _release(self, badge_id: str, up_to: Optional[datetime]) -> List[Tuple[str, datetime]]:
+        heap = self._pending.get(badge_id)
+        released = []
+        while heap and (up_to is None or heap[0] <= up_to):
+            released.append((badge_id, heapq.heappop(heap)))
+        self._size -= len(released)
+        if not heap:
+            self._pending.pop(badge_id, None)
+            self._last_arrival.pop(badge_id, None)
+        if up_to is None:
+            # Drained for good: forget the watermark until the badge sends again.
+            self._newest.pop(badge_id, None)
+        return released
+
+    def restore(self, punches: Iterable[Tuple[str, datetime]]) -> None:
+        """Put released punches back, e.g. when processing them failed.
+
+        They are held again without moving any watermark, and go out with
+        the badge's next release, or once it has been idle again.
+        """
+        now = clock.monotonic()
+        with self._lock:
+            for badge_id, timestamp in punches:
+                heapq.heappush(self._pending.setdefault(badge_id, []), timestamp)
+                self._size += 1
+                self._last_arrival[badge_id] = now
+
+    def flush(self, badge_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, datetime]]:
+        """Release every buffered punch of ``badge_ids`` (all badges by default)."""
+        with self._lock:
+            badge_ids = list(self._pending) if badge_ids is None else set(badge_ids)
+            return [punch for badge_id in badge_ids for punch in self._release(badge_id, None)]
+
+    def flush_idle(self) -> List[Tuple[str, datetime]]:
+        cutoff = clock.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [badge_id for badge_id, arrived in self._last_arrival.items() if arrived <= cutoff]
+            return [punch for badge_id in idle for punch in self._release(badge_id, None)]
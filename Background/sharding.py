@@ -0,0 +1,209 @@
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def shard_for_employee(employee_id: int, shards: int) -> int:
+    return hash(employee_id) % shards
+
+
+# Worker side: each shard process holds its own storage, punch index and
+# open-shift tracker, so the hot path never leaves the process.
+
+def _init_shard(employees: List[dict], overtime_approvals: List[dict], log_level: int, log_disabled: int) -> None:
+    from utils import helper
+    from utils.overtime_approvals import OvertimeApprovalIndex
+    from utils.punch_index import PunchIndex
+    from utils.storage import MemoryStorage
+
+    logging.getLogger().setLevel(log_level)
+    logging.disable(log_disabled)
+    helper.set_storage(MemoryStorage(employees, PunchIndex(), OvertimeApprovalIndex(overtime_approvals)))
+
+def _process_punch(badge_id: str, timestamp: datetime) -> Optional[Dict]:
+    from main import process_punch
+    return process_punch(badge_id, timestamp)
+
+def _process_punches(punches: List[Tuple[str, datetime]]) -> List[Dict]:
+    from main import process_punches
+    return process_punches(punches)
+
+def _process_synced_punches(punches: List[Tuple[str, datetime]]) -> List[Optional[Dict]]:
+    from main import process_synced_punches
+    return process_synced_punches(punches)
+
+def _punch_recorded(badge_id: str, timestamp: datetime) -> bool:
+    from main import punch_recorded
+    return punch_recorded(badge_id, timestamp)
+
+def _sweep_missing_punch_outs(punch_date: date, timestamp: Optional[datetime]) -> List[Dict]:
+    from main import sweep_missing_punch_outs
+    return sweep_missing_punch_outs(punch_date, timestamp)
+
+def _calculate_work_hours_bulk(employee_ids: List[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], Dict]:
+    from main import calculate_work_hours_bulk
+    return calculate_work_hours_bulk(employee_ids, start_date, end_date)
+
+def _rollup_totals(start_date: date, end_date: date) -> Dict[int, object]:
+    from utils.helper import punch_rollups
+    return punch_rollups.totals(start_date, end_date)
+
+def _rollup_type_counts(punch_type: str, start_date: date, end_date: date) -> Dict[int, int]:
+    from utils.helper import punch_rollups
+    return punch_rollups.type_counts(punch_type, start_date, end_date)
+
+def _add_overtime_approvals(approvals: List[dict]) -> None:
+    from utils.helper import add_overtime_approvals
+    add_overtime_approvals(approvals)
+
+def _revoke_overtime_approval(employee_id: int, approval_date: date) -> bool:
+    from utils.helper import revoke_overtime_approval
+    return revoke_overtime_approval(employee_id, approval_date)
+
+def _metrics_snapshot():
+    # Importing main registers the pipeline's metrics in this shard.
+    import main
+    from utils import metrics
+    return metrics.snapshot()
+
+
+class ShardedPunchRouter:
+    """Runs the punch pipeline across a pool of shard processes.
+
+    Employees are partitioned by ``shard_for_employee`` and every shard
+    process is started with only its own employees and overtime approvals
+    on a fresh in-memory store, so a shard's punch index and open shifts
+    never hold another shard's data. The router maps badges to shards to find
+    each punch's shard; badges it does not know are sent to a shard by
+    badge hash, where they are rejected as usual.
+
+    Each shard is a single-worker process pool, so a shard handles its calls
+    one at a time in submission order. Batches are split by shard and run
+    on all shards at once; this is where the extra cores pay off, since a
+    single punch costs more in inter-process round trip than to process.
+    Overtime approval writes are forwarded to the owning shard once the
+    router is registered with ``utils.helper.add_approval_mirror``, and
+    ``metrics_snapshots`` collects the shards' counters and histograms.
+    Employee changes are not propagated to running shards.
+    """
+
+    def __init__(self, employees: Sequence[dict], overtime_approvals: Iterable[dict] = (), shards: Optional[int] = None,
+                 mp_context=None):
+        self.shards = shards or os.cpu_count() or 1
+        self._badge_shards: Dict[str, int] = {}
+        shard_employees: List[List[dict]] = [[] for _ in range(self.shards)]
+        for employee in employees:
+            shard = shard_for_employee(employee["id"], self.shards)
+            shard_employees[shard].append(employee)
+            self._badge_shards.setdefault(employee["badge_id"], shard)
+        shard_approvals: List[List[dict]] = [[] for _ in range(self.shards)]
+        for approval in overtime_approvals:
+            shard_approvals[shard_for_employee(approval["employee_id"], self.shards)].append(dict(approval))
+
+        # Spawned rather than forked: a forked shard would inherit the parent's
+        # punch store and any lock held by another thread at fork time.
+        mp_context = mp_context or multiprocessing.get_context("spawn")
+        logging_state = (logging.getLogger().level, logging.root.manager.disable)
+        self._pools = [
+            ProcessPoolExecutor(max_workers=1, mp_context=mp_context, initializer=_init_shard,
+                                initargs=(shard_employees[shard], shard_approvals[shard], *logging_state))
+            for shard in range(self.shards)
+        ]
+
+    def shard_for_badge(self, badge_id: str) -> int:
+        shard = self._badge_shards.get(badge_id)
+        if shard is None:
+            return zlib.crc32(badge_id.encode()) % self.shards
+        return shard
+
+    def process_punch(self, badge_id: str, timestamp: datetime) -> Optional[Dict]:
+        return self._pools[self.shard_for_badge(badge_id)].submit(_process_punch, badge_id, timestamp).result()
+
+    def process_punches(self, punches: Iterable[Tuple[str, datetime]]) -> List[Dict]:
+        """``main.process_punches`` split across shards; one result per punch, in input order."""
+        return self._split(_process_punches, punches)
+
+    def process_synced_punches(self, punches: Iterable[Tuple[str, datetime]]) -> List[Optional[Dict]]:
+        """``main.process_synced_punches`` split across shards, keeping each shard's punches in order."""
+        return self._split(_process_synced_punches, punches)
+
+    def _split(self, task, punches: Iterable[Tuple[str, datetime]]) -> list:
+        punches = list(punches)
+        positions: Dict[int, List[int]] = {}
+        for i, (badge_id, _) in enumerate(punches):
+            positions.setdefault(self.shard_for_badge(badge_id), []).append(i)
+        futures = {
+            shard: self._pools[shard].submit(task, [punches[i] for i in indexes])
+            for shard, indexes in positions.items()
+        }
+        results: list = [None] * len(punches)
+        for shard, future in futures.items():
+            for i, result in zip(positions[shard], future.result()):
+                results[i] = result
+        return results
+
+    def punch_recorded(self, badge_id: str, timestamp: datetime) -> bool:
+        return self._pools[self.shard_for_badge(badge_id)].submit(_punch_recorded, badge_id, timestamp).result()
+
+    def sweep_missing_punch_outs(self, punch_date: date, timestamp: Optional[datetime] = None) -> List[Dict]:
+        return self._gather(pool.submit(_sweep_missing_punch_outs, punch_date, timestamp) for pool in self._pools)
+
+    def calculate_work_hours(self, employee_id: int, punch_date: date) -> Dict:
+        return self.calculate_work_hours_bulk([employee_id], punch_date, punch_date)[(employee_id, punch_date)]
+
+    def calculate_work_hours_bulk(self, employee_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], Dict]:
+        by_shard: Dict[int, List[int]] = {}
+        for employee_id in set(employee_ids):
+            by_shard.setdefault(shard_for_employee(employee_id, self.shards), []).append(employee_id)
+        futures = [
+            self._pools[shard].submit(_calculate_work_hours_bulk, ids, start_date, end_date)
+            for shard, ids in by_shard.items()
+        ]
+        summaries = {}
+        for future in futures:
+            summaries.update(future.result())
+        return summaries
+
+    def rollup_totals(self, start_date: date, end_date: date) -> Dict[int, object]:
+        return self._merge(pool.submit(_rollup_totals, start_date, end_date) for pool in self._pools)
+
+    def rollup_type_counts(self, punch_type: str, start_date: date, end_date: date) -> Dict[int, int]:
+        return self._merge(pool.submit(_rollup_type_counts, punch_type, start_date, end_date) for pool in self._pools)
+
+    def add_overtime_approvals(self, approvals: Iterable[dict]) -> None:
+        by_shard: Dict[int, List[dict]] = {}
+        for approval in approvals:
+            by_shard.setdefault(shard_for_employee(approval["employee_id"], self.shards), []).append(dict(approval))
+        futures = [self._pools[shard].submit(_add_overtime_approvals, batch) for shard, batch in by_shard.items()]
+        for future in futures:
+            future.result()
+
+    def revoke_overtime_approval(self, employee_id: int, approval_date: date) -> bool:
+        shard = shard_for_employee(employee_id, self.shards)
+        return self._pools[shard].submit(_revoke_overtime_approval, employee_id, approval_date).result()
+
+    def metrics_snapshots(self) -> list:
+        """Each shard's ``utils.metrics.snapshot()``, for ``metrics.render``."""
+        futures = [pool.submit(_metrics_snapshot) for pool in self._pools]
+        return [future.result() for future in futures]
+
+    def _merge(self, futures: Iterable[Future]) -> Dict:
+        # Shards hold disjoint employees, so their per-employee results never collide.
+        merged = {}
+        for future in list(futures):
+            merged.update(future.result())
+        return merged
+
+    def _gather(self, futures: Iterable[Future]) -> List[Dict]:
+        results = []
+        for future in list(futures):
+            results.extend(future.result())
+        return results
+
+    def close(self) -> None:
+        for pool in self._pools:
+            pool.shutdown()
@@ -1,18 +1,350 @@
-from datetime import datetime
-from fastapi import BackgroundTasks, FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from time import perf_counter_ns
+from typing import List, Literal, Optional
+from fastapi import Depends, FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 import logging
-from main import process_punch, check_for_missing_punch_out
-from utils.helper import mock_employees
-app = FastAPI()
+from main import (
+    END_OF_DAY, attendance_summary, employees_with_punch_type, export_work_hours, lateness_summary, process_punch,
+    process_punches, process_synced_punch, punch_recorded, sweep_missing_punch_outs
+)
+from models.schema import PUNCH_BATCH, PunchPayload
+from utils.helper import (
+    mock_employees, mock_overtime_approvals, set_storage, add_insert_listener, remove_insert_listener,
+    add_replace_listener, remove_replace_listener, add_approval_mirror, remove_approval_mirror,
+    get_punches_for_range, compact_punches, open_shifts, punch_rollups
+)
+from utils.partitioned_store import PartitionedPunchStore
+from utils.punch_journal import PunchJournal
+from utils.punch_types import PUNCH_TYPES
+from utils.replay_filter import MATCH_UNVERIFIED, ReplayFilter
+from utils.storage import MemoryStorage
+from Background.ingest import PunchIngestQueue, TASK_SECONDS
+from Background.offline_sync import ReorderBuffer
+from Background.sharding import ShardedPunchRouter
+from utils import metrics
+
+INGEST_WORKERS = int(os.environ.get("PUNCH_INGEST_WORKERS", 4))
+INGEST_QUEUE_SIZE = int(os.environ.get("PUNCH_INGEST_QUEUE_SIZE", 10000))
+JOURNAL_PATH = os.environ.get("PUNCH_JOURNAL_PATH")
+JOURNAL_SNAPSHOT_EVERY = int(os.environ.get("PUNCH_JOURNAL_SNAPSHOT_EVERY", 1_000_000))
+# Number of shard processes; 0 runs the pipeline in this process.
+SHARDS = int(os.environ.get("PUNCH_SHARDS", 0))
+REPLAY_CACHE_SIZE = int(os.environ.get("PUNCH_REPLAY_CACHE_SIZE", 100_000))
+REPLAY_WINDOW = float(os.environ.get("PUNCH_REPLAY_WINDOW", 900))
+# Keys remembered by the optional Bloom filters after they leave the cache; 0 disables them.
+REPLAY_BLOOM_CAPACITY = int(os.environ.get("PUNCH_REPLAY_BLOOM_CAPACITY", 0))
+REJECT_REPLAY = "replay"
+# How far behind a badge's newest synced punch older ones may still arrive and be put in order.
+OFFLINE_LATENESS_MINUTES = int(os.environ.get("PUNCH_OFFLINE_LATENESS_MINUTES", 60))
+OFFLINE_IDLE_SECONDS = float(os.environ.get("PUNCH_OFFLINE_IDLE_SECONDS", 300))
+# Directory of per-day compressed punch partitions; unset keeps all history in memory.
+PARTITION_DIR = os.environ.get("PUNCH_PARTITION_DIR")
+HOT_DAYS = int(os.environ.get("PUNCH_HOT_DAYS", 2))
+PARTITION_CACHE_SIZE = int(os.environ.get("PUNCH_PARTITION_CACHE_SIZE", 31))
+# Days of partitions kept on disk; unset keeps them forever.
+RETENTION_DAYS = int(os.environ["PUNCH_RETENTION_DAYS"]) if os.environ.get("PUNCH_RETENTION_DAYS") else None
+
+router: Optional[ShardedPunchRouter] = None
+
+def ingest_punch(badge_id: str, timestamp: datetime):
+    try:
+        return router.process_punch(badge_id, timestamp) if router else process_punch(badge_id, timestamp)
+    except Exception:
+        # Let the reader's retry through rather than dropping it as a replay.
+        replay_filter.forget(badge_id, timestamp)
+        raise
+
+def punch_was_recorded(badge_id: str, timestamp: datetime) -> bool:
+    return router.punch_recorded(badge_id, timestamp) if router else punch_recorded(badge_id, timestamp)
+
+ingest_queue = PunchIngestQueue(ingest_punch, workers=INGEST_WORKERS, max_size=INGEST_QUEUE_SIZE)
+replay_filter = ReplayFilter(REPLAY_CACHE_SIZE, REPLAY_WINDOW, REPLAY_BLOOM_CAPACITY, verify=punch_was_recorded)
+offline_buffer = ReorderBuffer(timedelta(minutes=OFFLINE_LATENESS_MINUTES), OFFLINE_IDLE_SECONDS)
+
+metrics.Gauge("punch_ingest_queue_depth", "Punches waiting in the ingest queue.", lambda: ingest_queue.depth)
+QUEUE_FULL = metrics.Counter("punch_ingest_queue_full", "Punches turned away because their shard was full.")
+END_OF_DAY_TASK = TASK_SECONDS.labels("end_of_day")
+REPLAYS = metrics.Counter("punch_replays_dropped", "Replayed punches dropped before processing, by how they matched.", ["match"])
+metrics.Gauge("punch_replay_cache_entries", "Punch keys held by the replay filter.", lambda: len(replay_filter))
+metrics.Gauge("punch_offline_buffered", "Offline-synced punches waiting to be put in order.", lambda: len(offline_buffer))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global router
+    journal = partitions = None
+    if SHARDS:
+        if JOURNAL_PATH or PARTITION_DIR:
+            logging.warning("PUNCH_JOURNAL_PATH and PUNCH_PARTITION_DIR are ignored with PUNCH_SHARDS; shards keep punches in memory only.")
+        router = ShardedPunchRouter(mock_employees, mock_overtime_approvals, SHARDS)
+        add_approval_mirror(router)
+    elif JOURNAL_PATH and not PARTITION_DIR:
+        journal = PunchJournal(JOURNAL_PATH, snapshot_every=JOURNAL_SNAPSHOT_EVERY)
+        recovered = journal.recover()
+        set_storage(MemoryStorage(mock_employees, recovered, mock_overtime_approvals))
+        add_insert_listener(journal.append_many)
+        add_replace_listener(journal.replace_day)
+        # Recovered punches bypass the insert listeners; seed today's open shifts and the rollups.
+        today = date.today()
+        open_shifts.observe(get_punches_for_range([emp["id"] for emp in mock_employees], today, today))
+        punch_rollups.observe_records(recovered.records())
+    elif PARTITION_DIR:
+        partitions = PartitionedPunchStore(PARTITION_DIR, HOT_DAYS, PARTITION_CACHE_SIZE, RETENTION_DAYS,
+                                           on_expire=punch_rollups.prune)
+        set_storage(MemoryStorage(mock_employees, partitions, mock_overtime_approvals))
+        if JOURNAL_PATH:
+            # The journal holds the days that were still hot when the last run
+            # stopped; once a day is on disk its records are dropped from it.
+            journal = PunchJournal(JOURNAL_PATH)
+            journal.replay(partitions)
+            journal.checkpoint(lambda: partitions.hot_partitions)
+            partitions.on_compact = lambda days: journal.checkpoint(lambda: partitions.hot_partitions)
+            add_insert_listener(journal.append_many)
+            add_replace_listener(journal.replace_day)
+        # Loaded punches bypass the insert listeners; roll them up so range
+        # queries cover them, and seed today's open shifts.
+        for day in partitions.cold_partitions + partitions.hot_partitions:
+            punch_rollups.observe_records(partitions.partition_records(day))
+        today = date.today()
+        open_shifts.observe(get_punches_for_range([emp["id"] for emp in mock_employees], today, today))
+    await ingest_queue.start()
+    end_of_day = asyncio.create_task(schedule_end_of_day_check())
+    offline_drain = asyncio.create_task(drain_idle_offline_punches())
+    yield
+    end_of_day.cancel()
+    offline_drain.cancel()
+    await ingest_queue.stop()
+    await asyncio.to_thread(process_released_punches, offline_buffer.flush())
+    if router:
+        remove_approval_mirror(router)
+        router.close()
+        router = None
+    if journal:
+        remove_insert_listener(journal.append_many)
+        remove_replace_listener(journal.replace_day)
+        if partitions:
+            partitions.on_compact = None
+        journal.close()
+
+app = FastAPI(lifespan=lifespan)
 @app.post("/punch")
-def receive_punch(badge_id: str, timestamp: datetime, background_tasks: BackgroundTasks):
-    background_tasks.add_task(process_punch, badge_id, timestamp)
-    return {"status": "Punch received, processing in background."}
+async def receive_punch(badge_id: str, timestamp: datetime):
+    match = replay_filter.check(badge_id, timestamp, verify=False)
+    if match == MATCH_UNVERIFIED:
+        # Verifying reads the store, so it runs off the event loop.
+        match = await asyncio.to_thread(replay_filter.confirm, badge_id, timestamp)
+    if match:
+        if metrics.enabled:
+            REPLAYS.labels(match).inc()
+        return {"status": "Duplicate punch ignored.", "queue_depth": ingest_queue.depth}
+    if not ingest_queue.submit(badge_id, timestamp):
+        replay_filter.forget(badge_id, timestamp)
+        if metrics.enabled:
+            QUEUE_FULL.inc()
+        return JSONResponse(
+            status_code=503,
+            content={"status": "Punch queue is full, retry later.", "queue_depth": ingest_queue.depth},
+            headers={"Retry-After": "1"}
+        )
+    return {"status": "Punch received, processing in background.", "queue_depth": ingest_queue.depth}
+
+@app.get("/punch/queue")
+async def punch_queue_status():
+    return {"queue_depth": ingest_queue.depth, "shard_depths": ingest_queue.shard_depths()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Shards run the pipeline, so their counters and histograms are summed in.
+    remote = await asyncio.to_thread(router.metrics_snapshots) if router else ()
+    return PlainTextResponse(metrics.render(remote), media_type="text/plain; version=0.0.4")
+
+async def punch_batch(request: Request) -> List[PunchPayload]:
+    """The request body validated straight from its JSON bytes as a batch of punches.
+
+    A whole upload is parsed and checked in one ``TypeAdapter`` call into
+    plain dicts, rather than decoded and then validated item by item into
+    models; errors come back as the usual 422 response.
+    """
+    try:
+        return PUNCH_BATCH.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+
+# punch_batch reads the body itself, so the routes describe it for the docs.
+PUNCH_BATCH_BODY = {"requestBody": {"required": True, "content": {"application/json": {
+    "schema": {"type": "array", "items": TypeAdapter(PunchPayload).json_schema()}
+}}}}
 
-def run_end_of_day_check():
+@app.post("/punches/batch", openapi_extra=PUNCH_BATCH_BODY)
+def receive_punch_batch(punches: List[PunchPayload] = Depends(punch_batch)):
+    results: List[Optional[dict]] = [None] * len(punches)
+    fresh, positions = [], []
+    for i, punch in enumerate(punches):
+        match = replay_filter.check(punch["badge_id"], punch["timestamp"])
+        if match:
+            if metrics.enabled:
+                REPLAYS.labels(match).inc()
+            results[i] = {"status": "rejected", "reason": REJECT_REPLAY}
+        else:
+            fresh.append((punch["badge_id"], punch["timestamp"]))
+            positions.append(i)
+    pipeline = router.process_punches if router else process_punches
+    try:
+        processed = pipeline(fresh)
+    except Exception:
+        for badge_id, timestamp in fresh:
+            replay_filter.forget(badge_id, timestamp)
+        raise
+    for i, result in zip(positions, processed):
+        results[i] = result
+    return {"results": results}
+
+@app.post("/punches/offline", openapi_extra=PUNCH_BATCH_BODY)
+def receive_offline_punches(punches: List[PunchPayload] = Depends(punch_batch), final: bool = False):
+    """Accept punches a terminal buffered while offline, in any order.
+
+    Punches are held per badge until its watermark passes them and then
+    processed oldest first; a punch older than one already processed
+    reclassifies its day. ``final`` releases everything held for the
+    badges in this upload.
+    """
+    fresh = []
+    for punch in punches:
+        match = replay_filter.check(punch["badge_id"], punch["timestamp"])
+        if match:
+            if metrics.enabled:
+                REPLAYS.labels(match).inc()
+        else:
+            fresh.append((punch["badge_id"], punch["timestamp"]))
+    released = offline_buffer.add(fresh)
+    if final:
+        released += offline_buffer.flush({punch["badge_id"] for punch in punches})
+    results = process_released_punches(released)
+    return {
+        "replayed": len(punches) - len(fresh),
+        "buffered": len(offline_buffer),
+        "released": [
+            {"badge_id": badge_id, "timestamp": timestamp, "punch": result}
+            for (badge_id, timestamp), result in zip(released, results)
+        ]
+    }
+
+def process_released_punches(punches: List[tuple]) -> List[Optional[dict]]:
+    """Process punches released by ``offline_buffer``, in order.
+
+    If one fails, it and the punches after it go back into the buffer, to
+    be released again once their badge is idle; their replay keys are kept,
+    so a terminal's retry is not processed as well.
+    """
+    if not punches:
+        return []
+    if router:
+        try:
+            return router.process_synced_punches(punches)
+        except Exception:
+            offline_buffer.restore(punches)
+            raise
+    results = []
+    for i, (badge_id, timestamp) in enumerate(punches):
+        try:
+            results.append(process_synced_punch(badge_id, timestamp))
+        except Exception:
+            offline_buffer.restore(punches[i:])
+            raise
+    return results
+
+async def drain_idle_offline_punches():
+    """Process punches of badges whose upload went quiet, until cancelled."""
+    while True:
+        await asyncio.sleep(OFFLINE_IDLE_SECONDS / 2)
+        try:
+            await asyncio.to_thread(process_released_punches, offline_buffer.flush_idle())
+        except Exception:
+            logging.exception("Processing idle offline punches failed")
+
+def invalid_range(start_date: date, end_date: date) -> Optional[JSONResponse]:
+    if end_date < start_date:
+        return JSONResponse(status_code=400, content={"status": "end_date is before start_date."})
+    return None
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+@app.get("/payroll/export")
+def export_payroll(start_date: date, end_date: date, format: Literal["csv", "ndjson"] = "csv"):
+    """Stream work-hour summaries for every employee and day in the range."""
+    error = invalid_range(start_date, end_date)
+    if error:
+        return error
+    filename = f"payroll_{start_date}_{end_date}.{format}"
+    return StreamingResponse(
+        export_work_hours(start_date, end_date, format, bulk=router.calculate_work_hours_bulk if router else None),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/analytics/punch-types/{punch_type}")
+def punch_type_analytics(punch_type: str, start_date: date, end_date: date, min_count: int = 1):
+    """Employees with at least ``min_count`` punches of ``punch_type`` in the range,
+    e.g. LATE_IN more than 3 times this month, or any DEFAULTER this week."""
+    if punch_type not in PUNCH_TYPES:
+        return JSONResponse(status_code=404, content={"status": f"Unknown punch type {punch_type}."})
+    error = invalid_range(start_date, end_date)
+    if error:
+        return error
+    employees = employees_with_punch_type(
+        punch_type, start_date, end_date, min_count, router.rollup_type_counts if router else None
+    )
+    return {"punch_type": punch_type, "start_date": start_date, "end_date": end_date, "employees": employees}
+
+@app.get("/analytics/lateness")
+def lateness_analytics(start_date: date, end_date: date, group_by: Literal["employee", "team", "shift"] = "employee"):
+    """Late punches and average lateness per employee, team or shift over the range."""
+    error = invalid_range(start_date, end_date)
+    if error:
+        return error
+    groups = lateness_summary(start_date, end_date, group_by, router.rollup_totals if router else None)
+    return {"start_date": start_date, "end_date": end_date, "group_by": group_by, "groups": groups}
+
+@app.get("/analytics/attendance")
+def attendance_analytics(start_date: date, end_date: date):
+    """Days present, punches and lateness/earliness totals per employee over the range."""
+    error = invalid_range(start_date, end_date)
+    if error:
+        return error
+    employees = attendance_summary(start_date, end_date, router.rollup_totals if router else None)
+    return {"start_date": start_date, "end_date": end_date, "employees": employees}
+
+def run_end_of_day_check(punch_date: Optional[date] = None):
+    """Sweep ``punch_date`` (today by default) for missing punch-outs; a day is only swept once."""
+    started = perf_counter_ns()
     now = datetime.now()
-    logging.info("Running end-of-day defaulter check for all employees")
-    for emp in mock_employees:
-        if emp["is_active"]:
-            check_for_missing_punch_out(emp, now)
-    logging.info("End-of-day defaulter check completed.")
\ No newline at end of file
+    punch_date = punch_date or now.date()
+    logging.info(f"Running end-of-day defaulter check for {punch_date}")
+    sweep = router.sweep_missing_punch_outs if router else sweep_missing_punch_outs
+    defaulter_punches = sweep(punch_date, now if punch_date == now.date() else None)
+    if not router:
+        # Write out the days that fall out of the hot window at midnight,
+        # ahead of the next day's first punch.
+        compact_punches(punch_date + timedelta(days=1))
+    if metrics.enabled:
+        END_OF_DAY_TASK.observe_ns(perf_counter_ns() - started)
+    logging.info(f"End-of-day defaulter check completed: {len(defaulter_punches)} defaulter punches.")
+    return defaulter_punches
+
+async def schedule_end_of_day_check():
+    """Run the end-of-day check at ``END_OF_DAY`` every day until cancelled."""
+    punch_date = date.today()
+    while True:
+        delay = (datetime.combine(punch_date, END_OF_DAY) - datetime.now()).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await asyncio.to_thread(run_end_of_day_check, punch_date)
+        except Exception:
+            logging.exception(f"End-of-day defaulter check failed for {punch_date}")
+        punch_date += timedelta(days=1)
@@ -0,0 +1,177 @@
+"""End-to-end load on the punch API, driven in-process over ASGI.
+
+    python -m benchmarks.api_load --employees 2000 --days 1 --concurrency 1 16 64 --modes single batch offline
+
+The app in ``Background.task`` is started with its lifespan and called
+through ``httpx.ASGITransport``, so requests go through routing, query and
+body validation and the response path, but not a socket. Requests come
+from a seeded workload (``benchmarks.workload``) in timestamp order, with
+``--unknown-rate`` of them from badges nobody holds and ``--replay-rate``
+sent twice, as a terminal retrying a lost response would. ``--concurrency``
+clients send them as fast as they are answered.
+
+Modes:
+
+* ``single``: one ``POST /punch`` per punch, queued for the ingest workers.
+* ``batch``: ``POST /punches/batch`` of ``--batch`` punches, processed
+  before the response.
+* ``offline``: ``POST /punches/offline`` of ``--batch`` punches, held in
+  the reorder buffer until their badge's watermark passes them.
+
+Each run reports requests and punches per second while sending, response
+latency percentiles, and ``drain_seconds``: the time from the last response
+until every punch has been processed (the ingest queue joined, or the
+offline buffer flushed). Each run is in its own process, on a fresh store.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.pipeline import git_commit
+from benchmarks.workload import generate_workload
+
+MODES = ("single", "batch", "offline")
+
+
+def request_mix(workload, unknown_rate: float, replay_rate: float, seed: int):
+    """The workload's punches as ``(badge_id, iso timestamp)``, with unknown badges and replays mixed in."""
+    rng = random.Random(seed)
+    punches = []
+    for badge_id, timestamp in workload.punches:
+        if rng.random() < unknown_rate:
+            badge_id = f"U{rng.randrange(10 ** 7):07d}"
+        punch = (badge_id, timestamp.isoformat())
+        punches.append(punch)
+        if rng.random() < replay_rate:
+            punches.append(punch)
+    return punches
+
+
+def requests_for(mode: str, punches, batch: int):
+    """``(path, params, json body, punches carried)`` for every request of the run."""
+    if mode == "single":
+        return [("/punch", {"badge_id": badge_id, "timestamp": timestamp}, None, 1) for badge_id, timestamp in punches]
+    path = "/punches/batch" if mode == "batch" else "/punches/offline"
+    return [
+        (path, None, [{"badge_id": badge_id, "timestamp": timestamp} for badge_id, timestamp in punches[first:first + batch]],
+         len(punches[first:first + batch]))
+        for first in range(0, len(punches), batch)
+    ]
+
+
+async def drive(mode: str, requests, concurrency: int) -> dict:
+    import httpx
+
+    from Background import task
+
+    latencies = np.zeros(len(requests), dtype=np.int64)
+    statuses = Counter()
+    position = 0
+
+    async def client_loop(client) -> None:
+        nonlocal position
+        while position < len(requests):
+            i = position
+            position += 1
+            path, params, body, _ = requests[i]
+            started = time.perf_counter_ns()
+            response = await client.post(path, params=params, json=body)
+            latencies[i] = time.perf_counter_ns() - started
+            statuses[response.status_code] += 1
+
+    async with task.app.router.lifespan_context(task.app):
+        transport = httpx.ASGITransport(app=task.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://punch") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+            send_seconds = time.perf_counter() - started
+            if mode == "single":
+                await task.ingest_queue.join()
+            elif mode == "offline":
+                await asyncio.to_thread(task.process_released_punches, task.offline_buffer.flush())
+            drain_seconds = time.perf_counter() - started - send_seconds
+
+    latency_ms = latencies / 1e6
+    punches = sum(carried for _, _, _, carried in requests)
+    return {
+        "requests": len(requests),
+        "punches": punches,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "requests_per_sec": round(len(requests) / send_seconds),
+        "punches_per_sec": round(punches / send_seconds),
+        "p50_ms": round(float(np.percentile(latency_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latency_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latency_ms, 99)), 3),
+        "send_seconds": round(send_seconds, 3),
+        "drain_seconds": round(drain_seconds, 3),
+        "processed_per_sec": round(punches / (send_seconds + drain_seconds))
+    }
+
+
+def run(mode: str, concurrency: int, args) -> dict:
+    # Imported here so every run starts from freshly imported modules.
+    from utils import helper
+    from utils.overtime_approvals import OvertimeApprovalIndex
+    from utils.punch_index import PunchIndex
+    from utils.storage import MemoryStorage
+
+    logging.disable(logging.ERROR)
+    workload = generate_workload(args.employees, args.days, args.seed)
+    helper.set_storage(MemoryStorage(workload.employees, PunchIndex(), OvertimeApprovalIndex(workload.approvals)))
+    punches = request_mix(workload, args.unknown_rate, args.replay_rate, args.seed)
+    result = asyncio.run(drive(mode, requests_for(mode, punches, args.batch), concurrency))
+    return {"mode": mode, "concurrency": concurrency, **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--batch", type=int, default=100, help="punches per batch or offline request")
+    parser.add_argument("--unknown-rate", type=float, default=0.01)
+    parser.add_argument("--replay-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report here as well as to stdout")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        for concurrency in args.concurrency:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run, mode, concurrency, args).result()
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "employees": args.employees,
+        "days": args.days,
+        "batch": args.batch,
+        "unknown_rate": args.unknown_rate,
+        "replay_rate": args.replay_rate,
+        "seed": args.seed,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Startup time for rebuilding the punch store from the journal.
+
+    python -m benchmarks.journal_replay --punches 10000000
+
+Writes a journal of synthetic punches, then times ``PunchJournal.recover``
+twice: replaying the whole journal, and replaying only the tail after a
+snapshot taken ``--snapshot-lag`` punches before the end.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.columnar_store import RECORD_DTYPE
+from utils.punch_journal import PunchJournal, MAGIC
+from utils.work_hours import MICROS_PER_DAY, to_micros
+
+START = datetime(2025, 1, 1)
+
+
+def write_journal(path: str, punches: int, employees: int, skip: int = 0, seed: int = 1) -> None:
+    """Append punches number ``skip`` to ``skip + punches`` of a synthetic history."""
+    rng = np.random.default_rng(seed + skip)
+    per_day = employees * 4
+    with open(path, "ab") as f:
+        if not skip:
+            f.write(MAGIC)
+        for first in range(skip, skip + punches, 1_000_000):
+            count = min(1_000_000, skip + punches - first)
+            records = np.zeros(count, dtype=RECORD_DTYPE)
+            index = np.arange(first, first + count)
+            records["employee_id"] = rng.integers(1, employees + 1, count)
+            records["timestamp"] = (
+                to_micros(START) + (index // per_day) * MICROS_PER_DAY
+                + rng.integers(8 * 3600, 20 * 3600, count) * 1_000_000
+            )
+            records["code"] = rng.integers(1, 9, count)
+            f.write(records.tobytes())
+
+
+def timed_recover(path: str) -> float:
+    journal = PunchJournal(path)
+    started = time.perf_counter()
+    store = journal.recover()
+    elapsed = time.perf_counter() - started
+    journal.close()
+    assert len(store) > 0
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--punches", type=int, default=10_000_000)
+    parser.add_argument("--employees", type=int, default=10_000)
+    parser.add_argument("--snapshot-lag", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "punches.journal")
+        write_journal(path, args.punches - args.snapshot_lag, args.employees)
+        full = {"mode": "full_replay", "punches": args.punches - args.snapshot_lag}
+        full["seconds"] = round(timed_recover(path), 2)
+
+        journal = PunchJournal(path)
+        journal.snapshot()
+        journal.close()
+        write_journal(path, args.snapshot_lag, args.employees, skip=args.punches - args.snapshot_lag)
+        snapshot = {"mode": "snapshot_plus_tail", "punches": args.punches, "tail": args.snapshot_lag}
+        snapshot["seconds"] = round(timed_recover(path), 2)
+
+        print(json.dumps(full))
+        print(json.dumps(snapshot))
+
+
+if __name__ == "__main__":
+    main()
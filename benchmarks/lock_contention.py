@@ -0,0 +1,122 @@
+"""Punch throughput of 32 threads under striped employee locks and one global lock.
+
+    python -m benchmarks.lock_contention --employees 2000 --days 2 --threads 32 --storage memory sqlite
+
+A seeded workload (``benchmarks.workload``) is split by employee across
+``--threads`` threads, each replaying its share through ``process_punch``
+in timestamp order, so every run records the same punches. Each storage
+is run once with ``main.employee_locks`` striped ``--stripes`` ways and
+once with a single stripe, which is one global lock around every
+read-classify-insert. In-memory punches hold the GIL throughout, so the
+two mostly differ there by lock overhead; SQLite releases it during
+queries, so on several cores threads of different employees overlap there.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.pipeline import git_commit
+from benchmarks.workload import generate_workload
+
+
+def make_storage(kind: str, workload, directory: str):
+    from utils.overtime_approvals import OvertimeApprovalIndex
+    from utils.punch_index import PunchIndex
+    from utils.sqlite_storage import SqliteStorage
+    from utils.storage import MemoryStorage
+
+    if kind == "memory":
+        return MemoryStorage(workload.employees, PunchIndex(), OvertimeApprovalIndex(workload.approvals))
+    storage = SqliteStorage(os.path.join(directory, f"punches-{time.monotonic_ns()}.db"), pool_size=8)
+    storage.add_employees(workload.employees)
+    storage.add_overtime_approvals(workload.approvals)
+    return storage
+
+
+def run(workload, kind: str, stripes: int, threads: int) -> dict:
+    import main
+    from utils import helper
+    from utils.striped_lock import StripedLock
+
+    badge_threads = {employee["badge_id"]: i % threads for i, employee in enumerate(workload.employees)}
+    shares = [[] for _ in range(threads)]
+    for badge_id, timestamp in workload.punches:
+        shares[badge_threads[badge_id]].append((badge_id, timestamp))
+    accepted = [0] * threads
+
+    def replay(thread: int) -> None:
+        for badge_id, timestamp in shares[thread]:
+            if main.process_punch(badge_id, timestamp) is not None:
+                accepted[thread] += 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = make_storage(kind, workload, directory)
+        previous_storage = helper.set_storage(storage)
+        previous_locks, main.employee_locks = main.employee_locks, StripedLock(stripes)
+        try:
+            workers = [threading.Thread(target=replay, args=(thread,)) for thread in range(threads)]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            seconds = time.perf_counter() - started
+        finally:
+            main.employee_locks = previous_locks
+            helper.set_storage(previous_storage)
+            if kind == "sqlite":
+                storage.close()
+    return {
+        "storage": kind,
+        "stripes": stripes,
+        "accepted": sum(accepted),
+        "punches_per_sec": round(len(workload.punches) / seconds)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--stripes", type=int, default=64)
+    parser.add_argument("--storage", nargs="+", choices=["memory", "sqlite"], default=["memory", "sqlite"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report here as well as to stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    workload = generate_workload(args.employees, args.days, args.seed)
+    results = []
+    for kind in args.storage:
+        for stripes in (args.stripes, 1):
+            result = run(workload, kind, stripes, args.threads)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "employees": args.employees,
+        "days": args.days,
+        "punches": len(workload.punches),
+        "threads": args.threads,
+        "seed": args.seed,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
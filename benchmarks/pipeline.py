@@ -0,0 +1,124 @@
+"""Throughput and latency of the punch pipeline on synthetic workloads.
+
+    python -m benchmarks.pipeline --employees 1000 10000 100000 --days 3 --output BENCH.json
+
+For each scale a seeded workload (``benchmarks.workload``) is replayed
+through ``process_punch`` in timestamp order on a fresh in-memory store,
+running ``run_end_of_day_check`` as each day ends. ``calculate_work_hours``
+is then called for every employee and day. Each scale runs in its own
+process, so peak RSS is per scale. The report is one JSON document with
+the commit it was measured at, for comparing runs across commits.
+"""
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.workload import generate_workload
+
+
+def run_scale(employees: int, days: int, seed: int) -> dict:
+    # Imported here so every scale starts from freshly imported modules.
+    from Background.task import run_end_of_day_check
+    from main import calculate_work_hours, process_punch
+    from utils import helper
+    from utils.overtime_approvals import OvertimeApprovalIndex
+    from utils.punch_index import PunchIndex
+    from utils.storage import MemoryStorage
+
+    logging.disable(logging.WARNING)
+    workload = generate_workload(employees, days, seed)
+    helper.set_storage(MemoryStorage(workload.employees, PunchIndex(), OvertimeApprovalIndex(workload.approvals)))
+
+    latencies = array("q")
+    sweep_seconds = []
+    accepted = defaulters = 0
+    pending_days = list(workload.days)
+
+    def sweep_until(day):
+        nonlocal defaulters
+        while pending_days and pending_days[0] < day:
+            started = time.perf_counter()
+            defaulters += len(run_end_of_day_check(pending_days.pop(0)))
+            sweep_seconds.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for badge_id, timestamp in workload.punches:
+        sweep_until(timestamp.date())
+        punch_started = time.perf_counter_ns()
+        if process_punch(badge_id, timestamp) is not None:
+            accepted += 1
+        latencies.append(time.perf_counter_ns() - punch_started)
+    ingest_seconds = time.perf_counter() - started - sum(sweep_seconds)
+    sweep_until(datetime.max.date())
+
+    started = time.perf_counter()
+    for day in workload.days:
+        for employee in workload.employees:
+            calculate_work_hours(employee["id"], day)
+    work_hours_seconds = time.perf_counter() - started
+
+    latency_us = np.frombuffer(latencies, dtype=np.int64) / 1000
+    return {
+        "employees": employees,
+        "days": days,
+        "punches": len(workload.punches),
+        "accepted": accepted,
+        "defaulters": defaulters,
+        "punches_per_sec": round(len(workload.punches) / ingest_seconds),
+        "process_punch_p50_us": round(float(np.percentile(latency_us, 50)), 1),
+        "process_punch_p99_us": round(float(np.percentile(latency_us, 99)), 1),
+        "work_hours_per_sec": round(employees * days / work_hours_seconds),
+        "eod_sweep_ms_mean": round(1000 * sum(sweep_seconds) / len(sweep_seconds), 2),
+        "eod_sweep_ms_max": round(1000 * max(sweep_seconds), 2),
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report here as well as to stdout")
+    args = parser.parse_args()
+
+    results = []
+    for employees in args.employees:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_scale, employees, args.days, args.seed).result()
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
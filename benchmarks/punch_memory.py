@@ -0,0 +1,70 @@
+"""Memory used by punch history: list of dicts vs ColumnarPunchStore.
+
+    python -m benchmarks.punch_memory --sizes 1000000 10000000
+
+Each representation is built under ``tracemalloc`` and the peak traced
+size is reported per punch. The dict list at 10M punches needs several GB;
+use ``--columnar-only`` on smaller machines.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from utils.columnar_store import ColumnarPunchStore
+from utils.punch_types import PUNCH_TYPES
+
+START = datetime(2025, 1, 1, 8, 0)
+
+
+def generate_punches(count: int, employees: int = 10000, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(count):
+        late = rng.random() < 0.1
+        yield {
+            "employee_id": rng.randrange(1, employees + 1),
+            "punch_type": rng.choice(PUNCH_TYPES),
+            "timestamp": START + timedelta(days=i // (employees * 4), minutes=rng.randrange(0, 14 * 60)),
+            "is_late": late,
+            "lateness_minutes": rng.randrange(11, 120) if late else 0,
+            "is_early": False,
+            "earliness_minutes": 0
+        }
+
+
+def measure(build) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return {"bytes": current, "build_seconds": round(elapsed, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--columnar-only", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        representations = {"columnar": lambda: ColumnarPunchStore(generate_punches(size))}
+        if not args.columnar_only:
+            representations["dicts"] = lambda: list(generate_punches(size))
+        for name, build in representations.items():
+            result = measure(build)
+            result.update(representation=name, punches=size, bytes_per_punch=round(result["bytes"] / size, 1))
+            results.append(result)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
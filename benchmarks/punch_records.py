@@ -0,0 +1,122 @@
+"""Per-punch cost of building punch records and validating uploaded batches.
+
+    python -m benchmarks.punch_records --punches 200000 --batch 1000
+
+Allocation: ``--punches`` punches are built from pre-generated field values
+as plain dicts (the pipeline's punches before ``PunchRecord``), as
+``models.records.PunchRecord`` and as validated ``models.schema.Punch``
+models. Each is built under ``tracemalloc`` for the bytes held per punch,
+and again untraced for the time per punch.
+
+Validation: a JSON upload of ``--batch`` punches is validated the way
+FastAPI handled a ``List[PunchRequest]`` body (decode, then validate into
+models) and the way ``Background.task.punch_batch`` does (one
+``TypeAdapter.validate_json`` call into dicts). Times are the best of
+``--repeat`` runs, per punch.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from models.records import PunchRecord
+from models.schema import PUNCH_BATCH, Punch, PunchRequest
+from utils.punch_types import PUNCH_TYPES
+
+START = datetime(2025, 1, 6, 6, 0)
+
+
+def field_values(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(count):
+        late = rng.random() < 0.1
+        values.append((
+            rng.randrange(1, 10_001), rng.choice(PUNCH_TYPES), START + timedelta(minutes=rng.randrange(18 * 60)),
+            late, rng.randrange(11, 120) if late else 0, False, 0
+        ))
+    return values
+
+
+def as_dict(employee_id, punch_type, timestamp, is_late, lateness_minutes, is_early, earliness_minutes):
+    return {
+        "employee_id": employee_id,
+        "punch_type": punch_type,
+        "timestamp": timestamp,
+        "is_late": is_late,
+        "lateness_minutes": lateness_minutes,
+        "is_early": is_early,
+        "earliness_minutes": earliness_minutes
+    }
+
+
+def as_model(employee_id, punch_type, timestamp, is_late, lateness_minutes, is_early, earliness_minutes):
+    return Punch(employee_id=employee_id, punch_type=punch_type, timestamp=timestamp, is_late=is_late,
+                 lateness_minutes=lateness_minutes, is_early=is_early, earliness_minutes=earliness_minutes)
+
+
+BUILDERS = {"dict": as_dict, "record": PunchRecord, "model": as_model}
+
+
+def allocation(values: list) -> list:
+    results = []
+    for name, build in BUILDERS.items():
+        gc.collect()
+        tracemalloc.start()
+        held = [build(*fields) for fields in values]
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del held
+        gc.collect()
+        started = time.perf_counter()
+        held = [build(*fields) for fields in values]
+        seconds = time.perf_counter() - started
+        del held
+        results.append({
+            "representation": name,
+            # Less the list holding them, 8 bytes a punch.
+            "bytes_per_punch": round(traced / len(values) - 8, 1),
+            "build_ns_per_punch": round(seconds / len(values) * 1e9)
+        })
+    return results
+
+
+def validation(values: list, batch: int, repeat: int) -> list:
+    body = json.dumps([
+        {"badge_id": f"{employee_id:08d}", "timestamp": timestamp.isoformat()}
+        for employee_id, _, timestamp, *_ in values[:batch]
+    ]).encode()
+    models = TypeAdapter(List[PunchRequest])
+    ways = {
+        "decode_then_models": lambda: models.validate_python(json.loads(body)),
+        "punch_batch": lambda: PUNCH_BATCH.validate_json(body)
+    }
+    results = []
+    for name, validate in ways.items():
+        seconds = min(timeit.repeat(validate, number=1, repeat=repeat))
+        results.append({"validation": name, "batch": batch, "ns_per_punch": round(seconds / batch * 1e9)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--punches", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    values = field_values(max(args.punches, args.batch), args.seed)
+    for result in allocation(values[:args.punches]) + validation(values, args.batch, args.repeat):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
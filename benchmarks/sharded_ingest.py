@@ -0,0 +1,104 @@
+"""Punch throughput of the sharded pipeline from 1 to N shard processes.
+
+    python -m benchmarks.sharded_ingest --employees 20000 --days 2 --shards 1 2 4 8
+
+A seeded workload (``benchmarks.workload``) is replayed in timestamp order
+through ``ShardedPunchRouter.process_punches`` in batches of ``--batch``
+punches, once per shard count, and once in-process through
+``main.process_punches`` as the baseline. Shard processes are started
+before the clock starts. Speed-up is bounded by the cores available, which
+the report records.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks.pipeline import git_commit
+from benchmarks.workload import generate_workload
+
+
+def batches(punches, size):
+    for first in range(0, len(punches), size):
+        yield punches[first:first + size]
+
+
+def run_in_process(workload, batch: int) -> float:
+    from main import process_punches
+    from utils import helper
+    from utils.overtime_approvals import OvertimeApprovalIndex
+    from utils.punch_index import PunchIndex
+    from utils.storage import MemoryStorage
+
+    previous = helper.set_storage(MemoryStorage(workload.employees, PunchIndex(), OvertimeApprovalIndex(workload.approvals)))
+    try:
+        started = time.perf_counter()
+        for chunk in batches(workload.punches, batch):
+            process_punches(chunk)
+        return time.perf_counter() - started
+    finally:
+        helper.set_storage(previous)
+
+
+def run_sharded(workload, shards: int, batch: int) -> float:
+    from Background.sharding import ShardedPunchRouter
+
+    router = ShardedPunchRouter(workload.employees, workload.approvals, shards)
+    try:
+        # Sweeping a day before the workload starts every shard process.
+        router.sweep_missing_punch_outs(workload.days[0] - timedelta(days=1))
+        started = time.perf_counter()
+        for chunk in batches(workload.punches, batch):
+            router.process_punches(chunk)
+        return time.perf_counter() - started
+    finally:
+        router.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report here as well as to stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    workload = generate_workload(args.employees, args.days, args.seed)
+    punches = len(workload.punches)
+
+    baseline = run_in_process(workload, args.batch)
+    results = [{"shards": 0, "punches_per_sec": round(punches / baseline), "speedup": 1.0}]
+    print(json.dumps(results[0]), file=sys.stderr)
+    for shards in args.shards:
+        seconds = run_sharded(workload, shards, args.batch)
+        result = {"shards": shards, "punches_per_sec": round(punches / seconds), "speedup": round(baseline / seconds, 2)}
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "employees": args.employees,
+        "days": args.days,
+        "punches": punches,
+        "batch": args.batch,
+        "seed": args.seed,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
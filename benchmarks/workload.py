@@ -0,0 +1,95 @@
+"""Seeded synthetic workloads for the punch pipeline.
+
+``generate_workload`` produces employees on a mix of shifts and the badge
+punches they make over a number of days: on-time and late arrivals,
+breaks, overtime (mostly approved) and forgotten punch-outs. The same
+arguments always produce the same workload.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+from typing import List, Tuple
+
+SHIFTS = [
+    (time(9, 0), time(17, 0)),
+    (time(7, 0), time(15, 0)),
+    (time(14, 0), time(22, 30)),
+    (time(22, 0), time(6, 0)),
+]
+START_DATE = date(2025, 1, 6)
+
+ABSENT_RATE = 0.05
+LATE_RATE = 0.12
+BREAK_RATE = 0.6
+OVERTIME_RATE = 0.1
+OVERTIME_APPROVED_RATE = 0.8
+MISSING_OUT_RATE = 0.04
+
+
+class Workload:
+    __slots__ = ("employees", "punches", "approvals", "days")
+
+    def __init__(self, employees: List[dict], punches: List[Tuple[str, datetime]], approvals: List[dict], days: List[date]):
+        self.employees = employees
+        self.punches = punches
+        self.approvals = approvals
+        self.days = days
+
+
+def _minutes(rng: random.Random, mean: float, spread: float) -> timedelta:
+    return timedelta(minutes=round(rng.gauss(mean, spread)))
+
+
+def generate_workload(employees: int, days: int, seed: int = 1, start_date: date = START_DATE) -> Workload:
+    """``employees`` employees punching over ``days`` days; punches come back in timestamp order."""
+    rng = random.Random(seed)
+    staff = []
+    for employee_id in range(1, employees + 1):
+        shift_start, shift_end = rng.choice(SHIFTS)
+        staff.append({
+            "id": employee_id,
+            "badge_id": f"{employee_id:08d}",
+            "is_active": rng.random() > 0.005,
+            "shift_start_time": shift_start,
+            "shift_end_time": shift_end
+        })
+
+    punches = []
+    approvals = []
+    day_list = [start_date + timedelta(days=offset) for offset in range(days)]
+    for day in day_list:
+        for employee in staff:
+            if rng.random() < ABSENT_RATE:
+                continue
+            badge_id = employee["badge_id"]
+            start = datetime.combine(day, employee["shift_start_time"])
+            end = datetime.combine(day, employee["shift_end_time"])
+            if end <= start:
+                end += timedelta(days=1)
+
+            if rng.random() < LATE_RATE:
+                arrival = start + timedelta(minutes=rng.randint(11, 90))
+            else:
+                arrival = start + _minutes(rng, 0, 4)
+            punches.append((badge_id, arrival))
+
+            if rng.random() < BREAK_RATE:
+                break_out = start + (end - start) / 2 + _minutes(rng, 0, 20)
+                punches.append((badge_id, break_out))
+                punches.append((badge_id, break_out + timedelta(minutes=rng.randint(20, 60))))
+
+            if rng.random() < MISSING_OUT_RATE:
+                continue
+            punches.append((badge_id, end + _minutes(rng, 0, 5)))
+
+            if rng.random() < OVERTIME_RATE:
+                overtime_in = end + timedelta(minutes=rng.randint(15, 30))
+                punches.append((badge_id, overtime_in))
+                punches.append((badge_id, overtime_in + timedelta(minutes=rng.randint(30, 180))))
+                approvals.append({
+                    "employee_id": employee["id"],
+                    "date": overtime_in.date(),
+                    "is_approved": rng.random() < OVERTIME_APPROVED_RATE
+                })
+
+    punches.sort(key=lambda punch: punch[1])
+    return Workload(staff, punches, approvals, day_list)
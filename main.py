@@ -1,147 +1,527 @@
+import json
 import logging
-from datetime import datetime
-from typing import Optional, Dict
+from datetime import datetime, date, time
+from itertools import groupby
+from time import perf_counter_ns
+from typing import Callable, Optional, Dict, Iterable, Iterator, List, Tuple
 
-from utils.helper import get_employee_by_badge, get_last_punch, insert_punch, get_overtime_approval, get_all_punches_for_day, get_employee_shift_time
+from utils.helper import (
+    get_employee_by_badge, get_employee_with_last_punch, get_employees_by_badges, get_employees_by_ids, get_last_punch, get_last_punches, insert_punch, insert_punches,
+    get_overtime_approval, get_overtime_approvals, get_all_punches_for_day, get_day_totals, get_punches_for_range,
+    get_employee_shift_time, get_employee_ids, replace_day_punches, open_shifts, punch_rollups
+)
+from models.records import PunchRecord
+from models.schema import WorkHoursSummary
+from utils import metrics
+from utils.day_totals import DayTotals
+from utils.employee_directory import ShiftWindow, shift_window
+from utils.punch_rollups import Rollup
+from utils.punch_types import PUNCH_TYPES
+from utils.shift_table import classify_minutes, minutes_of_day
+from utils.storage import date_range
+from utils.striped_lock import StripedLock
+from utils.work_hours import PunchColumns, work_hours_by_day
 
-TIME_WINDOW_MINUTES = 10
+END_OF_DAY = time(23, 59)
+
+REJECT_UNKNOWN_BADGE = "unknown_badge"
+REJECT_DUPLICATE_IN = "duplicate_in"
+REJECT_DUPLICATE_OUT = "duplicate_out"
+REJECT_UNAPPROVED_OVERTIME = "unapproved_overtime"
+
+# Read-classify-insert runs under the badge's stripe of these locks, so two
+# punches for one employee cannot both pass the duplicate check. Keyed by
+# badge_id, the lock is taken before the employee is looked up, and the
+# employee and the day's last punch still come back in one read under it.
+LOCK_STRIPES = 64
+employee_locks = StripedLock(LOCK_STRIPES)
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ("date", "employee_id") + tuple(WorkHoursSummary.model_fields)
+EXPORT_FORMATS = ("csv", "ndjson")
+
+ANALYTICS_GROUPS = ("employee", "team", "shift")
+
+PUNCH_OUTCOMES = metrics.Counter("punch_outcomes", "Punches evaluated, by outcome.", ["outcome"])
+OUTCOMES = {
+    outcome: PUNCH_OUTCOMES.labels(outcome)
+    for outcome in ("accepted", REJECT_UNKNOWN_BADGE, REJECT_DUPLICATE_IN, REJECT_DUPLICATE_OUT, REJECT_UNAPPROVED_OVERTIME)
+}
+PUNCH_SECONDS = metrics.Histogram("punch_process_seconds", "Time spent in process_punch.")
+STAGE_SECONDS = metrics.Histogram("punch_stage_seconds", "Time spent in each process_punch stage.", ["stage"])
+# "context" is the joined employee and last-punch read, under the badge's lock.
+CONTEXT_STAGE = STAGE_SECONDS.labels("context")
+LOCK_STAGE = STAGE_SECONDS.labels("lock_wait")
+CLASSIFY_STAGE = STAGE_SECONDS.labels("classify")
+OVERTIME_STAGE = STAGE_SECONDS.labels("overtime_check")
+INSERT_STAGE = STAGE_SECONDS.labels("insert")
+
+class PunchContext:
+    """Store reads for a single punch, each loaded at most once.
+
+    The employee, its shift and the day's last punch come back from one
+    lookup; the overtime approval is only fetched the first time it is
+    asked for. Without a ``shift`` the employee's own is looked up.
+    """
+    __slots__ = ("employee", "shift", "punch_date", "last_punch", "_approval", "_approval_loaded")
+
+    def __init__(self, employee, punch_date: date, last_punch=None, shift: Optional[ShiftWindow] = None):
+        if shift is None and employee:
+            shift = shift_window(employee["shift_start_time"], employee["shift_end_time"])
+        self.employee = employee
+        self.shift = shift
+        self.punch_date = punch_date
+        self.last_punch = last_punch
+        self._approval = None
+        self._approval_loaded = False
+
+    @property
+    def approval(self):
+        if not self._approval_loaded:
+            self._approval = get_overtime_approval(self.employee["id"], self.punch_date)
+            self._approval_loaded = True
+        return self._approval
+
+    def preload_approval(self, approval) -> None:
+        self._approval = approval
+        self._approval_loaded = True
+
+    def record(self, punch: Dict) -> None:
+        # Mirror get_last_punch: on a timestamp tie the earlier punch stays last.
+        if self.last_punch is None or punch["timestamp"] > self.last_punch["timestamp"]:
+            self.last_punch = punch
+
+def employee_lock(employee):
+    """The stripe of ``employee_locks`` for the employee's badge."""
+    return employee_locks.lock(employee["badge_id"])
+
+def load_punch_context(badge_id: str, timestamp: datetime) -> PunchContext:
+    """Context for a punch by ``badge_id``; read it holding the badge's lock."""
+    entry, last_punch = get_employee_with_last_punch(badge_id, timestamp.date())
+    if entry is None:
+        return PunchContext(None, timestamp.date())
+    return PunchContext(entry.employee, timestamp.date(), last_punch, entry.shift)
 
 def is_end_of_day(timestamp: datetime) -> bool:
     return timestamp.hour == 23 and timestamp.minute >= 59
 
-def check_for_missing_punch_out(employee, timestamp):
-    last_punch = get_last_punch(employee.id, timestamp.date())
-    if last_punch and last_punch.punch_type in ["IN", "BREAK_IN", "OVERTIME_IN"]:
-        defaulter_punch = {
-            "employee_id": employee.id,
-            "punch_type": "DEFAULTER",
-            "timestamp": timestamp,
-            "is_late": False,
-            "lateness_minutes": 0,
-            "is_early": False,
-            "earliness_minutes": 0
-        }
+def missing_punch_out(employee, timestamp, last_punch) -> Optional[PunchRecord]:
+    if last_punch and last_punch["punch_type"] in ["IN", "BREAK_IN", "OVERTIME_IN"]:
+        return PunchRecord(employee["id"], "DEFAULTER", timestamp)
+    return None
+
+def check_for_missing_punch_out(employee, timestamp, context: Optional[PunchContext] = None):
+    if context is not None and context.punch_date == timestamp.date():
+        last_punch = context.last_punch
+    else:
+        last_punch = get_last_punch(employee["id"], timestamp.date())
+    defaulter_punch = missing_punch_out(employee, timestamp, last_punch)
+    if defaulter_punch:
         insert_punch(defaulter_punch)
-        logging.warning(f"Defaulter punch recorded for employee_id: {employee.id}")
-
-
-def determine_punch_type(employee, timestamp: datetime) -> Dict:
-    punch_minutes = timestamp.hour * 60 + timestamp.minute
-    shift_start = employee.shift_start_time
-    shift_end = employee.shift_end_time
-    start_minutes = shift_start.hour * 60 + shift_start.minute
-    end_minutes = shift_end.hour * 60 + shift_end.minute
-
-    result = {
-        "type": "UNKNOWN",
-        "is_late": False,
-        "lateness_minutes": 0,
-        "is_early": False,
-        "earliness_minutes": 0
-    }
+        if context is not None:
+            context.record(defaulter_punch)
+        logging.warning(f"Defaulter punch recorded for employee_id: {employee['id']}")
 
-    if abs(punch_minutes - start_minutes) <= TIME_WINDOW_MINUTES:
-        result["type"] = "IN"
-    elif punch_minutes > start_minutes + TIME_WINDOW_MINUTES:
-        result["type"] = "LATE_IN"
-        result["is_late"] = True
-        result["lateness_minutes"] = punch_minutes - start_minutes
-    elif abs(punch_minutes - end_minutes) <= TIME_WINDOW_MINUTES:
-        result["type"] = "OUT"
-    elif punch_minutes < end_minutes - TIME_WINDOW_MINUTES:
-        result["type"] = "OUT"
-        result["is_early"] = True
-        result["earliness_minutes"] = end_minutes - punch_minutes
-    elif start_minutes < punch_minutes < end_minutes:
-        last_punch = get_last_punch(employee.id, timestamp.date())
-        if last_punch and last_punch.punch_type in ["IN", "BREAK_IN"]:
-            result["type"] = "BREAK_OUT"
-        else:
-            result["type"] = "BREAK_IN"
-    elif punch_minutes > end_minutes + TIME_WINDOW_MINUTES:
-        last_punch = get_last_punch(employee.id, timestamp.date())
-        if last_punch and last_punch.punch_type in ["OUT", "BREAK_OUT"]:
-            result["type"] = "OVERTIME_IN"
-        else:
-            result["type"] = "OVERTIME_OUT"
-
-    return result
-
-
-def process_punch(badge_id: str, timestamp: datetime) -> Optional[Dict]:
-    employee = get_employee_by_badge(badge_id)
-    if not employee or not employee.is_active:
-        logging.error(f"Unknown or inactive badge ID: {badge_id}")
-        return None
+def sweep_missing_punch_outs(punch_date: date, timestamp: Optional[datetime] = None) -> List[PunchRecord]:
+    """Record a DEFAULTER punch for every active employee still clocked in on ``punch_date``.
+
+    Only the employees ``open_shifts`` reports as open are visited. Their
+    last punches are re-read in one batch to confirm it, and all defaulter
+    punches go out in a single bulk insert. Each day is swept at most once;
+    later calls return an empty list.
+    """
+    if not open_shifts.begin_sweep(punch_date):
+        logging.info(f"End-of-day defaulter check already ran for {punch_date}")
+        return []
+    timestamp = timestamp or datetime.combine(punch_date, END_OF_DAY)
+    candidates = open_shifts.open_employees(punch_date)
+    employees = get_employees_by_ids(candidates)
+    defaulter_punches = []
+    with employee_locks.hold(employee["badge_id"] for employee in employees.values()):
+        last_punches = get_last_punches((employee_id, punch_date) for employee_id in employees)
+        for employee_id in sorted(employees):
+            employee = employees[employee_id]
+            if not employee["is_active"]:
+                continue
+            defaulter_punch = missing_punch_out(employee, timestamp, last_punches.get((employee_id, punch_date)))
+            if defaulter_punch:
+                defaulter_punches.append(defaulter_punch)
+                logging.warning(f"Defaulter punch recorded for employee_id: {employee_id}")
+        if defaulter_punches:
+            insert_punches(defaulter_punches)
+    open_shifts.forget(punch_date)
+    return defaulter_punches
 
-    punch_info = determine_punch_type(employee, timestamp)
+
+def determine_punch_type(context: PunchContext, timestamp: datetime) -> Dict:
+    last_punch = context.last_punch
+    return context.shift.table.classify(timestamp.hour * 60 + timestamp.minute, last_punch["punch_type"] if last_punch else None)
+
+
+def _rejected(reason: str, counted: bool = True) -> Tuple[None, str]:
+    if counted and metrics.enabled:
+        OUTCOMES[reason].inc()
+    return None, reason
+
+def evaluate_punch(context: PunchContext, badge_id: str, timestamp: datetime,
+                   replay: bool = False, punch_info: Optional[Dict] = None) -> Tuple[Optional[PunchRecord], Optional[str]]:
+    """Classify a punch against its context without writing it.
+
+    Returns ``(new_punch, None)`` when the punch is accepted, or
+    ``(None, reason)`` with one of the ``REJECT_*`` reasons.
+    ``punch_info`` is the ``determine_punch_type`` result when the caller
+    already classified the punch against ``context``. With
+    ``replay`` set, for punches already counted and logged when they first
+    came in, nothing is recorded in the metrics or the log.
+    """
+    timed = metrics.enabled and not replay
+    report = not replay
+    employee = context.employee
+    if not employee or not employee["is_active"]:
+        if report:
+            logging.error(f"Unknown or inactive badge ID: {badge_id}")
+        return _rejected(REJECT_UNKNOWN_BADGE, report)
+
+    if punch_info is None:
+        if timed:
+            started = perf_counter_ns()
+        punch_info = determine_punch_type(context, timestamp)
+        if timed:
+            CLASSIFY_STAGE.observe_ns(perf_counter_ns() - started)
     punch_type = punch_info["type"]
 
-    last_punch = get_last_punch(employee.id, timestamp.date())
+    last_punch = context.last_punch
     if last_punch:
-        if last_punch.punch_type in ["IN", "BREAK_IN", "OVERTIME_IN"] and punch_type in ["IN", "BREAK_IN", "OVERTIME_IN"]:
-            logging.warning(f"Duplicate IN-type punch for employee_id: {employee.id}")
-            return None
-        if last_punch.punch_type in ["OUT", "BREAK_OUT", "OVERTIME_OUT"] and punch_type in ["OUT", "BREAK_OUT", "OVERTIME_OUT"]:
-            logging.warning(f"Duplicate OUT-type punch for employee_id: {employee.id}")
-            return None
+        if last_punch["punch_type"] in ["IN", "BREAK_IN", "OVERTIME_IN"] and punch_type in ["IN", "BREAK_IN", "OVERTIME_IN"]:
+            if report:
+                logging.warning(f"Duplicate IN-type punch for employee_id: {employee['id']}")
+            return _rejected(REJECT_DUPLICATE_IN, report)
+        if last_punch["punch_type"] in ["OUT", "BREAK_OUT", "OVERTIME_OUT"] and punch_type in ["OUT", "BREAK_OUT", "OVERTIME_OUT"]:
+            if report:
+                logging.warning(f"Duplicate OUT-type punch for employee_id: {employee['id']}")
+            return _rejected(REJECT_DUPLICATE_OUT, report)
 
     if punch_type in ["OVERTIME_IN", "OVERTIME_OUT"]:
-        approval = get_overtime_approval(employee.id, timestamp.date())
+        if timed:
+            started = perf_counter_ns()
+        approval = context.approval
+        if timed:
+            OVERTIME_STAGE.observe_ns(perf_counter_ns() - started)
         if not approval:
-            logging.warning(f"Unapproved overtime for employee_id: {employee.id}")
+            if report:
+                logging.warning(f"Unapproved overtime for employee_id: {employee['id']}")
+            return _rejected(REJECT_UNAPPROVED_OVERTIME, report)
+
+    new_punch = PunchRecord(
+        employee["id"], punch_type, timestamp, punch_info["is_late"], punch_info["lateness_minutes"],
+        punch_info["is_early"], punch_info["earliness_minutes"]
+    )
+    if timed:
+        OUTCOMES["accepted"].inc()
+    return new_punch, None
+
+
+def process_punch(badge_id: str, timestamp: datetime) -> Optional[PunchRecord]:
+    timed = metrics.enabled
+    if timed:
+        started = perf_counter_ns()
+    with employee_locks.lock(badge_id):
+        if timed:
+            reading = perf_counter_ns()
+            LOCK_STAGE.observe_ns(reading - started)
+        context = load_punch_context(badge_id, timestamp)
+        if timed:
+            CONTEXT_STAGE.observe_ns(perf_counter_ns() - reading)
+        new_punch, _ = evaluate_punch(context, badge_id, timestamp)
+        if new_punch is None:
+            if timed:
+                PUNCH_SECONDS.observe_ns(perf_counter_ns() - started)
             return None
 
-    new_punch = {
-        "employee_id": employee.id,
-        "punch_type": punch_type,
-        "timestamp": timestamp,
-        "is_late": punch_info["is_late"],
-        "lateness_minutes": punch_info["lateness_minutes"],
-        "is_early": punch_info["is_early"],
-        "earliness_minutes": punch_info["earliness_minutes"]
-    }
-    insert_punch(new_punch)
+        if timed:
+            inserting = perf_counter_ns()
+        insert_punch(new_punch)
+        if timed:
+            INSERT_STAGE.observe_ns(perf_counter_ns() - inserting)
+        context.record(new_punch)
 
-    if is_end_of_day(timestamp):
-        check_for_missing_punch_out(employee, timestamp)
+        if is_end_of_day(timestamp):
+            check_for_missing_punch_out(context.employee, timestamp, context)
 
+    if timed:
+        PUNCH_SECONDS.observe_ns(perf_counter_ns() - started)
     return new_punch
 
 
+def process_punches(punches: Iterable[Tuple[str, datetime]]) -> List[Dict]:
+    """Process a batch of ``(badge_id, timestamp)`` punches.
+
+    Punches are grouped by badge and handled in timestamp order within each
+    group. Each group's minutes are classified against the shift table in
+    one NumPy lookup, and the BREAK/OVERTIME types then resolved in order
+    against the type accepted before each punch. Employees, last punches and overtime approvals are each read once
+    for the whole batch, and every accepted punch (plus any end-of-day
+    defaulter punches) is written with a single bulk insert, holding the
+    locks of every badge in the batch from the read to the write.
+    Returns one result per input punch, in input order.
+    """
+    punches = list(punches)
+    employees = get_employees_by_badges({badge_id for badge_id, _ in punches})
+
+    day_keys = set()
+    for badge_id, timestamp in punches:
+        employee = employees.get(badge_id)
+        if employee:
+            day_keys.add((employee["id"], timestamp.date()))
+    with employee_locks.hold(employees):
+        last_punches = get_last_punches(day_keys)
+        approvals = get_overtime_approvals(day_keys)
+
+        results: List[Optional[Dict]] = [None] * len(punches)
+        accepted = []
+        contexts = {}
+        order = sorted(range(len(punches)), key=lambda i: (punches[i][0], punches[i][1]))
+        for badge_id, group in groupby(order, key=lambda i: punches[i][0]):
+            group = list(group)
+            employee = employees.get(badge_id)
+            # One employee, so one shift: look the whole group up in its table at once.
+            shift = classified = None
+            if employee:
+                shift = shift_window(employee["shift_start_time"], employee["shift_end_time"])
+            if employee and employee["is_active"]:
+                classified = classify_minutes(shift.table, minutes_of_day([punches[i][1] for i in group]))
+            for position, i in enumerate(group):
+                timestamp = punches[i][1]
+                key = (employee["id"], timestamp.date()) if employee else None
+                context = contexts.get(key)
+                if context is None:
+                    context = PunchContext(employee, timestamp.date(), last_punches.get(key), shift)
+                    context.preload_approval(approvals.get(key))
+                    if key:
+                        contexts[key] = context
+
+                punch_info = None
+                if classified is not None:
+                    # BREAK and OVERTIME labels follow the type accepted just before.
+                    last_punch = context.last_punch
+                    punch_info = classified.result(position, last_punch["punch_type"] if last_punch else None)
+                new_punch, reason = evaluate_punch(context, badge_id, timestamp, punch_info=punch_info)
+                if new_punch is None:
+                    results[i] = {"status": "rejected", "reason": reason}
+                    continue
+
+                accepted.append(new_punch)
+                context.record(new_punch)
+                if is_end_of_day(timestamp):
+                    defaulter_punch = missing_punch_out(employee, timestamp, context.last_punch)
+                    if defaulter_punch:
+                        accepted.append(defaulter_punch)
+                        context.record(defaulter_punch)
+                        logging.warning(f"Defaulter punch recorded for employee_id: {employee['id']}")
+                results[i] = {"status": "accepted", "punch": new_punch}
+
+        if accepted:
+            insert_punches(accepted)
+    return results
+
+
+def reclassify_day(employee, punch_date: date, timestamps: Iterable[datetime]) -> List[PunchRecord]:
+    """Classify the employee's day again from scratch with ``timestamps`` added.
+
+    The day's stored punch times and the new ones, each time once, are
+    replayed in timestamp order through the same rules as ``process_punch``,
+    and the result replaces the stored day; no other day is touched. Only
+    the new punches are counted in the metrics and logged. A DEFAULTER
+    punch from an end-of-day sweep is kept only if the day still ends
+    clocked in. Returns the day's new punches.
+    """
+    with employee_lock(employee):
+        stored = get_all_punches_for_day(employee["id"], punch_date)
+        defaulters = [punch for punch in stored if punch["punch_type"] == "DEFAULTER"]
+        stored_times = {punch["timestamp"] for punch in stored if punch["punch_type"] != "DEFAULTER"}
+        # A timestamp already stored (e.g. a resent offline punch) is replayed once.
+        replay = sorted(stored_times.union(timestamps))
+
+        context = PunchContext(employee, punch_date)
+        day = []
+        for timestamp in replay:
+            # Only the new punches count towards the outcome metrics and get logged.
+            new_punch, _ = evaluate_punch(context, employee["badge_id"], timestamp, replay=timestamp in stored_times)
+            if new_punch is None:
+                continue
+            day.append(new_punch)
+            context.record(new_punch)
+            if is_end_of_day(timestamp):
+                defaulter_punch = missing_punch_out(employee, timestamp, context.last_punch)
+                if defaulter_punch:
+                    day.append(defaulter_punch)
+                    context.record(defaulter_punch)
+        for swept in defaulters:
+            defaulter_punch = missing_punch_out(employee, swept["timestamp"], context.last_punch)
+            if defaulter_punch:
+                day.append(defaulter_punch)
+                context.record(defaulter_punch)
+
+        replace_day_punches(employee["id"], punch_date, day)
+    return day
+
+
+def process_synced_punch(badge_id: str, timestamp: datetime) -> Optional[PunchRecord]:
+    """``process_punch`` for punches that may be older than the day's last punch.
+
+    A punch that lands before the day's last punch reclassifies that
+    (employee, day) with ``reclassify_day``; returns the punch as stored,
+    or None if it was rejected.
+    """
+    with employee_locks.lock(badge_id):
+        entry, last_punch = get_employee_with_last_punch(badge_id, timestamp.date())
+        employee = entry.employee if entry else None
+        if not (employee and employee["is_active"] and last_punch and timestamp < last_punch["timestamp"]):
+            return process_punch(badge_id, timestamp)
+        logging.info(f"Late punch for employee_id: {employee['id']}; reclassifying {timestamp.date()}")
+        day = reclassify_day(employee, timestamp.date(), [timestamp])
+    return next((punch for punch in day if punch["timestamp"] == timestamp and punch["punch_type"] != "DEFAULTER"), None)
+
+
+def process_synced_punches(punches: Iterable[Tuple[str, datetime]]) -> List[Optional[PunchRecord]]:
+    """``process_synced_punch`` for each punch, in the order given."""
+    return [process_synced_punch(badge_id, timestamp) for badge_id, timestamp in punches]
+
+
+def punch_recorded(badge_id: str, timestamp: datetime) -> bool:
+    """Whether a punch at exactly ``timestamp`` is stored for the badge's employee."""
+    employee = get_employee_by_badge(badge_id)
+    if not employee:
+        return False
+    return any(punch["timestamp"] == timestamp for punch in get_all_punches_for_day(employee["id"], timestamp.date()))
+
+
 def calculate_work_hours(employee_id: int, date: datetime.date) -> Dict:
-    punches = get_all_punches_for_day(employee_id, date)
-    total_work = total_break = total_overtime = 0.0
-    last_in = None
-    last_type = None
-
-    for punch in punches:
-        if punch.punch_type in ["IN", "BREAK_IN", "OVERTIME_IN"]:
-            last_in = punch.timestamp
-            last_type = punch.punch_type
-        elif punch.punch_type in ["OUT", "BREAK_OUT", "OVERTIME_OUT"] and last_in:
-            duration = (punch.timestamp - last_in).total_seconds() / 3600.0
-            if last_type == "OVERTIME_IN":
-                total_overtime += duration
-            else:
-                total_work += duration
-            last_in = None
-            last_type = None
-        elif punch.punch_type == "DEFAULTER" and last_in:
-            shift_end = get_employee_shift_time(employee_id)["end"]
-            shift_end_time = datetime.combine(date, shift_end)
-            duration = (shift_end_time - last_in).total_seconds() / 3600.0
-            total_work += duration
-            last_in = None
-            last_type = None
-
-    for i in range(len(punches) - 1):
-        if punches[i].punch_type == "BREAK_OUT" and punches[i+1].punch_type == "BREAK_IN":
-            break_duration = (punches[i+1].timestamp - punches[i].timestamp).total_seconds() / 3600.0
-            total_break += break_duration
+    """Work, break and overtime hours for one employee's day.
+
+    Served from the store's running totals when it keeps them; otherwise,
+    or when a DEFAULTER needs the shift end, the day is walked in full.
+    """
+    totals = get_day_totals(employee_id, date)
+    if totals is None:
+        shift_end = lambda: get_employee_shift_time(employee_id)["end"]
+        totals = DayTotals.from_punches(date, get_all_punches_for_day(employee_id, date), shift_end)
+    return totals.summary()
+
+
+def calculate_work_hours_bulk(employee_ids: Iterable[int], start_date: date, end_date: date) -> Dict[Tuple[int, date], Dict]:
+    """``calculate_work_hours`` for every employee and day from ``start_date`` to ``end_date``.
 
+    Loads the whole range once as columns and computes all summaries with
+    grouped NumPy operations; shift times are read once per employee that
+    has a DEFAULTER punch. Returns a summary for every (employee_id, date)
+    key, identical to what the per-day function returns.
+    """
+    employee_ids = sorted(set(employee_ids))
+    columns = PunchColumns.from_punches(get_punches_for_range(employee_ids, start_date, end_date))
+    summaries = work_hours_by_day(columns, lambda employee_id: get_employee_shift_time(employee_id)["end"])
+    days = list(date_range(start_date, end_date))
     return {
-        "work_hours": round(total_work, 2),
-        "break_hours": round(total_break, 2),
-        "overtime_hours": round(total_overtime, 2)
+        (employee_id, day): summaries.get((employee_id, day)) or {"work_hours": 0.0, "break_hours": 0.0, "overtime_hours": 0.0}
+        for employee_id in employee_ids
+        for day in days
     }
+
+
+WorkHoursBulk = Callable[[Iterable[int], date, date], Dict[Tuple[int, date], Dict]]
+
+def _work_hours_chunks(start_date: date, end_date: date, employee_ids: Optional[Iterable[int]],
+                       chunk_size: int, bulk: WorkHoursBulk) -> Iterator[Tuple[date, List[int], Dict[Tuple[int, date], Dict]]]:
+    employee_ids = sorted(set(employee_ids)) if employee_ids is not None else get_employee_ids()
+    for day in date_range(start_date, end_date):
+        for first in range(0, len(employee_ids), chunk_size):
+            chunk = employee_ids[first:first + chunk_size]
+            yield day, chunk, bulk(chunk, day, day)
+
+def export_work_hours(start_date: date, end_date: date, fmt: str = "csv", employee_ids: Optional[Iterable[int]] = None,
+                      chunk_size: int = EXPORT_CHUNK_SIZE, bulk: Optional[WorkHoursBulk] = None) -> Iterator[str]:
+    """Work-hour summaries for every employee (all of them by default) and day, as CSV or NDJSON text.
+
+    Rows come ordered by date, then employee_id. Summaries are computed for
+    one day and ``chunk_size`` employees at a time and each chunk is yielded
+    as soon as it is formatted, so memory stays bounded by the chunk however
+    long the range is, and the first bytes are ready after one chunk.
+    ``bulk`` replaces ``calculate_work_hours_bulk``, e.g. with a sharded one.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "csv":
+        yield ",".join(EXPORT_FIELDS) + "\n"
+    for day, chunk, summaries in _work_hours_chunks(start_date, end_date, employee_ids, chunk_size, bulk or calculate_work_hours_bulk):
+        day_text = day.isoformat()
+        lines = []
+        for employee_id in chunk:
+            summary = summaries[(employee_id, day)]
+            work, breaks, overtime = float(summary["work_hours"]), float(summary["break_hours"]), float(summary["overtime_hours"])
+            if fmt == "csv":
+                lines.append(f"{day_text},{employee_id},{work},{breaks},{overtime}\n")
+            else:
+                lines.append(json.dumps({
+                    "date": day_text, "employee_id": employee_id,
+                    "work_hours": work, "break_hours": breaks, "overtime_hours": overtime
+                }) + "\n")
+        yield "".join(lines)
+
+
+RollupTotals = Callable[[date, date], Dict[int, Rollup]]
+TypeCounts = Callable[[str, date, date], Dict[int, int]]
+
+def employees_with_punch_type(punch_type: str, start_date: date, end_date: date, min_count: int = 1,
+                              type_counts: Optional[TypeCounts] = None) -> List[Dict]:
+    """Employees with at least ``min_count`` punches of ``punch_type`` in the range, from the rollups.
+
+    ``type_counts`` replaces ``punch_rollups.type_counts``, e.g. with a sharded one.
+    """
+    if punch_type not in PUNCH_TYPES:
+        raise ValueError(f"Unknown punch type {punch_type!r}; expected one of {', '.join(PUNCH_TYPES)}")
+    counts = (type_counts or punch_rollups.type_counts)(punch_type, start_date, end_date)
+    return [{"employee_id": employee_id, "count": count} for employee_id, count in sorted(counts.items()) if count >= min_count]
+
+
+def _group_key(group_by: str, employee_id: int, employee) -> object:
+    if group_by == "employee":
+        return employee_id
+    if not employee:
+        return None
+    if group_by == "team":
+        return employee.get("team")
+    return f"{employee['shift_start_time']:%H:%M}-{employee['shift_end_time']:%H:%M}"
+
+def lateness_summary(start_date: date, end_date: date, group_by: str = "employee",
+                     totals: Optional[RollupTotals] = None) -> List[Dict]:
+    """Late punches and average lateness per employee, team or shift over the range, from the rollups.
+
+    Employees without a ``team`` are grouped under None. ``totals``
+    replaces ``punch_rollups.totals``, e.g. with a sharded one.
+    """
+    if group_by not in ANALYTICS_GROUPS:
+        raise ValueError(f"Unsupported grouping {group_by!r}; expected one of {', '.join(ANALYTICS_GROUPS)}")
+    rollups = (totals or punch_rollups.totals)(start_date, end_date)
+    employees = get_employees_by_ids(rollups) if group_by != "employee" else {}
+    groups: Dict[object, List[int]] = {}
+    for employee_id, rollup in rollups.items():
+        group = groups.setdefault(_group_key(group_by, employee_id, employees.get(employee_id)), [0, 0, 0])
+        group[0] += 1
+        group[1] += rollup.late
+        group[2] += rollup.lateness_minutes
+    return [
+        {
+            "group": key,
+            "employees": members,
+            "late_punches": late,
+            "lateness_minutes": minutes,
+            "average_lateness_minutes": round(minutes / late, 2) if late else 0.0
+        }
+        for key, (members, late, minutes) in sorted(groups.items(), key=lambda item: (item[0] is None, str(item[0])))
+    ]
+
+
+def attendance_summary(start_date: date, end_date: date, totals: Optional[RollupTotals] = None) -> List[Dict]:
+    """Days present, punches and lateness/earliness per employee over the range, from the rollups."""
+    rollups = (totals or punch_rollups.totals)(start_date, end_date)
+    return [{"employee_id": employee_id, **rollup.to_dict()} for employee_id, rollup in sorted(rollups.items())]
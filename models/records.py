@@ -0,0 +1,48 @@
+from datetime import datetime
+
+PUNCH_FIELDS = ("employee_id", "punch_type", "timestamp", "is_late", "lateness_minutes", "is_early", "earliness_minutes")
+
+
+class PunchRecord:
+    """One punch as built by the pipeline and held by the in-memory stores.
+
+    Has the fields of ``models.schema.Punch`` in slots, without a per-punch
+    dict or any validation, and supports key access like the punch dicts
+    other backends return, so ``punch["timestamp"]``, ``punch.get(...)``
+    and ``dict(punch)`` work on either. Records are not changed once built.
+    """
+    __slots__ = PUNCH_FIELDS
+
+    def __init__(self, employee_id: int, punch_type: str, timestamp: datetime, is_late: bool = False,
+                 lateness_minutes: int = 0, is_early: bool = False, earliness_minutes: int = 0):
+        self.employee_id = employee_id
+        self.punch_type = punch_type
+        self.timestamp = timestamp
+        self.is_late = is_late
+        self.lateness_minutes = lateness_minutes
+        self.is_early = is_early
+        self.earliness_minutes = earliness_minutes
+
+    def __getitem__(self, field: str):
+        if field not in PUNCH_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in PUNCH_FIELDS else default
+
+    def keys(self):
+        return PUNCH_FIELDS
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in PUNCH_FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PunchRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in PUNCH_FIELDS)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PunchRecord({self.to_dict()!r})"
@@ -1,5 +1,7 @@
 from datetime import datetime, time, date
-from pydantic import BaseModel
+from typing import List
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
 
 class Employee(BaseModel):
     id: int
@@ -8,6 +10,18 @@ class Employee(BaseModel):
     shift_start_time: time
     shift_end_time: time
 
+class PunchRequest(BaseModel):
+    badge_id: str
+    timestamp: datetime
+
+class PunchPayload(TypedDict):
+    """A ``PunchRequest`` validated into a plain dict, for uploaded batches."""
+    badge_id: str
+    timestamp: datetime
+
+# Validates a whole uploaded batch from its JSON bytes in one call.
+PUNCH_BATCH = TypeAdapter(List[PunchPayload])
+
 class Punch(BaseModel):
     employee_id: int
     punch_type: str
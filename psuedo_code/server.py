@@ -1,14 +1,19 @@
 ASYNC FUNCTION process_punch(badge_id, timestamp):
-    # Database Flow: Query Employee table to find employee
-    employee = EXECUTE SQL "SELECT * FROM Employee WHERE badge_id = :badge_id" WITH badge_id
+    # Runs holding the badge's stripe of employee_locks, so two punches for one badge cannot both pass the duplicate check
+    # Database Flow: One round trip loads the employee and their last punch of the day
+    context = EXECUTE SQL "SELECT e.*, p.* FROM Employee e
+                           LEFT JOIN Punch p ON p.id = (SELECT id FROM Punch WHERE employee_id = e.id AND DATE(timestamp) = :date
+                                                        ORDER BY timestamp DESC LIMIT 1)
+                           WHERE e.badge_id = :badge_id"
+              WITH badge_id, timestamp.date
+    employee = context.employee
+    last_punch = context.last_punch
     IF employee IS NULL OR NOT employee.is_active:
         LOG "Unknown or inactive badge ID: badge_id"
         ALERT_ADMIN "Unknown badge ID detected"
         RETURN NULL
 
-    # Database Flow: Check last punch to detect duplicate/invalid punches
-    last_punch = EXECUTE SQL "SELECT * FROM Punch WHERE employee_id = :employee_id AND DATE(timestamp) = :date ORDER BY timestamp DESC LIMIT 1" 
-                 WITH employee.id, timestamp.date
+    # Check last punch (already in context) to detect duplicate/invalid punches
     IF last_punch EXISTS:
         IF last_punch.punch_type IN ["IN", "BREAK_IN", "OVERTIME_IN"] AND punch_type IN ["IN", "BREAK_IN", "OVERTIME_IN"]:
             LOG "Duplicate IN-type punch detected"
@@ -20,14 +25,14 @@ ASYNC FUNCTION process_punch(badge_id, timestamp):
             RETURN NULL
 
     # Determine punch type and late/early status
-    punch_info = CALL determine_punch_type(employee, timestamp)
+    punch_info = CALL determine_punch_type(context, timestamp)
     punch_type = punch_info.type
     is_late = punch_info.is_late
     lateness_minutes = punch_info.lateness_minutes
     is_early = punch_info.is_early
     earliness_minutes = punch_info.earliness_minutes
 
-    # Validate overtime punches
+    # Validate overtime punches (second and last read, only for overtime)
     IF punch_type IN ["OVERTIME_IN", "OVERTIME_OUT"]:
         approval = EXECUTE SQL "SELECT * FROM OvertimeApproval WHERE employee_id = :employee_id AND date = :date AND is_approved = TRUE" 
                   WITH employee.id, timestamp.date
@@ -49,14 +54,16 @@ ASYNC FUNCTION process_punch(badge_id, timestamp):
                  VALUES (:employee_id, :punch_type, :timestamp, :is_late, :lateness_minutes, :is_early, :earliness_minutes)" 
                  WITH new_punch
     COMMIT TRANSACTION
+    context.last_punch = new_punch
 
     # Check for missing punches at end of day
     IF CALL is_end_of_day(timestamp):
-        CALL check_for_missing_punch_out(employee, timestamp)
+        CALL check_for_missing_punch_out(employee, timestamp, context)
 
     RETURN new_punch
 
-FUNCTION determine_punch_type(employee, timestamp):
+FUNCTION determine_punch_type(context, timestamp):
+    employee = context.employee
     punch_time = EXTRACT time FROM timestamp
     shift_start = employee.shift_start_time
     shift_end = employee.shift_end_time
@@ -91,16 +98,14 @@ FUNCTION determine_punch_type(employee, timestamp):
     # Check for BREAK_IN or BREAK_OUT (assume breaks occur between shift start and end)
     ELSE IF punch_minutes > start_minutes AND punch_minutes < end_minutes:
         # Determine if BREAK_IN or BREAK_OUT based on last punch
-        last_punch = EXECUTE SQL "SELECT * FROM Punch WHERE employee_id = :employee_id AND DATE(timestamp) = :date ORDER BY timestamp DESC LIMIT 1" 
-                     WITH employee.id, timestamp.date
+        last_punch = context.last_punch
         IF last_punch EXISTS AND last_punch.punch_type IN ["IN", "BREAK_IN"]:
             result.type = "BREAK_OUT"
         ELSE:
             result.type = "BREAK_IN"
     # Check for OVERTIME_IN or OVERTIME_OUT
     ELSE IF punch_minutes > end_minutes + time_window:
-        last_punch = EXECUTE SQL "SELECT * FROM Punch WHERE employee_id = :employee_id AND DATE(timestamp) = :date ORDER BY timestamp DESC LIMIT 1" 
-                     WITH employee.id, timestamp.date
+        last_punch = context.last_punch
         IF last_punch EXISTS AND last_punch.punch_type IN ["OUT", "BREAK_OUT"]:
             result.type = "OVERTIME_IN"
         ELSE:
@@ -112,10 +117,13 @@ FUNCTION is_end_of_day(timestamp):
     # Check if it's end of day (e.g., 23:59)
     RETURN timestamp.hours = 23 AND timestamp.minutes >= 59
 
-FUNCTION check_for_missing_punch_out(employee, timestamp):
-    # Database Flow: Query Punch table for last punch of the day
-    last_punch = EXECUTE SQL "SELECT * FROM Punch WHERE employee_id = :employee_id AND DATE(timestamp) = :date ORDER BY timestamp DESC LIMIT 1" 
-                 WITH employee.id, timestamp.date
+FUNCTION check_for_missing_punch_out(employee, timestamp, context = NULL):
+    # Reuse the caller's context when it has one; otherwise query the last punch of the day
+    IF context EXISTS:
+        last_punch = context.last_punch
+    ELSE:
+        last_punch = EXECUTE SQL "SELECT * FROM Punch WHERE employee_id = :employee_id AND DATE(timestamp) = :date ORDER BY timestamp DESC LIMIT 1" 
+                     WITH employee.id, timestamp.date
 
     # If last punch was IN, BREAK_IN, or OVERTIME_IN, mark as defaulter
     IF last_punch EXISTS AND last_punch.punch_type IN ["IN", "BREAK_IN", "OVERTIME_IN"]:
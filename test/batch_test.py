@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, time, date, timedelta
+
+import main
+from main import process_punch, process_punches
+from utils.helper import mock_punches
+from utils.overtime_approvals import OvertimeApprovalIndex
+
+def setup_function():
+    mock_punches.clear()
+
+def random_punches(seed, count):
+    rng = random.Random(seed)
+    start = datetime.combine(date.today(), time(0, 0))
+    return [
+        (rng.choice(["123456", "999999"]), start + timedelta(minutes=rng.randint(0, 24 * 60 - 1)))
+        for _ in range(count)
+    ]
+
+def test_batch_matches_sequential_processing():
+    punches = random_punches(3, 60)
+
+    expected = [process_punch(badge_id, ts) for badge_id, ts in sorted(punches)]
+    expected_store = list(mock_punches)
+    mock_punches.clear()
+
+    results = process_punches(punches)
+    by_input = {punch: result for punch, result in zip(punches, results)}
+
+    assert [by_input[p].get("punch") for p in sorted(punches)] == expected
+    assert sorted(mock_punches, key=lambda p: p["timestamp"]) == sorted(expected_store, key=lambda p: p["timestamp"])
+
+def test_batch_reports_reason_per_input_in_order():
+    t = datetime.combine(date.today(), time(9, 0))
+
+    results = process_punches([
+        ("123456", t + timedelta(minutes=5)),
+        ("000000", t),
+        ("123456", t),
+    ])
+
+    assert results[0] == {"status": "rejected", "reason": main.REJECT_DUPLICATE_IN}
+    assert results[1] == {"status": "rejected", "reason": main.REJECT_UNKNOWN_BADGE}
+    assert results[2]["status"] == "accepted"
+    assert results[2]["punch"]["punch_type"] == "IN"
+
+def test_batch_resolves_types_against_the_punch_before(memory_storage):
+    night_shift = {"id": 2, "badge_id": "222222", "is_active": True, "shift_start_time": time(22, 0), "shift_end_time": time(6, 0)}
+    day = date.today()
+    # Every punch between 06:11 and 21:49 falls in the OVERTIME window, so
+    # each one's type depends on the type accepted just before it.
+    punches = [("222222", datetime.combine(day, time(hour))) for hour in (6, 7, 8, 9, 10, 22)]
+
+    def run(process):
+        memory_storage([night_shift], approvals=OvertimeApprovalIndex([{"employee_id": 2, "date": day, "is_approved": True}]))
+        return process()
+
+    expected = run(lambda: [process_punch(badge_id, ts) for badge_id, ts in punches])
+    results = run(lambda: process_punches(list(reversed(punches))))
+
+    assert [result.get("punch") for result in reversed(results)] == expected
+    assert [punch and punch["punch_type"] for punch in expected] == ["OUT", "OVERTIME_IN", "OVERTIME_OUT", None, None, "IN"]
+
+def test_batch_writes_with_one_bulk_insert(monkeypatch):
+    inserts = []
+    monkeypatch.setattr(main, "insert_punch", lambda punch: inserts.append([punch]))
+    monkeypatch.setattr(main, "insert_punches", lambda punches: inserts.append(list(punches)))
+    t = datetime.combine(date.today(), time(9, 0))
+
+    process_punches([("123456", t), ("123456", t.replace(hour=16, minute=30))])
+
+    assert len(inserts) == 1
+    assert len(inserts[0]) == 2
+
+def test_batch_route_validates_the_whole_upload():
+    from fastapi.testclient import TestClient
+    from Background.task import app, replay_filter
+    replay_filter.clear()
+    t = datetime.combine(date.today(), time(9, 0))
+
+    with TestClient(app) as client:
+        accepted = client.post("/punches/batch", json=[{"badge_id": "123456", "timestamp": t.isoformat()}])
+        invalid = client.post("/punches/batch", json=[{"badge_id": "123456", "timestamp": t.isoformat()}, {"badge_id": 7}])
+        malformed = client.post("/punches/offline", content=b"[{", headers={"content-type": "application/json"})
+        schema = client.get("/openapi.json").json()["paths"]["/punches/batch"]["post"]["requestBody"]
+
+    assert accepted.json()["results"] == [{"status": "accepted", "punch": {
+        "employee_id": 1, "punch_type": "IN", "timestamp": t.isoformat(), "is_late": False,
+        "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0
+    }}]
+    assert invalid.status_code == 422
+    assert [error["loc"] for error in invalid.json()["detail"]] == [["body", 1, "badge_id"], ["body", 1, "timestamp"]]
+    assert malformed.status_code == 422
+    assert len(mock_punches) == 1
+    assert schema["content"]["application/json"]["schema"]["items"]["required"] == ["badge_id", "timestamp"]
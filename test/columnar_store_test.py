@@ -0,0 +1,120 @@
+import random
+from datetime import datetime, time, date, timedelta
+
+import numpy as np
+
+from main import process_punch, calculate_work_hours
+from utils import helper
+from utils.columnar_store import ColumnarPunchStore, RECORD_DTYPE, punch_record
+from utils.helper import mock_employees, mock_punches, mock_overtime_approvals
+from utils.punch_index import PunchIndex
+from utils.punch_types import PUNCH_TYPES
+from utils.storage import MemoryStorage
+
+def random_punches(seed, count):
+    rng = random.Random(seed)
+    start = datetime(2025, 7, 21)
+    return [{
+        "employee_id": rng.randint(1, 4),
+        "punch_type": rng.choice(PUNCH_TYPES),
+        "timestamp": start + timedelta(seconds=rng.randint(0, 2 * 86400), microseconds=rng.choice([0, 250000])),
+        "is_late": rng.random() < 0.2,
+        "lateness_minutes": rng.randint(0, 600),
+        "is_early": rng.random() < 0.2,
+        "earliness_minutes": rng.randint(0, 600)
+    } for _ in range(400)]
+
+def test_columnar_store_matches_punch_index():
+    punches = random_punches(17, 400)
+    index = PunchIndex(punches)
+    store = ColumnarPunchStore(punches)
+
+    assert len(store) == len(index)
+    for employee_id in range(1, 5):
+        for day in [date(2025, 7, 21), date(2025, 7, 22), date(2025, 7, 23)]:
+            assert store.day(employee_id, day) == index.day(employee_id, day)
+            expected = index.last(employee_id, day)
+            assert (store.last(employee_id, day) is None) == (expected is None)
+            if expected is not None:
+                assert store.last(employee_id, day) == expected
+
+def test_row_view_supports_attribute_and_key_access():
+    ts = datetime(2025, 7, 21, 9, 15, 30, 125)
+    store = ColumnarPunchStore([{
+        "employee_id": 7, "punch_type": "LATE_IN", "timestamp": ts,
+        "is_late": True, "lateness_minutes": 15, "is_early": False, "earliness_minutes": 0
+    }])
+
+    row = store.last(7, ts.date())
+
+    assert row.timestamp == ts and row["timestamp"] == ts
+    assert row.punch_type == "LATE_IN" and row["is_late"] is True
+    assert row.lateness_minutes == 15
+    assert not hasattr(row, "__dict__")
+
+def test_memory_storage_runs_on_columnar_store():
+    store = ColumnarPunchStore()
+    previous = helper.set_storage(MemoryStorage(mock_employees, store, mock_overtime_approvals))
+    try:
+        process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+        assert process_punch("123456", datetime.combine(date.today(), time(9, 5))) is None
+        process_punch("123456", datetime.combine(date.today(), time(16, 30)))
+        summary = calculate_work_hours(1, date.today())
+    finally:
+        helper.set_storage(previous)
+
+    mock_punches.clear()
+    process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+    process_punch("123456", datetime.combine(date.today(), time(16, 30)))
+    assert summary == calculate_work_hours(1, date.today())
+    assert len(store) == 2
+
+def test_clear_empties_columns():
+    store = ColumnarPunchStore(random_punches(3, 10))
+    store.clear()
+
+    assert len(store) == 0
+    assert store.nbytes() == 0
+
+
+def test_sealed_rows_merge_with_later_appends():
+    base = datetime(2024, 5, 6, 9, 0)
+    punches = [
+        {"employee_id": 1, "punch_type": "IN", "timestamp": base, "is_late": False,
+         "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0},
+        {"employee_id": 1, "punch_type": "OUT", "timestamp": base + timedelta(hours=8), "is_late": False,
+         "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0},
+    ]
+    store = ColumnarPunchStore()
+    store.extend_records(np.array([punch_record(p) for p in punches], dtype=RECORD_DTYPE))
+    store.append({**punches[0], "punch_type": "BREAK_OUT", "timestamp": base + timedelta(hours=4)})
+
+    assert [row.punch_type for row in store.day(1, base.date())] == ["IN", "BREAK_OUT", "OUT"]
+    assert store.last(1, base.date()) == punches[1]
+
+def test_replace_day_matches_punch_index_before_and_after_sealing():
+    punches = random_punches(21, 400)
+    index = PunchIndex(punches[:300])
+    store = ColumnarPunchStore()
+    store.extend_records(np.array([punch_record(p) for p in punches[:300]], dtype=RECORD_DTYPE))
+    for punch in punches[300:]:
+        index.append(punch)
+        store.append(punch)
+    days = [date(2025, 7, 21), date(2025, 7, 22), date(2025, 7, 23)]
+
+    for employee_id, day in [(1, days[0]), (2, days[1]), (3, days[2])]:
+        replacement = [dict(p, punch_type="IN") for p in index.day(employee_id, day)[1:]]
+        index.replace_day(employee_id, day, replacement)
+        store.replace_day(employee_id, day, replacement)
+    index.replace_day(4, days[1], [])
+    store.replace_day(4, days[1], [])
+
+    for sealed in (False, True):
+        if sealed:
+            store.seal()
+        assert len(store) == len(index) == len(store.records()) == len(list(store))
+        for employee_id in range(1, 5):
+            for day in days:
+                assert store.day(employee_id, day) == index.day(employee_id, day)
+                assert store.last(employee_id, day) == index.last(employee_id, day)
+                assert store.totals(employee_id, day).summary() == index.totals(employee_id, day).summary()
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+import pytest
+
+from utils import helper
+from utils.helper import open_shifts
+from utils.overtime_approvals import OvertimeApprovalIndex
+from utils.punch_index import PunchIndex
+from utils.storage import MemoryStorage
+
+def make_punch(employee_id: int, timestamp: datetime, punch_type: str = "IN", **fields) -> dict:
+    """A punch dict as the pipeline stores it: on time unless ``fields`` say otherwise."""
+    punch = {
+        "employee_id": employee_id,
+        "punch_type": punch_type,
+        "timestamp": timestamp,
+        "is_late": False,
+        "lateness_minutes": 0,
+        "is_early": False,
+        "earliness_minutes": 0
+    }
+    punch.update(fields)
+    return punch
+
+@pytest.fixture
+def approvals():
+    """Overtime approved today for employee 1, built fresh for each test."""
+    return OvertimeApprovalIndex([{"employee_id": 1, "date": date.today(), "is_approved": True}])
+
+@pytest.fixture
+def memory_storage():
+    """Call with employees (and optionally punches and approvals) to make a
+    ``MemoryStorage`` the current backend for the test; returns its punches.
+    Open shifts are cleared before and after."""
+    previous = helper.get_storage()
+
+    def use(employees, punches=None, approvals=None):
+        punches = PunchIndex() if punches is None else punches
+        helper.set_storage(MemoryStorage(employees, punches, approvals if approvals is not None else OvertimeApprovalIndex()))
+        open_shifts.clear()
+        return punches
+
+    yield use
+    helper.set_storage(previous)
+    open_shifts.clear()
@@ -0,0 +1,78 @@
+import pickle
+import random
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+from main import calculate_work_hours, calculate_work_hours_bulk
+from utils import helper
+from utils.columnar_store import ColumnarPunchStore
+from utils.helper import mock_employees, mock_overtime_approvals, insert_punch
+from utils.punch_index import PunchIndex
+from utils.punch_types import PUNCH_TYPES
+from utils.storage import MemoryStorage
+
+START = date(2025, 7, 21)
+
+def random_punch(rng):
+    day = START + timedelta(days=rng.randint(0, 2))
+    return {
+        "employee_id": 1,
+        "punch_type": rng.choice(PUNCH_TYPES),
+        # Whole minutes so that timestamp ties are common.
+        "timestamp": datetime.combine(day, time(0, 0)) + timedelta(minutes=rng.randint(0, 24 * 60 - 1)),
+        "is_late": False,
+        "lateness_minutes": 0,
+        "is_early": False,
+        "earliness_minutes": 0
+    }
+
+@pytest.fixture(params=[PunchIndex, ColumnarPunchStore])
+def punch_store(request):
+    store = request.param()
+    previous = helper.set_storage(MemoryStorage(mock_employees, store, mock_overtime_approvals))
+    yield store
+    helper.set_storage(previous)
+
+def test_running_totals_match_full_recompute(punch_store):
+    rng = random.Random(11)
+    end = START + timedelta(days=2)
+    for _ in range(600):
+        insert_punch(random_punch(rng))
+        if rng.random() < 0.3:
+            day = START + timedelta(days=rng.randint(0, 2))
+            assert calculate_work_hours(1, day) == calculate_work_hours_bulk([1], day, day)[(1, day)]
+
+    expected = calculate_work_hours_bulk([1], START, end)
+    for offset in range(3):
+        day = START + timedelta(days=offset)
+        assert calculate_work_hours(1, day) == expected[(1, day)]
+
+def test_out_of_order_punch_rebuilds_only_its_day(punch_store):
+    day = datetime.combine(START, time(0, 0))
+    for hour, punch_type in [(9, "IN"), (17, "OUT")]:
+        insert_punch({**random_punch(random.Random(0)), "punch_type": punch_type, "timestamp": day + timedelta(hours=hour)})
+    assert calculate_work_hours(1, START) == {"work_hours": 8.0, "break_hours": 0.0, "overtime_hours": 0.0}
+    totals = punch_store.totals(1, START)
+
+    insert_punch({**random_punch(random.Random(0)), "punch_type": "BREAK_OUT", "timestamp": day + timedelta(hours=12)})
+    insert_punch({**random_punch(random.Random(0)), "punch_type": "BREAK_IN", "timestamp": day + timedelta(hours=13)})
+
+    assert calculate_work_hours(1, START) == {"work_hours": 7.0, "break_hours": 1.0, "overtime_hours": 0.0}
+    assert punch_store.totals(1, START) is not totals
+
+def test_defaulter_day_uses_shift_end(punch_store):
+    day = datetime.combine(START, time(0, 0))
+    insert_punch({**random_punch(random.Random(0)), "punch_type": "IN", "timestamp": day + timedelta(hours=9)})
+    calculate_work_hours(1, START)
+    insert_punch({**random_punch(random.Random(0)), "punch_type": "DEFAULTER", "timestamp": day + timedelta(hours=23, minutes=59)})
+
+    assert calculate_work_hours(1, START) == {"work_hours": 8.0, "break_hours": 0.0, "overtime_hours": 0.0}
+
+def test_columnar_store_pickles_without_totals():
+    store = ColumnarPunchStore([random_punch(random.Random(seed)) for seed in range(20)])
+    before = {offset: store.totals(1, START + timedelta(days=offset)).summary() for offset in range(3)}
+
+    restored = pickle.loads(pickle.dumps(store))
+
+    assert {offset: restored.totals(1, START + timedelta(days=offset)).summary() for offset in range(3)} == before
@@ -0,0 +1,73 @@
+import time as clock
+from datetime import time
+
+from utils.employee_directory import EmployeeDirectory, shift_window
+from utils.overtime_approvals import OvertimeApprovalIndex
+from utils.punch_index import PunchIndex
+from utils.storage import MemoryStorage
+
+def make_employees(count):
+    return [
+        {"id": i, "badge_id": f"B{i:06d}", "is_active": True,
+         "shift_start_time": time(9, 0), "shift_end_time": time(17, 0)}
+        for i in range(1, count + 1)
+    ]
+
+class ScanCountingList(list):
+    scans = 0
+
+    def __iter__(self):
+        self.scans += 1
+        return super().__iter__()
+
+def test_lookups_match_linear_scan_at_100k():
+    employees = ScanCountingList(make_employees(100_000))
+    storage = MemoryStorage(employees, PunchIndex(), OvertimeApprovalIndex())
+
+    for i in range(1, 100_001, 7):
+        assert storage.get_employee_by_badge(f"B{i:06d}") is employees[i - 1]
+
+    assert storage.get_employee_by_badge("missing") is None
+    assert storage.get_employee_shift_time(50_000) == {"start": time(9, 0), "end": time(17, 0)}
+    assert storage.get_employees_by_ids([3, 99_999, 200_000]) == {3: employees[2], 99_999: employees[99_998]}
+    # ~14k lookups served from indexes built with a single pass over the list.
+    assert employees.scans == 1
+
+def test_shift_window_bounds():
+    shift = shift_window(time(22, 0), time(6, 30))
+    assert (shift.start_minutes, shift.end_minutes) == (1320, 390)
+    assert (shift.in_from, shift.late_after, shift.early_before, shift.overtime_after) == (1310, 1330, 380, 400)
+    assert shift_window(time(22, 0), time(6, 30)) is shift
+
+def test_edits_take_effect_without_restart():
+    employees = make_employees(3)
+    storage = MemoryStorage(employees, PunchIndex(), OvertimeApprovalIndex(), employee_ttl=None)
+    assert storage.get_employee_by_badge("B000002")["is_active"]
+
+    employees[1]["is_active"] = False
+    employees[2]["shift_end_time"] = time(18, 0)
+    employees.append({"id": 4, "badge_id": "B000004", "is_active": True,
+                      "shift_start_time": time(7, 0), "shift_end_time": time(15, 0)})
+
+    assert not storage.get_employee_by_badge("B000002")["is_active"]
+    assert storage.get_employee_shift_time(3)["end"] == time(18, 0)
+    assert storage.get_employee_shift_time(4)["start"] == time(7, 0)
+
+    employees[0]["badge_id"] = "NEW001"
+    assert storage.get_employee_by_badge("NEW001") is None
+    storage.invalidate_employees()
+    assert storage.get_employee_by_badge("NEW001") is employees[0]
+
+def test_ttl_expiry_reloads():
+    employees = make_employees(2)
+    directory = EmployeeDirectory(lambda: employees, ttl=0.01)
+    assert directory.by_badge("B000001").employee is employees[0]
+
+    employees[0] = {**employees[0], "badge_id": "SWAPPED"}
+    clock.sleep(0.02)
+
+    # The first lookup after expiry starts the rebuild in the background.
+    directory.by_badge("SWAPPED")
+    directory._refresher.join()
+    assert directory.by_badge("SWAPPED").employee is employees[0]
+    assert directory.by_badge("B000001") is None
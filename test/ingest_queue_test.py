@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from Background.ingest import PunchIngestQueue, shard_for
+
+def test_punches_for_one_badge_are_processed_in_order():
+    seen = []
+    start = datetime(2025, 7, 21, 9, 0)
+
+    async def run():
+        queue = PunchIngestQueue(lambda badge_id, ts: seen.append((badge_id, ts)), workers=4, max_size=1000)
+        await queue.start()
+        for minute in range(50):
+            for badge_id in ["A", "B", "C"]:
+                assert queue.submit(badge_id, start + timedelta(minutes=minute))
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert len(seen) == 150
+    for badge_id in ["A", "B", "C"]:
+        timestamps = [ts for b, ts in seen if b == badge_id]
+        assert timestamps == sorted(timestamps)
+
+def test_full_shard_rejects_and_reports_depth():
+    release = threading.Event()
+
+    async def run():
+        queue = PunchIngestQueue(lambda badge_id, ts: release.wait(), workers=1, max_size=2)
+        await queue.start()
+        accepted = [queue.submit("A", datetime(2025, 7, 21, 9, m)) for m in range(4)]
+        await asyncio.sleep(0.05)
+        depth = queue.depth
+        release.set()
+        await queue.stop()
+        return accepted, depth, queue.depth
+
+    accepted, depth_when_full, depth_after_stop = asyncio.run(run())
+
+    assert accepted[:2] == [True, True]
+    assert False in accepted
+    assert depth_when_full >= 1
+    assert depth_after_stop == 0
+
+def test_stop_drains_queued_punches():
+    processed = []
+
+    async def run():
+        queue = PunchIngestQueue(lambda badge_id, ts: processed.append(badge_id), workers=2, max_size=100)
+        await queue.start()
+        for i in range(20):
+            queue.submit(str(i), datetime(2025, 7, 21, 9, 0))
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert sorted(processed, key=int) == [str(i) for i in range(20)]
+
+def test_shard_is_stable_per_badge():
+    assert shard_for("123456", 8) == shard_for("123456", 8)
+    assert 0 <= shard_for("123456", 8) < 8
+
+def test_join_waits_for_submitted_punches_without_stopping():
+    processed = []
+
+    async def run():
+        queue = PunchIngestQueue(lambda badge_id, ts: processed.append(badge_id), workers=2, max_size=100)
+        await queue.start()
+        for i in range(20):
+            queue.submit(str(i), datetime(2025, 7, 21, 9, 0))
+        await queue.join()
+        drained, running = len(processed), queue.running
+        await queue.stop()
+        return drained, running
+
+    assert asyncio.run(run()) == (20, True)
@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, time, date
+
+from fastapi.testclient import TestClient
+
+import main
+from main import process_punch
+from utils import metrics
+from utils.helper import mock_punches
+
+def setup_function():
+    mock_punches.clear()
+
+def test_outcomes_and_stages_are_recorded():
+    accepted = main.OUTCOMES["accepted"].value
+    duplicates = main.OUTCOMES[main.REJECT_DUPLICATE_IN].value
+    unknown = main.OUTCOMES[main.REJECT_UNKNOWN_BADGE].value
+    classified = main.CLASSIFY_STAGE.count
+
+    process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+    process_punch("123456", datetime.combine(date.today(), time(9, 5)))
+    process_punch("000000", datetime.combine(date.today(), time(9, 5)))
+
+    assert main.OUTCOMES["accepted"].value == accepted + 1
+    assert main.OUTCOMES[main.REJECT_DUPLICATE_IN].value == duplicates + 1
+    assert main.OUTCOMES[main.REJECT_UNKNOWN_BADGE].value == unknown + 1
+    assert main.CLASSIFY_STAGE.count == classified + 2
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    before = main.PUNCH_SECONDS.labels().count
+
+    process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+
+    assert main.PUNCH_SECONDS.labels().count == before
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_render_seconds", "Test histogram.", ["stage"])
+    try:
+        child = histogram.labels("a")
+        for nanoseconds in (500, 500_000, 5_000_000, 50_000_000, 10**12):
+            child.observe_ns(nanoseconds)
+        lines = histogram.render()
+    finally:
+        metrics.unregister(histogram)
+
+    buckets = dict(line.rsplit(" ", 1) for line in lines if "_bucket" in line)
+    assert buckets['test_render_seconds_bucket{stage="a",le="1.024e-06"}'] == "1"
+    # 500us is below 2**19 ns.
+    assert buckets['test_render_seconds_bucket{stage="a",le="0.000262144"}'] == "1"
+    assert buckets['test_render_seconds_bucket{stage="a",le="0.000524288"}'] == "2"
+    assert buckets['test_render_seconds_bucket{stage="a",le="8.589934592"}'] == "4"
+    assert buckets['test_render_seconds_bucket{stage="a",le="+Inf"}'] == "5"
+    assert lines[-2:] == ['test_render_seconds_sum{stage="a"} 1000.0555005', 'test_render_seconds_count{stage="a"} 5']
+
+def test_counter_family_is_named_with_its_total_suffix():
+    counter = metrics.Counter("test_render_events", "Test counter.", ["kind"])
+    try:
+        counter.labels("a").inc(3)
+        lines = counter.render([{("a",): [2]}])
+    finally:
+        metrics.unregister(counter)
+
+    assert lines == [
+        "# HELP test_render_events_total Test counter.",
+        "# TYPE test_render_events_total counter",
+        'test_render_events_total{kind="a"} 5'
+    ]
+
+def test_updates_from_many_threads_are_not_lost():
+    counter = metrics.Counter("test_threads", "Test counter.")
+    try:
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(10_000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.labels().value == 80_000
+    finally:
+        metrics.unregister(counter)
+
+def test_metrics_route_exposes_queue_depth():
+    from Background.task import app
+
+    with TestClient(app) as client:
+        process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "punch_ingest_queue_depth 0" in response.text
+    assert 'punch_outcomes_total{outcome="accepted"}' in response.text
+    assert 'punch_stage_seconds_count{stage="insert"}' in response.text
@@ -0,0 +1,181 @@
+import logging
+import random
+from datetime import datetime, time, date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from Background import offline_sync
+from Background.offline_sync import ReorderBuffer
+from main import process_punch, process_synced_punch, sweep_missing_punch_outs
+from utils import helper
+from utils.helper import get_all_punches_for_day, open_shifts
+from utils.overtime_approvals import OvertimeApprovalIndex
+
+DAY = date(2025, 9, 3)
+NIGHT_SHIFT = {"id": 7, "badge_id": "777777", "is_active": True, "shift_start_time": time(22, 0), "shift_end_time": time(6, 0)}
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(DAY, time(hour, minute))
+
+def day_types():
+    return [(punch["timestamp"], punch["punch_type"]) for punch in get_all_punches_for_day(NIGHT_SHIFT["id"], DAY)]
+
+@pytest.fixture
+def store(memory_storage):
+    return memory_storage([NIGHT_SHIFT], approvals=OvertimeApprovalIndex([{"employee_id": NIGHT_SHIFT["id"], "date": DAY, "is_approved": True}]))
+
+def test_buffer_releases_each_badge_in_timestamp_order():
+    buffer = ReorderBuffer(lateness=timedelta(hours=4))
+    start = datetime(2025, 9, 3, 8, 0)
+    punches = [(badge_id, start + timedelta(minutes=5 * i)) for i in range(40) for badge_id in ("A", "B")]
+    random.Random(4).shuffle(punches)
+
+    released = []
+    for first in range(0, len(punches), 7):
+        released += buffer.add(punches[first:first + 7])
+    released += buffer.flush()
+
+    assert sorted(released) == sorted(punches)
+    for badge_id in ("A", "B"):
+        timestamps = [ts for b, ts in released if b == badge_id]
+        assert timestamps == sorted(timestamps)
+    assert len(buffer) == 0
+
+def test_buffer_holds_punches_until_the_watermark_passes():
+    buffer = ReorderBuffer(lateness=timedelta(minutes=30))
+
+    assert buffer.add([("A", at(9)), ("A", at(9, 20))]) == []
+    assert buffer.add([("A", at(9, 40))]) == [("A", at(9))]
+    assert buffer.add([("A", at(8))]) == [("A", at(8))]
+    assert len(buffer) == 2
+    assert buffer.flush(["B"]) == []
+    assert buffer.flush(["A"]) == [("A", at(9, 20)), ("A", at(9, 40))]
+
+def test_flush_forgets_the_badges_it_drains(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(offline_sync.clock, "monotonic", lambda: now[0])
+    buffer = ReorderBuffer(lateness=timedelta(minutes=30), idle_seconds=60)
+    assert buffer.add([("A", at(9)), ("A", at(10)), ("B", at(9))]) == [("A", at(9))]
+
+    assert buffer.flush(["A"]) == [("A", at(10))]
+    now[0] += 60
+    assert buffer.flush_idle() == [("B", at(9))]
+
+    assert (buffer._pending, buffer._newest, buffer._last_arrival, len(buffer)) == ({}, {}, {}, 0)
+    # No watermark left from before, so an earlier punch is buffered, not released as late.
+    assert buffer.add([("A", at(8))]) == []
+
+def test_idle_badges_are_flushed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(offline_sync.clock, "monotonic", lambda: now[0])
+    buffer = ReorderBuffer(lateness=timedelta(hours=1), idle_seconds=60)
+    buffer.add([("A", at(9))])
+    now[0] += 30
+    buffer.add([("B", at(9))])
+
+    now[0] += 31
+    assert buffer.flush_idle() == [("A", at(9))]
+    assert len(buffer) == 1
+
+def test_late_punch_reclassifies_only_its_day(store):
+    other_day = process_punch(NIGHT_SHIFT["badge_id"], at(22) - timedelta(days=1))
+    process_punch(NIGHT_SHIFT["badge_id"], at(6))
+    process_punch(NIGHT_SHIFT["badge_id"], at(9))
+    assert day_types() == [(at(6), "OUT"), (at(9), "OVERTIME_IN")]
+
+    late = process_synced_punch(NIGHT_SHIFT["badge_id"], at(7))
+
+    assert late["punch_type"] == "OVERTIME_IN"
+    assert day_types() == [(at(6), "OUT"), (at(7), "OVERTIME_IN"), (at(9), "OVERTIME_OUT")]
+    assert get_all_punches_for_day(NIGHT_SHIFT["id"], DAY - timedelta(days=1)) == [other_day]
+    assert len(store) == 4
+
+def test_late_punch_out_removes_the_swept_defaulter(store):
+    process_punch(NIGHT_SHIFT["badge_id"], at(6))
+    process_punch(NIGHT_SHIFT["badge_id"], at(7))
+    assert [punch["punch_type"] for punch in sweep_missing_punch_outs(DAY)] == ["DEFAULTER"]
+
+    process_synced_punch(NIGHT_SHIFT["badge_id"], at(9))
+
+    assert day_types() == [(at(6), "OUT"), (at(7), "OVERTIME_IN"), (at(9), "OVERTIME_OUT")]
+    assert NIGHT_SHIFT["id"] not in open_shifts.open_employees(DAY)
+
+def test_replayed_punches_are_neither_recounted_nor_duplicated(store, caplog):
+    import main
+    process_punch(NIGHT_SHIFT["badge_id"], at(6))
+    process_punch(NIGHT_SHIFT["badge_id"], at(9))
+    accepted = main.OUTCOMES["accepted"].value
+    duplicates = main.OUTCOMES[main.REJECT_DUPLICATE_OUT].value
+    caplog.clear()
+
+    main.reclassify_day(NIGHT_SHIFT, DAY, [at(7), at(6)])
+
+    assert day_types() == [(at(6), "OUT"), (at(7), "OVERTIME_IN"), (at(9), "OVERTIME_OUT")]
+    assert main.OUTCOMES["accepted"].value == accepted + 1
+    assert main.OUTCOMES[main.REJECT_DUPLICATE_OUT].value == duplicates
+    assert not [record for record in caplog.records if record.levelno >= logging.WARNING]
+
+def test_offline_upload_matches_in_order_processing(store, monkeypatch):
+    from Background.task import app, offline_buffer, replay_filter
+    replay_filter.clear()
+    offline_buffer.flush()
+    monkeypatch.setattr(offline_buffer, "lateness", timedelta(hours=24))
+    timestamps = [at(6), at(7), at(9), at(10), at(13), at(22)]
+    for timestamp in timestamps:
+        process_punch(NIGHT_SHIFT["badge_id"], timestamp)
+    expected = day_types()
+    store.clear()
+
+    upload = [{"badge_id": NIGHT_SHIFT["badge_id"], "timestamp": ts.isoformat()} for ts in reversed(timestamps)]
+    with TestClient(app) as client:
+        first = client.post("/punches/offline", json=upload[:3]).json()
+        last = client.post("/punches/offline", json=upload[3:], params={"final": True}).json()
+
+    assert first["released"] == [] and first["buffered"] == 3
+    assert [entry["timestamp"] for entry in last["released"]] == [ts.isoformat() for ts in timestamps]
+    assert last["buffered"] == 0
+    assert day_types() == expected
+
+def test_late_offline_punch_is_journaled_as_a_replaced_day(tmp_path, monkeypatch):
+    from Background import task
+    task.replay_filter.clear()
+    task.offline_buffer.flush()
+    monkeypatch.setattr(task, "JOURNAL_PATH", str(tmp_path / "punches.journal"))
+    monkeypatch.setattr(task, "mock_employees", [NIGHT_SHIFT])
+    badge = NIGHT_SHIFT["badge_id"]
+    previous = helper.get_storage()
+    try:
+        with TestClient(task.app) as client:
+            client.post("/punches/batch", json=[{"badge_id": badge, "timestamp": at(h).isoformat()} for h in (6, 22)])
+            late = client.post("/punches/offline", json=[{"badge_id": badge, "timestamp": at(5).isoformat()}], params={"final": True})
+            reclassified = day_types()
+        with TestClient(task.app):
+            recovered = day_types()
+    finally:
+        helper.set_storage(previous)
+        open_shifts.clear()
+        helper.punch_rollups.clear()
+
+    assert late.status_code == 200
+    assert [ts for ts, _ in reclassified] == [at(5), at(22)]
+    assert recovered == reclassified
+
+def test_punches_that_fail_processing_go_back_into_the_buffer(store, monkeypatch):
+    from Background import task
+    task.offline_buffer.flush()
+    calls = []
+
+    def fail_second(badge_id, timestamp):
+        calls.append(timestamp)
+        if len(calls) == 2:
+            raise RuntimeError("store unavailable")
+        return process_synced_punch(badge_id, timestamp)
+
+    monkeypatch.setattr(task, "process_synced_punch", fail_second)
+    released = [(NIGHT_SHIFT["badge_id"], at(h)) for h in (6, 7, 22)]
+    with pytest.raises(RuntimeError):
+        task.process_released_punches(released)
+
+    assert len(task.offline_buffer) == 2
+    assert task.offline_buffer.flush() == released[1:]
@@ -0,0 +1,63 @@
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+import main
+from conftest import make_punch
+from main import sweep_missing_punch_outs
+from utils import helper
+from utils.helper import insert_punch, insert_punches
+from utils.open_shifts import OpenShiftTracker
+
+DAY = date(2025, 7, 21)
+
+def punch(employee_id, punch_type, hour, minute=0):
+    return make_punch(employee_id, datetime.combine(DAY, time(hour, minute)), punch_type)
+
+@pytest.fixture
+def employees(memory_storage):
+    employees = [
+        {"id": i, "badge_id": str(100000 + i), "is_active": True,
+         "shift_start_time": time(9, 0), "shift_end_time": time(17, 0)}
+        for i in range(1, 50_001)
+    ]
+    memory_storage(employees)
+    return employees
+
+def test_tracker_follows_latest_punch():
+    tracker = OpenShiftTracker()
+    tracker.observe([punch(1, "IN", 9), punch(2, "IN", 9), punch(3, "OVERTIME_IN", 18)])
+    tracker.observe([punch(2, "OUT", 17)])
+    # Arrives late but is older than the OUT, so employee 2 stays closed.
+    tracker.observe([punch(2, "BREAK_IN", 13)])
+
+    assert tracker.open_employees(DAY) == {1, 3}
+    assert tracker.open_employees(DAY + timedelta(days=1)) == set()
+
+def test_sweep_visits_open_employees_once(employees, monkeypatch):
+    insert_punches(punch(emp["id"], "IN", 9) for emp in employees)
+    insert_punches(punch(emp["id"], "OUT", 17) for emp in employees if emp["id"] % 100)
+    employees[99]["is_active"] = False
+    visited = []
+    def get_last_punches(keys, _original=main.get_last_punches):
+        keys = list(keys)
+        visited.extend(keys)
+        return _original(keys)
+    monkeypatch.setattr(main, "get_last_punches", get_last_punches)
+
+    defaulters = sweep_missing_punch_outs(DAY)
+
+    assert [p["employee_id"] for p in defaulters] == list(range(200, 50_001, 100))
+    assert all(p["timestamp"] == datetime.combine(DAY, time(23, 59)) for p in defaulters)
+    assert helper.get_last_punch(100, DAY)["punch_type"] == "IN"
+    assert helper.get_last_punch(200, DAY)["punch_type"] == "DEFAULTER"
+    # One batched read, of the 500 employees still clocked in out of 50k.
+    assert sorted(visited) == [(employee_id, DAY) for employee_id in range(100, 50_001, 100)]
+    assert sweep_missing_punch_outs(DAY) == []
+
+def test_sweep_skips_employees_closed_after_tracking(employees):
+    insert_punch(punch(1, "IN", 9))
+    # Written straight to storage, bypassing the tracker.
+    helper.get_storage().insert_punch(punch(1, "OUT", 17))
+
+    assert sweep_missing_punch_outs(DAY) == []
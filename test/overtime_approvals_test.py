@@ -0,0 +1,72 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from utils import helper
+from utils.helper import mock_employees
+from utils.overtime_approvals import OvertimeApprovalIndex
+from utils.punch_index import PunchIndex
+from utils.sqlite_storage import SqliteStorage
+from utils.storage import MemoryStorage
+
+JULY = date(2025, 7, 1)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryStorage(mock_employees, PunchIndex(), OvertimeApprovalIndex())
+    else:
+        storage = SqliteStorage(str(tmp_path / "approvals.db"))
+    previous = helper.set_storage(storage)
+    yield storage
+    helper.set_storage(previous)
+    if request.param == "sqlite":
+        storage.close()
+
+def write_files(tmp_path):
+    csv_path = tmp_path / "week1.csv"
+    csv_path.write_text(
+        "employee_id,date,is_approved\n"
+        "1,2025-07-03,true\n"
+        "1,2025-07-10,false\n"
+        "2,2025-07-03,1\n"
+    )
+    ndjson_path = tmp_path / "week2.ndjson"
+    ndjson_path.write_text("\n".join(json.dumps(row) for row in [
+        {"employee_id": 1, "date": "2025-07-10", "is_approved": True},
+        {"employee_id": 1, "date": "2025-07-17"},
+        {"employee_id": 1, "date": "2025-08-01", "is_approved": True},
+    ]) + "\n")
+    return str(csv_path), str(ndjson_path)
+
+def test_bulk_load_and_range_query(storage, tmp_path):
+    csv_path, ndjson_path = write_files(tmp_path)
+
+    assert helper.load_overtime_approvals(csv_path) == 3
+    assert helper.get_overtime_approval(1, JULY + timedelta(days=9)) is None
+    assert helper.load_overtime_approvals(ndjson_path) == 3
+
+    july = helper.get_overtime_approvals_for_range(1, JULY, date(2025, 7, 31))
+    assert [approval["date"] for approval in july] == [date(2025, 7, 3), date(2025, 7, 10), date(2025, 7, 17)]
+    assert helper.get_overtime_approval(2, date(2025, 7, 3))["is_approved"] is True
+
+def test_revocation_updates_lookups(storage, tmp_path):
+    csv_path, _ = write_files(tmp_path)
+    helper.load_overtime_approvals(csv_path)
+
+    assert helper.revoke_overtime_approval(1, date(2025, 7, 3))
+    assert not helper.revoke_overtime_approval(3, date(2025, 7, 3))
+
+    assert helper.get_overtime_approval(1, date(2025, 7, 3)) is None
+    assert helper.get_overtime_approvals([(1, date(2025, 7, 3)), (2, date(2025, 7, 3))]).keys() == {(2, date(2025, 7, 3))}
+    assert helper.get_overtime_approvals_for_range(1, JULY, date(2025, 7, 31)) == []
+
+def test_index_keeps_one_record_per_day():
+    index = OvertimeApprovalIndex()
+    index.extend({"employee_id": 1, "date": JULY + timedelta(days=i % 7), "is_approved": True} for i in range(70))
+
+    assert len(index) == 7
+    assert len(index.approved_between(1, JULY, JULY + timedelta(days=3))) == 4
+    index.clear()
+    assert index.approval(1, JULY) is None
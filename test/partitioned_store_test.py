@@ -0,0 +1,173 @@
+import os
+import random
+from datetime import datetime, date, time, timedelta
+
+import pytest
+
+from conftest import make_punch
+from main import calculate_work_hours, calculate_work_hours_bulk
+from utils import helper
+from utils.helper import mock_employees, mock_overtime_approvals
+from utils.partitioned_store import PartitionedPunchStore
+from utils.punch_index import PunchIndex
+from utils.punch_journal import PunchJournal
+from utils.punch_types import PUNCH_TYPES
+from utils.storage import MemoryStorage
+
+DAYS = [date(2025, 7, 21), date(2025, 7, 22), date(2025, 7, 23)]
+
+def random_punches(seed, count):
+    """``count`` punches by employees 1-4 over DAYS, in timestamp order."""
+    rng = random.Random(seed)
+    punches = [{
+        "employee_id": rng.randint(1, 4),
+        "punch_type": rng.choice(PUNCH_TYPES),
+        "timestamp": datetime(2025, 7, 21) + timedelta(seconds=rng.randrange(3 * 86400)),
+        "is_late": rng.random() < 0.2,
+        "lateness_minutes": rng.randint(0, 600),
+        "is_early": rng.random() < 0.2,
+        "earliness_minutes": rng.randint(0, 600)
+    } for _ in range(count)]
+    return sorted(punches, key=lambda p: p["timestamp"])
+
+def test_closed_days_roll_to_disk_and_read_back(tmp_path):
+    punches = random_punches(5, 400)
+    index = PunchIndex(punches)
+    store = PartitionedPunchStore(str(tmp_path), hot_days=2)
+    store.extend(punches)
+
+    assert store.hot_partitions == DAYS[1:]
+    assert store.cold_partitions == DAYS[:1]
+    assert os.path.exists(store.partition_path(DAYS[0]))
+    assert store.cached_partitions == []
+    for employee_id in range(1, 5):
+        for day in DAYS:
+            assert store.day(employee_id, day) == index.day(employee_id, day)
+            assert store.last(employee_id, day) == index.last(employee_id, day)
+    assert store.cached_partitions == DAYS[:1]
+
+def test_cold_partitions_load_lazily_into_an_lru(tmp_path):
+    store = PartitionedPunchStore(str(tmp_path), hot_days=1, cache_partitions=2)
+    for day in DAYS + [DAYS[-1] + timedelta(days=1)]:
+        store.append(make_punch(1, datetime.combine(day, datetime.min.time()) + timedelta(hours=9)))
+    assert store.cold_partitions == DAYS
+
+    for day in (DAYS[0], DAYS[1], DAYS[0], DAYS[2]):
+        assert [p["timestamp"].date() for p in store.day(1, day)] == [day]
+    assert store.cached_partitions == [DAYS[0], DAYS[2]]
+
+    reopened = PartitionedPunchStore(str(tmp_path))
+    assert reopened.cold_partitions == DAYS
+    assert reopened.day(1, DAYS[1]) == store.day(1, DAYS[1])
+
+def test_late_write_to_a_cold_day_makes_it_hot_again(tmp_path):
+    store = PartitionedPunchStore(str(tmp_path), hot_days=1)
+    first = make_punch(1, datetime(2025, 7, 21, 9, 0))
+    store.append(first)
+    store.append(make_punch(1, datetime(2025, 7, 22, 9, 0)))
+    store.last(1, DAYS[0])
+
+    tie = make_punch(1, datetime(2025, 7, 21, 9, 0), "OUT")
+    store.append(tie)
+    assert DAYS[0] in store.hot_partitions and store.cached_partitions == []
+    assert store.day(1, DAYS[0]) == [first, tie]
+    assert store.last(1, DAYS[0]) == first
+
+    assert store.compact(DAYS[1]) == [DAYS[0]]
+    assert store.day(1, DAYS[0]) == [first, tie]
+    assert store.last(1, DAYS[0]) == first
+
+def test_retention_deletes_old_partitions(tmp_path):
+    store = PartitionedPunchStore(str(tmp_path), hot_days=1, retention_days=2)
+    for offset in range(6):
+        store.append(make_punch(1, datetime(2025, 7, 21, 9, 0) + timedelta(days=offset)))
+
+    newest = DAYS[0] + timedelta(days=5)
+    assert store.hot_partitions == [newest]
+    assert store.cold_partitions == [newest - timedelta(days=2), newest - timedelta(days=1)]
+    assert store.day(1, DAYS[0]) == []
+    assert not os.path.exists(store.partition_path(DAYS[0]))
+
+def test_work_hours_match_in_memory_history(tmp_path):
+    punches = random_punches(9, 400)
+    store = PartitionedPunchStore(str(tmp_path), hot_days=1, cache_partitions=1)
+    store.extend(punches)
+    employee_ids = [1, 2, 3, 4]
+    employees = [dict(mock_employees[0], id=employee_id, badge_id=str(employee_id)) for employee_id in employee_ids]
+
+    previous = helper.set_storage(MemoryStorage(employees, PunchIndex(punches), mock_overtime_approvals))
+    try:
+        expected = {(e, day): calculate_work_hours(e, day) for e in employee_ids for day in DAYS}
+        expected_bulk = calculate_work_hours_bulk(employee_ids, DAYS[0], DAYS[-1])
+        helper.set_storage(MemoryStorage(employees, store, mock_overtime_approvals))
+        assert {(e, day): calculate_work_hours(e, day) for e in employee_ids for day in DAYS} == expected
+        assert calculate_work_hours_bulk(employee_ids, DAYS[0], DAYS[-1]) == expected_bulk
+    finally:
+        helper.set_storage(previous)
+
+def test_hot_days_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        PartitionedPunchStore(str(tmp_path), hot_days=0)
+
+def test_end_of_day_check_compacts_the_day_leaving_the_hot_window(tmp_path, memory_storage):
+    from Background.task import run_end_of_day_check
+    store = PartitionedPunchStore(str(tmp_path), hot_days=2)
+    store.extend([make_punch(1, datetime(2025, 7, 21, 9, 0)), make_punch(1, datetime(2025, 7, 22, 9, 0))])
+    memory_storage(mock_employees, store)
+
+    run_end_of_day_check(DAYS[1])
+
+    assert store.hot_partitions == [DAYS[1]]
+    assert store.cold_partitions == [DAYS[0]]
+
+def test_journal_is_checkpointed_to_the_hot_days_and_replays_without_doubling(tmp_path):
+    journal = PunchJournal(str(tmp_path / "punches.journal"), commit_interval=60)
+    store = PartitionedPunchStore(str(tmp_path / "partitions"), hot_days=1)
+    store.on_compact = lambda days: journal.checkpoint(lambda: store.hot_partitions)
+    first, second = make_punch(1, datetime(2025, 7, 21, 9, 0)), make_punch(1, datetime(2025, 7, 22, 9, 0))
+    for punch in (first, second):
+        store.append(punch)
+        journal.append(punch)
+
+    journal.sync()
+
+    assert store.cold_partitions == DAYS[:1]
+    assert journal.records_written == 1
+    journal.close()
+
+    # As after a crash between writing a day's file and the checkpoint.
+    journal = PunchJournal(str(tmp_path / "punches.journal"), commit_interval=60)
+    journal.append(first)
+    restarted = PartitionedPunchStore(str(tmp_path / "partitions"), hot_days=1)
+    assert journal.replay(restarted) == 2
+    journal.close()
+
+    assert restarted.day(1, DAYS[0]) == [first]
+    assert restarted.day(1, DAYS[1]) == [second]
+
+def test_lifespan_restores_the_hot_day_from_the_journal(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from Background import task
+    task.replay_filter.clear()
+    monkeypatch.setattr(task, "PARTITION_DIR", str(tmp_path / "partitions"))
+    monkeypatch.setattr(task, "JOURNAL_PATH", str(tmp_path / "punches.journal"))
+    today = date.today()
+    punches = [{"badge_id": "123456", "timestamp": datetime.combine(today, time(hour)).isoformat()} for hour in (9, 17)]
+    previous = helper.get_storage()
+    try:
+        with TestClient(task.app) as client:
+            client.post("/punches/batch", json=punches)
+            before = helper.get_all_punches_for_day(1, today)
+        # A new process starts with nothing rolled up.
+        helper.punch_rollups.clear()
+        with TestClient(task.app):
+            after = helper.get_all_punches_for_day(1, today)
+            totals = helper.punch_rollups.totals(today, today)[1]
+    finally:
+        helper.set_storage(previous)
+        helper.open_shifts.clear()
+        helper.punch_rollups.clear()
+
+    assert len(before) == 2
+    assert after == before
+    assert totals.punches == 2
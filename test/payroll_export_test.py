@@ -0,0 +1,82 @@
+import json
+import tracemalloc
+from datetime import datetime, time, date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import EXPORT_FIELDS, calculate_work_hours, export_work_hours
+from utils.helper import get_employee_ids, mock_punches, insert_punch
+
+def setup_function():
+    mock_punches.clear()
+
+def _work_day(employee_id: int, day: date) -> None:
+    for hour, minute, punch_type in [(9, 0, "IN"), (12, 0, "BREAK_OUT"), (12, 30, "BREAK_IN"), (17, 0, "OUT")]:
+        insert_punch({"employee_id": employee_id, "punch_type": punch_type, "timestamp": datetime.combine(day, time(hour, minute))})
+
+def test_csv_rows_match_calculate_work_hours():
+    start = date(2025, 8, 4)
+    _work_day(1, start)
+    _work_day(1, start + timedelta(days=2))
+    end = start + timedelta(days=2)
+
+    lines = "".join(export_work_hours(start, end, "csv", chunk_size=1)).splitlines()
+
+    assert lines[0] == ",".join(EXPORT_FIELDS)
+    employee_ids = get_employee_ids()
+    assert len(lines) == 1 + 3 * len(employee_ids)
+    expected = [
+        (day.isoformat(), employee_id)
+        for day in (start, start + timedelta(days=1), end)
+        for employee_id in employee_ids
+    ]
+    for line, (day, employee_id) in zip(lines[1:], expected):
+        fields = line.split(",")
+        assert fields[:2] == [day, str(employee_id)]
+        summary = calculate_work_hours(employee_id, date.fromisoformat(day))
+        assert [float(value) for value in fields[2:]] == [summary["work_hours"], summary["break_hours"], summary["overtime_hours"]]
+
+def test_ndjson_rows_for_selected_employees():
+    day = date(2025, 8, 4)
+    _work_day(1, day)
+
+    rows = [json.loads(line) for chunk in export_work_hours(day, day, "ndjson", employee_ids=[1]) for line in chunk.splitlines()]
+
+    assert rows == [{"date": "2025-08-04", "employee_id": 1, "work_hours": 7.5, "break_hours": 0.5, "overtime_hours": 0.0}]
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        next(export_work_hours(date(2025, 8, 4), date(2025, 8, 4), "xml"))
+
+def test_memory_does_not_grow_with_the_range():
+    start = date(2025, 1, 1)
+    employee_ids = range(1, 201)
+
+    def peak(days: int) -> int:
+        tracemalloc.start()
+        for _ in export_work_hours(start, start + timedelta(days=days - 1), employee_ids=employee_ids, chunk_size=50):
+            pass
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_bytes
+
+    assert peak(120) < 2 * peak(5)
+
+def test_export_route_streams_csv():
+    from Background.task import app
+    day = date(2025, 8, 4)
+    _work_day(1, day)
+
+    with TestClient(app) as client:
+        response = client.get("/payroll/export", params={"start_date": "2025-08-04", "end_date": "2025-08-05"})
+        bad_range = client.get("/payroll/export", params={"start_date": "2025-08-05", "end_date": "2025-08-04"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert lines[0] == ",".join(EXPORT_FIELDS)
+    assert "2025-08-04,1,7.5,0.5,0.0" in lines
+    assert len(lines) == 1 + 2 * len(get_employee_ids())
+    assert bad_range.status_code == 400
@@ -0,0 +1,69 @@
+from datetime import datetime, time, date
+
+import pytest
+
+import main
+from main import process_punch
+from utils import helper
+from utils.helper import mock_employees, mock_punches
+from utils.storage import MemoryStorage
+
+@pytest.fixture(autouse=True)
+def storage(approvals):
+    previous = helper.set_storage(MemoryStorage(mock_employees, mock_punches, approvals))
+    yield
+    helper.set_storage(previous)
+
+def setup_function():
+    mock_punches.clear()
+
+def count_reads(monkeypatch):
+    calls = []
+    for name in ["get_employee_with_last_punch", "get_last_punch", "get_overtime_approval"]:
+        original = getattr(main, name)
+        def wrapper(*args, _name=name, _original=original):
+            calls.append(_name)
+            return _original(*args)
+        monkeypatch.setattr(main, name, wrapper)
+    return calls
+
+def test_regular_punch_reads_store_once(monkeypatch):
+    calls = count_reads(monkeypatch)
+
+    punch = process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+
+    assert punch is not None
+    assert calls == ["get_employee_with_last_punch"]
+
+def test_overtime_punch_reads_store_twice(monkeypatch):
+    monkeypatch.setitem(mock_employees[0], "shift_start_time", time(22, 0))
+    monkeypatch.setitem(mock_employees[0], "shift_end_time", time(6, 0))
+    process_punch("123456", datetime.combine(date.today(), time(5, 55)))
+    calls = count_reads(monkeypatch)
+
+    punch = process_punch("123456", datetime.combine(date.today(), time(7, 0)))
+
+    assert punch["punch_type"] == "OVERTIME_IN"
+    assert calls == ["get_employee_with_last_punch", "get_overtime_approval"]
+
+def test_duplicate_guard_uses_context_last_punch(monkeypatch):
+    process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+    calls = count_reads(monkeypatch)
+
+    assert process_punch("123456", datetime.combine(date.today(), time(9, 5))) is None
+    assert calls == ["get_employee_with_last_punch"]
+
+def test_unknown_badge_is_rejected_after_one_read(monkeypatch):
+    calls = count_reads(monkeypatch)
+
+    assert process_punch("000000", datetime.combine(date.today(), time(9, 0))) is None
+    assert calls == ["get_employee_with_last_punch"]
+
+def test_shift_comes_from_the_directory_entry(monkeypatch):
+    def shift_window(*args):
+        raise AssertionError("shift looked up per punch")
+    monkeypatch.setattr(main, "shift_window", shift_window)
+
+    punch = process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+
+    assert punch["punch_type"] == "IN"
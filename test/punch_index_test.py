@@ -0,0 +1,49 @@
+import random
+from datetime import datetime, timedelta, date
+
+from utils.punch_index import PunchIndex
+
+
+def make_punch(employee_id, timestamp, punch_type="IN"):
+    return {
+        "employee_id": employee_id,
+        "punch_type": punch_type,
+        "timestamp": timestamp,
+        "is_late": False,
+        "lateness_minutes": 0,
+        "is_early": False,
+        "earliness_minutes": 0
+    }
+
+def test_last_and_day_match_full_scan():
+    rng = random.Random(7)
+    start = datetime(2025, 7, 21)
+    punches = [
+        make_punch(rng.randint(1, 5), start + timedelta(minutes=rng.randint(0, 3 * 24 * 60)))
+        for _ in range(500)
+    ]
+    index = PunchIndex(punches)
+
+    for employee_id in range(1, 6):
+        for offset in range(3):
+            day = (start + timedelta(days=offset)).date()
+            matches = [p for p in punches if p["employee_id"] == employee_id and p["timestamp"].date() == day]
+            assert index.day(employee_id, day) == sorted(matches, key=lambda x: x["timestamp"])
+            expected_last = sorted(matches, key=lambda x: x["timestamp"], reverse=True)[0] if matches else None
+            assert index.last(employee_id, day) is expected_last
+
+def test_last_prefers_first_recorded_on_timestamp_tie():
+    ts = datetime(2025, 7, 21, 9, 0)
+    first = make_punch(1, ts, "IN")
+    second = make_punch(1, ts, "OUT")
+    index = PunchIndex([make_punch(1, ts - timedelta(hours=1)), first, second])
+
+    assert index.last(1, ts.date()) is first
+
+def test_clear_resets_index():
+    index = PunchIndex([make_punch(1, datetime(2025, 7, 21, 9, 0))])
+    index.clear()
+
+    assert len(index) == 0
+    assert index.last(1, date(2025, 7, 21)) is None
+    assert index.day(1, date(2025, 7, 21)) == []
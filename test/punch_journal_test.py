@@ -0,0 +1,173 @@
+import os
+import random
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+from main import process_punch
+from utils import helper
+from utils.helper import mock_punches
+from utils.punch_index import PunchIndex
+from utils.punch_journal import PunchJournal, read_records
+from utils.punch_types import PUNCH_TYPES
+
+def random_punches(seed, count):
+    rng = random.Random(seed)
+    start = datetime(2025, 7, 21)
+    return [{
+        "employee_id": rng.randint(1, 20),
+        "punch_type": rng.choice(PUNCH_TYPES),
+        "timestamp": start + timedelta(seconds=rng.randint(0, 3 * 86400)),
+        "is_late": False,
+        "lateness_minutes": rng.randint(0, 60),
+        "is_early": False,
+        "earliness_minutes": 0
+    } for _ in range(count)]
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = PunchJournal(str(tmp_path / "punches.journal"), commit_interval=60, commit_records=100)
+    yield journal
+    journal.close()
+
+def recovered_punches(path):
+    journal = PunchJournal(path, commit_interval=60)
+    try:
+        return list(journal.recover())
+    finally:
+        journal.close()
+
+def test_recover_rebuilds_every_synced_punch(journal):
+    punches = random_punches(1, 250)
+    journal.append_many(punches[:200])
+    for punch in punches[200:]:
+        journal.append(punch)
+    journal.sync()
+
+    recovered = journal.recover()
+
+    assert [row.to_dict() for row in recovered] == punches
+    assert recovered.day(3, date(2025, 7, 22)) == PunchIndex(punches).day(3, date(2025, 7, 22))
+
+def test_group_commit_batches_fsyncs(journal, monkeypatch):
+    fsyncs = []
+    monkeypatch.setattr(journal, "_fsync", lambda: fsyncs.append(1))
+
+    for punch in random_punches(2, 250):
+        journal.append(punch)
+
+    assert len(fsyncs) == 2
+    assert journal.records_written == 200
+
+def test_torn_tail_record_is_ignored(journal):
+    journal.append_many(random_punches(3, 10))
+    journal.sync()
+    with open(journal.path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    assert len(read_records(journal.path)) == 10
+
+def test_appends_after_a_torn_tail_start_on_a_record_boundary(tmp_path):
+    path = str(tmp_path / "punches.journal")
+    punches = random_punches(6, 3)
+    journal = PunchJournal(path, commit_interval=60)
+    journal.append_many(punches[:2])
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reopened = PunchJournal(path, commit_interval=60)
+    reopened.append(punches[2])
+    reopened.close()
+
+    assert reopened.records_written == 3
+    assert [row.to_dict() for row in recovered_punches(path)] == punches
+
+def test_snapshot_bounds_replay_to_the_tail(journal):
+    punches = random_punches(4, 300)
+    journal.append_many(punches[:200])
+    assert journal.snapshot() == 200
+    journal.append_many(punches[200:])
+    journal.sync()
+
+    offset, store = journal.load()
+
+    assert offset == 300
+    assert [row.to_dict() for row in store] == punches
+    assert list(journal.recover(PunchIndex)) == punches
+
+def test_insert_listener_journals_accepted_punches(journal):
+    helper.add_insert_listener(journal.append_many)
+    try:
+        mock_punches.clear()
+        process_punch("123456", datetime.combine(date.today(), time(9, 0)))
+        process_punch("123456", datetime.combine(date.today(), time(9, 5)))
+    finally:
+        helper.remove_insert_listener(journal.append_many)
+    journal.sync()
+
+    recovered = journal.recover()
+
+    assert [row.to_dict() for row in recovered] == list(mock_punches)
+    assert len(recovered) == 1
+
+def test_replaced_days_survive_recovery_and_snapshots(journal):
+    punches = sorted(random_punches(7, 200), key=lambda p: p["timestamp"])
+    day = date(2025, 7, 22)
+    expected = PunchIndex(punches)
+    journal.append_many(punches[:150])
+    journal.snapshot()
+    journal.append_many(punches[150:])
+    for employee_id in (1, 2):
+        replacement = [dict(p, punch_type="OUT") for p in expected.day(employee_id, day)[:2]]
+        expected.replace_day(employee_id, day, replacement)
+        journal.replace_day(employee_id, day, replacement)
+    journal.replace_day(3, day, [])
+    expected.replace_day(3, day, [])
+    journal.sync()
+
+    for recovered in (journal.recover(), journal.recover(PunchIndex)):
+        for employee_id in range(1, 21):
+            assert recovered.day(employee_id, day) == expected.day(employee_id, day)
+    journal.snapshot()
+    assert sorted(row.to_dict()["timestamp"] for row in journal.recover()) == sorted(p["timestamp"] for p in expected)
+
+def test_a_torn_replace_day_group_is_dropped_before_appending(tmp_path):
+    path = str(tmp_path / "punches.journal")
+    punches = random_punches(8, 3)
+    journal = PunchJournal(path, commit_interval=60)
+    journal.append(punches[0])
+    journal.replace_day(punches[1]["employee_id"], punches[1]["timestamp"].date(), punches[1:])
+    journal.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    reopened = PunchJournal(path, commit_interval=60)
+    reopened.append(punches[2])
+    reopened.close()
+
+    assert reopened.records_written == 2
+    assert [row.to_dict() for row in recovered_punches(path)] == [punches[0], punches[2]]
+
+def test_checkpoint_keeps_only_the_live_days(journal):
+    punches = sorted(random_punches(9, 300), key=lambda p: p["timestamp"])
+    day = date(2025, 7, 22)
+    live = [p for p in punches if p["timestamp"].date() >= day]
+    expected = PunchIndex(live)
+    journal.append_many(punches)
+    replacement = expected.day(1, day)[:1]
+    journal.replace_day(1, day, replacement)
+    expected.replace_day(1, day, replacement)
+
+    kept = journal.checkpoint(lambda: [day, date(2025, 7, 23), date(2025, 7, 24)])
+    journal.append(punches[-1])
+    journal.sync()
+
+    # The live punches, then the replace-day marker and its one punch.
+    assert kept == len(live) + 2
+    assert journal.records_written == kept + 1
+    recovered = journal.recover()
+    assert recovered.day(1, date(2025, 7, 21)) == []
+    for employee_id in range(1, 21):
+        assert recovered.day(employee_id, day) == expected.day(employee_id, day)
+    assert recovered.day(punches[-1]["employee_id"], punches[-1]["timestamp"].date())[-1] == punches[-1]
@@ -0,0 +1,30 @@
+import pickle
+from datetime import datetime
+
+import pytest
+
+from models.records import PunchRecord
+
+PUNCH = {
+    "employee_id": 1, "punch_type": "LATE_IN", "timestamp": datetime(2025, 7, 21, 9, 20),
+    "is_late": True, "lateness_minutes": 20, "is_early": False, "earliness_minutes": 0
+}
+
+def test_record_reads_like_a_punch_dict():
+    record = PunchRecord(**PUNCH)
+
+    assert record == PUNCH and PUNCH == record
+    assert dict(record) == record.to_dict() == PUNCH
+    assert record["punch_type"] == record.punch_type == "LATE_IN"
+    assert record.get("team") is None and record.get("team", "ops") == "ops"
+    with pytest.raises(KeyError):
+        record["team"]
+    assert not hasattr(record, "__dict__")
+
+def test_record_defaults_and_pickling():
+    record = PunchRecord(2, "DEFAULTER", datetime(2025, 7, 21, 23, 59))
+
+    assert record.to_dict() == dict(PUNCH, employee_id=2, punch_type="DEFAULTER", timestamp=datetime(2025, 7, 21, 23, 59),
+                                    is_late=False, lateness_minutes=0)
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert record != PunchRecord(**PUNCH)
@@ -0,0 +1,188 @@
+import random
+from collections import Counter
+from datetime import datetime, time, date, timedelta
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from conftest import make_punch
+from main import process_punch, process_synced_punch, employees_with_punch_type, lateness_summary
+from utils.columnar_store import RECORD_DTYPE, punch_record
+from utils.helper import mock_employees, mock_punches, open_shifts, punch_rollups
+from utils.partitioned_store import PartitionedPunchStore
+from utils.punch_rollups import PunchRollups, Rollup
+from utils.punch_types import PUNCH_TYPES
+
+START = date(2025, 7, 1)
+
+def random_punches(seed, count):
+    rng = random.Random(seed)
+    punches = []
+    for _ in range(count):
+        late, early = rng.random() < 0.3, rng.random() < 0.2
+        punches.append({
+            "employee_id": rng.randint(1, 6),
+            "punch_type": rng.choice(PUNCH_TYPES),
+            "timestamp": datetime.combine(START, time(0, 0)) + timedelta(minutes=rng.randrange(92 * 1440)),
+            "is_late": late,
+            "lateness_minutes": rng.randint(11, 120) if late else 0,
+            "is_early": early,
+            "earliness_minutes": rng.randint(11, 120) if early else 0
+        })
+    return punches
+
+def scanned_totals(punches, start_date, end_date):
+    totals, days = {}, set()
+    for punch in punches:
+        day = punch["timestamp"].date()
+        if start_date <= day <= end_date:
+            totals.setdefault(punch["employee_id"], Rollup()).add(punch)
+            days.add((punch["employee_id"], day))
+    for employee_id, _ in days:
+        totals[employee_id].days += 1
+    return totals
+
+def scanned_type_counts(punches, punch_type, start_date, end_date):
+    return dict(Counter(
+        punch["employee_id"] for punch in punches
+        if punch["punch_type"] == punch_type and start_date <= punch["timestamp"].date() <= end_date
+    ))
+
+RANGES = [
+    (date(2025, 7, 1), date(2025, 9, 30)), (date(2025, 7, 15), date(2025, 9, 3)),
+    (date(2025, 8, 1), date(2025, 8, 31)), (date(2025, 8, 30), date(2025, 9, 1)), (date(2025, 9, 10), date(2025, 9, 10))
+]
+
+def test_range_queries_match_a_scan_of_every_punch():
+    punches = random_punches(3, 3000)
+    rollups = PunchRollups()
+    rollups.observe(punches)
+
+    for start_date, end_date in RANGES:
+        assert rollups.totals(start_date, end_date) == scanned_totals(punches, start_date, end_date)
+        for punch_type in ("LATE_IN", "DEFAULTER"):
+            assert rollups.type_counts(punch_type, start_date, end_date) == scanned_type_counts(punches, punch_type, start_date, end_date)
+
+def test_records_roll_up_like_observed_punches(tmp_path):
+    punches = random_punches(5, 3000)
+    observed = PunchRollups()
+    observed.observe(punches)
+    records = np.array([punch_record(punch) for punch in punches], dtype=RECORD_DTYPE)
+    from_records = PunchRollups()
+    from_records.observe_records(records[:1000])
+    from_records.observe_records(records[1000:])
+
+    partitions = PartitionedPunchStore(str(tmp_path), hot_days=1)
+    partitions.extend(sorted(punches, key=lambda punch: punch["timestamp"]))
+    partitions.compact(date(2025, 10, 1))
+    restarted = PartitionedPunchStore(str(tmp_path), hot_days=1)
+    from_partitions = PunchRollups()
+    for day in restarted.cold_partitions:
+        from_partitions.observe_records(restarted.partition_records(day))
+
+    for start_date, end_date in RANGES:
+        assert from_records.totals(start_date, end_date) == observed.totals(start_date, end_date)
+        for punch_type in ("LATE_IN", "DEFAULTER"):
+            assert from_records.type_counts(punch_type, start_date, end_date) == observed.type_counts(punch_type, start_date, end_date)
+    for start_date, end_date in RANGES:
+        assert from_partitions.totals(start_date, end_date) == scanned_totals(punches, start_date, end_date)
+
+def test_replacing_a_day_rolls_up_the_new_punches():
+    punches = random_punches(8, 2000)
+    rollups = PunchRollups()
+    rollups.observe(punches)
+    day = date(2025, 8, 12)
+    replaced = [punch for punch in punches if punch["employee_id"] == 2 and punch["timestamp"].date() == day]
+    new_day = [dict(punch, punch_type="DEFAULTER", is_late=False, lateness_minutes=0) for punch in replaced[1:]]
+
+    rollups.replace(2, day, new_day)
+    rollups.replace(3, day, [])
+
+    remaining = [punch for punch in punches if punch["timestamp"].date() != day or punch["employee_id"] not in (2, 3)] + new_day
+    for start_date, end_date in RANGES:
+        assert rollups.totals(start_date, end_date) == scanned_totals(remaining, start_date, end_date)
+        assert rollups.type_counts("DEFAULTER", start_date, end_date) == scanned_type_counts(remaining, "DEFAULTER", start_date, end_date)
+    assert rollups.day(3, day) is None
+
+def setup_function():
+    mock_punches.clear()
+    open_shifts.clear()
+    punch_rollups.clear()
+
+def test_inserted_and_reclassified_punches_are_rolled_up(monkeypatch):
+    monkeypatch.setitem(mock_employees[0], "shift_start_time", time(22, 0))
+    monkeypatch.setitem(mock_employees[0], "shift_end_time", time(6, 0))
+    today = date.today()
+    process_punch("123456", datetime.combine(today, time(6, 0)))
+    process_punch("123456", datetime.combine(today, time(22, 30)))
+    assert punch_rollups.day(1, today).to_dict() == {
+        "days": 1, "punches": 2, "late": 1, "lateness_minutes": 30, "early": 0, "earliness_minutes": 0
+    }
+
+    process_synced_punch("123456", datetime.combine(today, time(5, 0)))
+
+    assert [punch["punch_type"] for punch in mock_punches.day(1, today)] == ["OUT", "LATE_IN"]
+    assert employees_with_punch_type("OUT", today, today) == [{"employee_id": 1, "count": 1}]
+    assert punch_rollups.day(1, today).punches == 2
+
+def test_analytics_routes():
+    employees = [dict(mock_employees[0], id=i, badge_id=f"b{i}", team="ops" if i < 3 else None) for i in (1, 2, 3)]
+    punches = []
+    for offset in range(10):
+        day = date(2025, 7, 1) + timedelta(days=offset)
+        for employee in employees:
+            late = employee["id"] == 1 or (employee["id"] == 2 and offset < 2)
+            punches.append(make_punch(
+                employee["id"], datetime.combine(day, time(9, 30 if late else 0)), "LATE_IN" if late else "IN",
+                is_late=late, lateness_minutes=30 if late else 0
+            ))
+    punches.append(dict(punches[-1], punch_type="DEFAULTER", timestamp=datetime(2025, 7, 10, 23, 59), is_late=False, lateness_minutes=0))
+    punch_rollups.observe(punches)
+
+    from Background.task import app
+    from utils import helper
+    previous = list(helper.mock_employees)
+    helper.mock_employees[:] = employees
+    helper.get_storage().invalidate_employees()
+    try:
+        with TestClient(app) as client:
+            late = client.get("/analytics/punch-types/LATE_IN", params={"start_date": "2025-07-01", "end_date": "2025-07-31", "min_count": 4}).json()
+            defaulters = client.get("/analytics/punch-types/DEFAULTER", params={"start_date": "2025-07-07", "end_date": "2025-07-13"}).json()
+            teams = client.get("/analytics/lateness", params={"start_date": "2025-07-01", "end_date": "2025-09-30", "group_by": "team"}).json()
+            attendance = client.get("/analytics/attendance", params={"start_date": "2025-07-01", "end_date": "2025-07-05"}).json()
+            unknown = client.get("/analytics/punch-types/NAP", params={"start_date": "2025-07-01", "end_date": "2025-07-31"})
+            backwards = client.get("/analytics/lateness", params={"start_date": "2025-07-31", "end_date": "2025-07-01"})
+    finally:
+        helper.mock_employees[:] = previous
+        helper.get_storage().invalidate_employees()
+
+    assert late["employees"] == [{"employee_id": 1, "count": 10}]
+    assert defaulters["employees"] == [{"employee_id": 3, "count": 1}]
+    assert teams["groups"] == [
+        {"group": "ops", "employees": 2, "late_punches": 12, "lateness_minutes": 360, "average_lateness_minutes": 30.0},
+        {"group": None, "employees": 1, "late_punches": 0, "lateness_minutes": 0, "average_lateness_minutes": 0.0}
+    ]
+    assert [row["days"] for row in attendance["employees"]] == [5, 5, 5]
+    assert unknown.status_code == 404 and backwards.status_code == 400
+
+def test_lateness_can_be_grouped_by_shift():
+    punch_rollups.observe([make_punch(1, datetime(2025, 7, 1, 9, 20), "LATE_IN", is_late=True, lateness_minutes=20)])
+    assert lateness_summary(date(2025, 7, 1), date(2025, 7, 1), "shift") == [
+        {"group": "09:00-17:00", "employees": 1, "late_punches": 1, "lateness_minutes": 20, "average_lateness_minutes": 20.0}
+    ]
+
+def test_prune_drops_days_but_keeps_month_totals(tmp_path):
+    punches = [make_punch(1, datetime(2025, 7, 1, 9, 0) + timedelta(days=offset), is_late=True, lateness_minutes=15)
+               for offset in range(6)]
+    rollups = PunchRollups()
+    store = PartitionedPunchStore(str(tmp_path), hot_days=1, retention_days=2, on_expire=rollups.prune)
+    for punch in punches:
+        rollups.observe((punch,))
+        store.append(punch)
+
+    assert rollups.day(1, date(2025, 7, 3)) is None
+    assert rollups.day(1, date(2025, 7, 4)).punches == 1
+    assert rollups.totals(date(2025, 7, 1), date(2025, 7, 3)) == {}
+    assert rollups.type_counts("IN", date(2025, 7, 1), date(2025, 7, 3)) == {}
+    assert rollups.totals(date(2025, 7, 1), date(2025, 7, 31))[1] == Rollup(6, 6, 6, 90, 0, 0)
+    assert rollups.type_counts("IN", date(2025, 7, 1), date(2025, 7, 31)) == {1: 6}
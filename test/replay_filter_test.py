@@ -0,0 +1,124 @@
+from datetime import datetime, time, date, timedelta
+
+from fastapi.testclient import TestClient
+
+from utils import replay_filter as replay_module
+from utils.helper import mock_punches
+from utils.replay_filter import BloomFilter, ReplayFilter, MATCH_RECENT, MATCH_UNVERIFIED, MATCH_VERIFIED
+
+T = datetime(2025, 9, 1, 9, 0)
+
+def setup_function():
+    mock_punches.clear()
+
+def test_exact_replays_are_recognised():
+    replays = ReplayFilter()
+
+    assert replays.check("123456", T) is None
+    assert replays.check("123456", T) == MATCH_RECENT
+    assert replays.check("123456", T + timedelta(seconds=1)) is None
+    assert replays.check("654321", T) is None
+
+def test_memory_is_bounded_by_size_and_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(replay_module.clock, "monotonic", lambda: now[0])
+    replays = ReplayFilter(max_entries=3, window=60)
+
+    for minute in range(5):
+        replays.check("123456", T + timedelta(minutes=minute))
+    assert len(replays) == 3
+    assert replays.check("123456", T) is None
+
+    now[0] += 61
+    assert replays.check("123456", T + timedelta(minutes=4)) is None
+    assert len(replays) == 1
+
+def test_bloom_hits_are_verified_before_dropping():
+    verified = []
+
+    def verify(badge_id, timestamp):
+        verified.append((badge_id, timestamp))
+        return timestamp == T
+
+    replays = ReplayFilter(max_entries=1, bloom_capacity=1000, verify=verify)
+    replays.check("123456", T)
+    replays.check("123456", T + timedelta(minutes=1))
+    replays.check("123456", T + timedelta(minutes=2))
+
+    assert replays.check("123456", T) == MATCH_VERIFIED
+    assert replays.check("123456", T + timedelta(minutes=1)) is None
+    assert verified == [("123456", T), ("123456", T + timedelta(minutes=1))]
+
+def test_verification_can_be_deferred_to_confirm():
+    verified = []
+    replays = ReplayFilter(max_entries=1, bloom_capacity=1000, verify=lambda *key: verified.append(key) or True)
+    replays.check("123456", T)
+    replays.check("123456", T + timedelta(minutes=1))
+
+    assert replays.check("123456", T, verify=False) == MATCH_UNVERIFIED
+    assert verified == []
+    assert replays.confirm("123456", T) == MATCH_VERIFIED
+    assert replays.check("123456", T, verify=False) == MATCH_RECENT
+
+def test_api_verifies_replays_off_the_event_loop(monkeypatch):
+    import asyncio
+    from Background.task import app, replay_filter
+    replay_filter.clear()
+    on_loop = []
+
+    def verify(badge_id, timestamp):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return False
+
+    monkeypatch.setattr(replay_filter, "verify", verify)
+    monkeypatch.setattr(replay_filter, "_blooms", [BloomFilter(10), BloomFilter(10)])
+    timestamp = datetime.combine(date.today(), time(9, 0))
+    replay_filter._blooms[0].add(("123456", timestamp))
+
+    with TestClient(app) as client:
+        response = client.post("/punch", params={"badge_id": "123456", "timestamp": timestamp.isoformat()})
+
+    assert response.json()["status"] == "Punch received, processing in background."
+    assert on_loop == [False]
+
+def test_forgotten_keys_are_not_replays():
+    replays = ReplayFilter()
+    replays.check("123456", T)
+    replays.forget("123456", T)
+
+    assert replays.check("123456", T) is None
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(5000, 1e-3)
+    keys = [("b", T + timedelta(seconds=i)) for i in range(5000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(("c", T + timedelta(seconds=i)) in bloom for i in range(5000))
+    assert false_positives < 50
+
+def test_api_drops_replays_before_processing():
+    from Background.task import app, replay_filter, REPLAYS
+    replay_filter.clear()
+    timestamp = datetime.combine(date.today(), time(9, 0))
+    dropped = REPLAYS.labels(MATCH_RECENT).value
+    punches = [
+        {"badge_id": "123456", "timestamp": timestamp.isoformat()},
+        {"badge_id": "123456", "timestamp": timestamp.isoformat()},
+        {"badge_id": "123456", "timestamp": (timestamp + timedelta(hours=8)).isoformat()}
+    ]
+
+    with TestClient(app) as client:
+        batch = client.post("/punches/batch", json=punches).json()["results"]
+        single = client.post("/punch", params={"badge_id": "123456", "timestamp": timestamp.isoformat()}).json()
+
+    assert [result["status"] for result in batch] == ["accepted", "rejected", "accepted"]
+    assert batch[1]["reason"] == "replay"
+    assert single["status"] == "Duplicate punch ignored."
+    assert REPLAYS.labels(MATCH_RECENT).value == dropped + 2
+    assert len(mock_punches) == 2
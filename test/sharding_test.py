@@ -0,0 +1,73 @@
+from datetime import datetime, date, time, timedelta
+
+import pytest
+
+import main
+from Background.sharding import ShardedPunchRouter, shard_for_employee
+from benchmarks.workload import generate_workload
+from utils import helper
+from utils.overtime_approvals import OvertimeApprovalIndex
+from utils.punch_index import PunchIndex
+from utils.storage import MemoryStorage
+
+WORKLOAD = generate_workload(40, 2, seed=3)
+
+@pytest.fixture(scope="module")
+def router():
+    router = ShardedPunchRouter(WORKLOAD.employees, WORKLOAD.approvals, shards=3)
+    yield router
+    router.close()
+
+@pytest.fixture
+def reference():
+    previous = helper.set_storage(MemoryStorage(WORKLOAD.employees, PunchIndex(), OvertimeApprovalIndex(WORKLOAD.approvals)))
+    yield
+    helper.set_storage(previous)
+
+def test_sharded_pipeline_matches_single_process(router, reference):
+    sharded = router.process_punches(WORKLOAD.punches + [("unknown", datetime(2025, 1, 6, 9, 0))])
+    expected = main.process_punches(WORKLOAD.punches + [("unknown", datetime(2025, 1, 6, 9, 0))])
+
+    assert sharded == expected
+    for day in WORKLOAD.days:
+        assert router.sweep_missing_punch_outs(day, datetime.combine(day, main.END_OF_DAY)) != []
+        main.sweep_missing_punch_outs(day, datetime.combine(day, main.END_OF_DAY))
+    employee_ids = [employee["id"] for employee in WORKLOAD.employees]
+    assert router.calculate_work_hours_bulk(employee_ids, WORKLOAD.days[0], WORKLOAD.days[-1]) == \
+        main.calculate_work_hours_bulk(employee_ids, WORKLOAD.days[0], WORKLOAD.days[-1])
+    assert router.calculate_work_hours(1, WORKLOAD.days[0]) == main.calculate_work_hours(1, WORKLOAD.days[0])
+
+def test_single_punches_go_to_the_employee_shard(router):
+    employee = next(e for e in WORKLOAD.employees if e["is_active"])
+    day = date(2025, 3, 3)
+
+    start = datetime.combine(day, employee["shift_start_time"])
+    punch = router.process_punch(employee["badge_id"], start)
+
+    assert punch["employee_id"] == employee["id"]
+    assert punch["punch_type"] == "IN"
+    assert router.shard_for_badge(employee["badge_id"]) == shard_for_employee(employee["id"], router.shards)
+    assert router.process_punch(employee["badge_id"], start + timedelta(minutes=5)) is None
+
+def test_approval_writes_and_metrics_reach_the_shards(router, reference):
+    from utils import metrics
+    employee = next(e for e in WORKLOAD.employees if e["is_active"] and e["shift_end_time"] == time(6, 0))
+    day = date(2025, 4, 7)
+    at = lambda hour, minute=0: datetime.combine(day, time(hour, minute))
+    helper.add_approval_mirror(router)
+    try:
+        assert router.process_punch(employee["badge_id"], at(6))["punch_type"] == "OUT"
+        assert router.process_punch(employee["badge_id"], at(7)) is None
+        helper.add_overtime_approvals([{"employee_id": employee["id"], "date": day, "is_approved": True}])
+        assert router.process_punch(employee["badge_id"], at(7, 1))["punch_type"] == "OVERTIME_IN"
+        assert helper.revoke_overtime_approval(employee["id"], day)
+        assert router.process_punch(employee["badge_id"], at(8)) is None
+    finally:
+        helper.remove_approval_mirror(router)
+
+    snapshots = router.metrics_snapshots()
+    unapproved = sum(s["punch_outcomes"][(main.REJECT_UNAPPROVED_OVERTIME,)][0] for s in snapshots if "punch_outcomes" in s)
+    assert unapproved >= 2
+    local = main.OUTCOMES[main.REJECT_UNAPPROVED_OVERTIME].value
+    rendered = metrics.render(snapshots)
+    assert f'punch_outcomes_total{{outcome="{main.REJECT_UNAPPROVED_OVERTIME}"}} {local + unapproved}' in rendered
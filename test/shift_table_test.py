@@ -0,0 +1,71 @@
+import random
+from datetime import datetime, time, date, timedelta
+
+import numpy as np
+
+from main import PunchContext, determine_punch_type
+from utils.employee_directory import shift_window
+from utils.punch_types import PUNCH_TYPES
+from utils.shift_table import classify_minutes, minutes_of_day
+
+SHIFTS = [
+    (time(9, 0), time(17, 0)), (time(14, 0), time(22, 0)), (time(22, 0), time(6, 0)),
+    (time(0, 5), time(8, 0)), (time(16, 0), time(23, 55)), (time(8, 30), time(8, 45))
+]
+LAST_TYPES = (None,) + PUNCH_TYPES
+
+def reference_punch_type(shift_start: time, shift_end: time, last_punch_type, timestamp: datetime) -> dict:
+    """The comparison chain ``determine_punch_type`` used before the tables."""
+    punch_minutes = timestamp.hour * 60 + timestamp.minute
+    start_minutes = shift_start.hour * 60 + shift_start.minute
+    end_minutes = shift_end.hour * 60 + shift_end.minute
+    result = {"type": "UNKNOWN", "is_late": False, "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0}
+    if abs(punch_minutes - start_minutes) <= 10:
+        result["type"] = "IN"
+    elif punch_minutes > start_minutes + 10:
+        result.update(type="LATE_IN", is_late=True, lateness_minutes=punch_minutes - start_minutes)
+    elif abs(punch_minutes - end_minutes) <= 10:
+        result["type"] = "OUT"
+    elif punch_minutes < end_minutes - 10:
+        result.update(type="OUT", is_early=True, earliness_minutes=end_minutes - punch_minutes)
+    elif start_minutes < punch_minutes < end_minutes:
+        result["type"] = "BREAK_OUT" if last_punch_type in ["IN", "BREAK_IN"] else "BREAK_IN"
+    elif punch_minutes > end_minutes + 10:
+        result["type"] = "OVERTIME_IN" if last_punch_type in ["OUT", "BREAK_OUT"] else "OVERTIME_OUT"
+    return result
+
+def employee(shift_start: time, shift_end: time) -> dict:
+    return {"id": 1, "badge_id": "1", "is_active": True, "shift_start_time": shift_start, "shift_end_time": shift_end}
+
+def test_every_minute_matches_the_comparison_chain():
+    day = date(2025, 9, 1)
+    for shift_start, shift_end in SHIFTS:
+        for last_type in LAST_TYPES:
+            last_punch = {"punch_type": last_type} if last_type else None
+            context = PunchContext(employee(shift_start, shift_end), day, last_punch)
+            for minute in range(1440):
+                timestamp = datetime.combine(day, time(0, 0)) + timedelta(minutes=minute, seconds=minute % 60)
+                assert determine_punch_type(context, timestamp) == reference_punch_type(shift_start, shift_end, last_type, timestamp)
+
+def test_batch_matches_single_classification():
+    rng = random.Random(17)
+    day = date(2025, 9, 1)
+    for shift_start, shift_end in SHIFTS:
+        timestamps = [datetime.combine(day, time(0, 0)) + timedelta(seconds=rng.randrange(86400)) for _ in range(500)]
+        last_types = [rng.choice(LAST_TYPES) for _ in timestamps]
+
+        batch = classify_minutes(shift_window(shift_start, shift_end).table, minutes_of_day(timestamps))
+
+        assert len(batch) == len(timestamps)
+        for i, (timestamp, last_type) in enumerate(zip(timestamps, last_types)):
+            assert batch.result(i, last_type) == reference_punch_type(shift_start, shift_end, last_type, timestamp)
+
+def test_minutes_of_day():
+    stamps = [datetime(2025, 9, 1, 0, 0, 59), datetime(2025, 9, 1, 23, 59, 59, 999999), datetime(2025, 9, 2, 13, 7)]
+    assert minutes_of_day(stamps).tolist() == [0, 1439, 787]
+
+def test_tables_are_shared_per_shift_and_window():
+    table = shift_window(time(9, 0), time(17, 0)).table
+    assert shift_window(time(9, 0), time(17, 0)).table is table
+    assert shift_window(time(9, 0), time(17, 0), 15).table is not table
+    assert np.count_nonzero(shift_window(time(9, 0), time(17, 0), 15).table.kinds != table.kinds) > 0
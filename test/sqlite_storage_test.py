@@ -0,0 +1,97 @@
+import random
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+from main import process_punch, process_punches, calculate_work_hours, calculate_work_hours_bulk
+from utils import helper
+from utils.helper import mock_employees, mock_punches
+from utils.sqlite_storage import SqliteStorage, SELECT_LAST_PUNCH
+from utils.storage import MemoryStorage
+
+@pytest.fixture
+def sqlite_storage(tmp_path, approvals):
+    storage = SqliteStorage(str(tmp_path / "punches.db"))
+    storage.add_employees(mock_employees)
+    storage.add_overtime_approvals(approvals)
+    previous = helper.set_storage(storage)
+    yield storage
+    helper.set_storage(previous)
+    storage.close()
+
+def setup_function():
+    mock_punches.clear()
+
+def random_punches(seed, count):
+    rng = random.Random(seed)
+    start = datetime.combine(date.today(), time(0, 0))
+    return sorted(start + timedelta(minutes=rng.randint(0, 24 * 60 - 1)) for _ in range(count))
+
+def test_sqlite_matches_memory_storage(sqlite_storage, approvals):
+    timestamps = random_punches(11, 40)
+    memory_storage = MemoryStorage(mock_employees, mock_punches, approvals)
+
+    sqlite_results = [process_punch("123456", ts) for ts in timestamps]
+    sqlite_summary = calculate_work_hours(1, date.today())
+    helper.set_storage(memory_storage)
+    memory_results = [process_punch("123456", ts) for ts in timestamps]
+    memory_summary = calculate_work_hours(1, date.today())
+    helper.set_storage(sqlite_storage)
+
+    assert sqlite_results == memory_results
+    assert sqlite_summary == memory_summary
+    assert sqlite_storage.get_all_punches_for_day(1, date.today()) == list(mock_punches)
+
+def test_sqlite_batch_insert_and_lookups(sqlite_storage):
+    t = datetime.combine(date.today(), time(9, 0))
+
+    results = process_punches([("123456", t), ("000000", t), ("123456", t + timedelta(minutes=5))])
+
+    assert [r["status"] for r in results] == ["accepted", "rejected", "rejected"]
+    entry, last_punch = sqlite_storage.get_employee_with_last_punch("123456", t.date())
+    assert entry.employee == mock_employees[0]
+    assert entry.shift.start_time == time(9, 0)
+    assert last_punch["punch_type"] == "IN"
+    assert sqlite_storage.get_last_punches([(1, t.date()), (2, t.date())]) == {(1, t.date()): last_punch}
+    assert sqlite_storage.get_overtime_approvals([(1, date.today())])[(1, date.today())]["is_approved"] is True
+    assert sqlite_storage.get_employee_shift_time(42) == {"start": time(9, 0), "end": time(17, 0)}
+
+def test_last_punch_is_an_index_seek(sqlite_storage):
+    with sqlite_storage.pool.connection() as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN " + SELECT_LAST_PUNCH, (1, "2025-07-21")).fetchall()
+
+    details = " ".join(row[3] for row in plan)
+    assert "idx_punch_employee_day" in details
+    assert "TEMP B-TREE" not in details
+
+def test_sqlite_range_feeds_bulk_work_hours(sqlite_storage):
+    for ts in random_punches(13, 40):
+        process_punch("123456", ts)
+
+    bulk = calculate_work_hours_bulk([1], date.today() - timedelta(days=1), date.today())
+
+    assert bulk[(1, date.today())] == calculate_work_hours(1, date.today())
+
+def test_sqlite_replace_day_punches(sqlite_storage):
+    today, yesterday = date.today(), date.today() - timedelta(days=1)
+    punch = {"employee_id": 1, "punch_type": "IN", "timestamp": datetime.combine(today, time(9, 0)),
+             "is_late": False, "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0}
+    kept = dict(punch, timestamp=datetime.combine(yesterday, time(9, 0)))
+    sqlite_storage.insert_punches([punch, dict(punch, timestamp=datetime.combine(today, time(9, 5))), kept])
+
+    replacement = dict(punch, punch_type="LATE_IN", is_late=True, lateness_minutes=30, timestamp=datetime.combine(today, time(9, 30)))
+    sqlite_storage.replace_day_punches(1, today, [replacement])
+
+    assert sqlite_storage.get_all_punches_for_day(1, today) == [replacement]
+    assert sqlite_storage.get_all_punches_for_day(1, yesterday) == [kept]
+
+def test_range_reader_does_not_hold_a_connection_between_rows(sqlite_storage):
+    punch = {"employee_id": 1, "punch_type": "IN", "timestamp": datetime.combine(date.today(), time(9, 0)),
+             "is_late": False, "lateness_minutes": 0, "is_early": False, "earliness_minutes": 0}
+    sqlite_storage.insert_punches([punch, dict(punch, punch_type="OUT", timestamp=datetime.combine(date.today(), time(17, 0)))])
+
+    rows = sqlite_storage.get_punches_for_range([1], date.today(), date.today())
+
+    assert next(rows) == punch
+    assert sqlite_storage.pool._connections.full()
+    assert len(list(rows)) == 1
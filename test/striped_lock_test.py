@@ -0,0 +1,109 @@
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+import main
+from main import process_punch, process_punches
+from utils.striped_lock import StripedLock
+
+DAY = date(2025, 9, 1)
+THREADS = 32
+# Night shift: 06:00 classifies as OUT and 22:00 as IN.
+EMPLOYEES = [
+    {"id": i, "badge_id": f"{i:06d}", "is_active": True, "shift_start_time": time(22, 0), "shift_end_time": time(6, 0)}
+    for i in range(1, 101)
+]
+
+@pytest.fixture
+def store(memory_storage):
+    return memory_storage(EMPLOYEES)
+
+def race(target, rounds):
+    """Run ``target(thread, round)`` on THREADS threads, all starting each round together.
+
+    Threads are switched every few microseconds rather than every 5 ms, so
+    an unguarded read-classify-insert is interrupted often enough to fail.
+    """
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def worker(thread):
+        try:
+            for round_ in rounds:
+                barrier.wait()
+                target(thread, round_)
+        except Exception as exc:
+            errors.append(exc)
+            barrier.abort()
+
+    threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(THREADS)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+def punch_types(punches):
+    return Counter((punch["employee_id"], punch["punch_type"]) for punch in punches)
+
+@pytest.mark.parametrize("locks", [StripedLock(), StripedLock(1)], ids=["striped", "global"])
+def test_concurrent_punches_for_one_employee_are_accepted_once(store, monkeypatch, locks):
+    monkeypatch.setattr(main, "employee_locks", locks)
+
+    def punch_every_badge(thread, shift_time):
+        # Every thread punches every badge, each in its own order, a second apart.
+        badges = [employee["badge_id"] for employee in EMPLOYEES]
+        random.Random(thread).shuffle(badges)
+        timestamp = datetime.combine(DAY, shift_time) + timedelta(seconds=thread)
+        for badge_id in badges:
+            process_punch(badge_id, timestamp)
+
+    race(punch_every_badge, [time(6, 0), time(22, 0)])
+
+    expected = Counter({(employee["id"], punch_type): 1 for employee in EMPLOYEES for punch_type in ("OUT", "IN")})
+    assert punch_types(store) == expected
+    for employee in EMPLOYEES:
+        assert [punch["punch_type"] for punch in store.day(employee["id"], DAY)] == ["OUT", "IN"]
+
+def test_batches_and_single_punches_do_not_interleave(store):
+    def punch(thread, shift_time):
+        timestamp = datetime.combine(DAY, shift_time) + timedelta(seconds=thread)
+        if thread % 2:
+            process_punches([(employee["badge_id"], timestamp) for employee in EMPLOYEES])
+        else:
+            for employee in EMPLOYEES:
+                process_punch(employee["badge_id"], timestamp)
+
+    race(punch, [time(6, 0), time(22, 0)])
+
+    assert set(punch_types(store).values()) == {1}
+    assert len(store) == 2 * len(EMPLOYEES)
+
+def test_hold_takes_each_stripe_once_in_order():
+    locks = StripedLock(4)
+    assert [locks.stripe(key) for key in (1, 5, 2)] == [1, 1, 2]
+
+    with locks.hold([5, 2, 1, 6]):
+        # Re-entrant: the holder can take its stripes again.
+        with locks.lock(1):
+            pass
+        results = []
+        held = threading.Thread(target=lambda: results.append(locks.lock(2).acquire(timeout=0.01)))
+        held.start()
+        held.join()
+    assert results == [False]
+    assert locks.lock(2).acquire(blocking=False)
+    locks.lock(2).release()
+
+def test_stripes_must_be_positive():
+    with pytest.raises(ValueError):
+        StripedLock(0)
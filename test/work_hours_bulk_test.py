@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, time, date, timedelta
+
+import pytest
+
+from main import calculate_work_hours, calculate_work_hours_bulk
+from utils.helper import mock_employees, mock_punches, insert_punch
+from utils.punch_types import PUNCH_TYPES
+
+def setup_function():
+    mock_punches.clear()
+
+@pytest.fixture
+def second_shift_employee():
+    employee = {
+        "id": 2, "badge_id": "222222", "is_active": True,
+        "shift_start_time": time(14, 0), "shift_end_time": time(22, 30)
+    }
+    mock_employees.append(employee)
+    yield employee
+    mock_employees.remove(employee)
+
+def test_bulk_matches_per_day_reference(second_shift_employee):
+    rng = random.Random(5)
+    start = date(2025, 7, 1)
+    for _ in range(3000):
+        day = start + timedelta(days=rng.randint(0, 9))
+        insert_punch({
+            "employee_id": rng.randint(1, 6),
+            "punch_type": rng.choice(PUNCH_TYPES + ("UNKNOWN",)),
+            "timestamp": datetime.combine(day, time(0, 0)) + timedelta(microseconds=rng.randint(0, 86_400_000_000 - 1)),
+            "is_late": False,
+            "lateness_minutes": 0,
+            "is_early": False,
+            "earliness_minutes": 0
+        })
+
+    end = start + timedelta(days=9)
+    bulk = calculate_work_hours_bulk(range(1, 8), start, end)
+
+    assert len(bulk) == 7 * 10
+    for (employee_id, day), summary in bulk.items():
+        assert summary == calculate_work_hours(employee_id, day)
+
+def test_bulk_sequence_with_breaks_overtime_and_defaulter():
+    day = date(2025, 7, 21)
+    for hour, minute, punch_type in [
+        (9, 0, "IN"), (12, 0, "BREAK_OUT"), (13, 0, "BREAK_IN"), (17, 0, "OUT"),
+        (17, 30, "OVERTIME_IN"), (19, 30, "OVERTIME_OUT"), (20, 0, "IN"), (23, 59, "DEFAULTER")
+    ]:
+        insert_punch({"employee_id": 1, "punch_type": punch_type, "timestamp": datetime.combine(day, time(hour, minute))})
+
+    summary = calculate_work_hours_bulk([1], day, day)[(1, day)]
+
+    assert summary == calculate_work_hours(1, day)
+    assert summary["break_hours"] == 1.0
+    assert summary["overtime_hours"] == 2.0
+
+def test_bulk_returns_zeros_for_days_without_punches():
+    day = date(2025, 7, 21)
+
+    assert calculate_work_hours_bulk([1], day, day) == {
+        (1, day): {"work_hours": 0.0, "break_hours": 0.0, "overtime_hours": 0.0}
+    }
@@ -0,0 +1,387 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from utils.day_totals import DayTotals, DayTotalsCache
+from utils.punch_types import punch_code_type, punch_type_code
+from utils.work_hours import EPOCH, EPOCH_ORDINAL, MICROS_PER_DAY, to_micros
+
+LATE_FLAG = 1
+EARLY_FLAG = 2
+
+# Day ordinals stay below 2**20 until the year 2870, so (employee_id, day)
+# packs into one small int instead of a tuple key.
+DAY_BITS = 20
+
+def _day_key(employee_id: int, day_ordinal: int) -> int:
+    return (employee_id << DAY_BITS) | day_ordinal
+
+def _day_keys(employee_ids: np.ndarray, micros: np.ndarray) -> np.ndarray:
+    return (employee_ids.astype(np.int64) << DAY_BITS) | (micros // MICROS_PER_DAY + EPOCH_ORDINAL)
+
+# One punch as packed little-endian fields, matching the store's columns.
+RECORD_DTYPE = np.dtype([
+    ("employee_id", "<i4"),
+    ("timestamp", "<i8"),
+    ("code", "u1"),
+    ("flags", "u1"),
+    ("lateness", "<i2"),
+    ("earliness", "<i2")
+])
+
+def punch_record(punch) -> tuple:
+    """``punch`` as a tuple in ``RECORD_DTYPE`` field order."""
+    return (
+        punch["employee_id"],
+        to_micros(punch["timestamp"]),
+        punch_type_code(punch["punch_type"]),
+        (LATE_FLAG if punch.get("is_late") else 0) | (EARLY_FLAG if punch.get("is_early") else 0),
+        punch.get("lateness_minutes", 0),
+        punch.get("earliness_minutes", 0)
+    )
+
+FIELDS = ("employee_id", "punch_type", "timestamp", "is_late", "lateness_minutes", "is_early", "earliness_minutes")
+
+
+class PunchRow:
+    """Read-only view of one row of a ``ColumnarPunchStore``.
+
+    Supports attribute access like ``models.schema.Punch`` and key access
+    like the punch dicts used elsewhere, without materializing either.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "ColumnarPunchStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def employee_id(self) -> int:
+        return self._store.employee_ids[self._row]
+
+    @property
+    def punch_type(self) -> str:
+        return punch_code_type(self._store.codes[self._row])
+
+    @property
+    def timestamp(self) -> datetime:
+        return EPOCH + timedelta(microseconds=self._store.timestamps[self._row])
+
+    @property
+    def is_late(self) -> bool:
+        return bool(self._store.flags[self._row] & LATE_FLAG)
+
+    @property
+    def lateness_minutes(self) -> int:
+        return self._store.lateness[self._row]
+
+    @property
+    def is_early(self) -> bool:
+        return bool(self._store.flags[self._row] & EARLY_FLAG)
+
+    @property
+    def earliness_minutes(self) -> int:
+        return self._store.earliness[self._row]
+
+    def __getitem__(self, field: str):
+        if field not in FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in FIELDS else default
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PunchRow):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PunchRow({self.to_dict()!r})"
+
+
+class ColumnarPunchStore:
+    """Punch history held as parallel typed arrays, one entry per punch.
+
+    Columns are int32 employee_id, int64 timestamp (microseconds since
+    1970-01-01, so nothing is lost converting back to ``datetime``), uint8
+    punch type code, uint8 late/early flags and int16 lateness/earliness
+    minutes: 18 bytes a punch against several hundred for a dict holding a
+    ``datetime`` and a string. The per-day index maps a packed
+    (employee_id, day) int to a row number, or to a compact array of row
+    numbers for days with several punches.
+
+    It is a drop-in replacement for ``PunchIndex`` as the punch list of
+    ``MemoryStorage``; lookups return ``PunchRow`` views. Writes are
+    serialized internally, since a row spans six arrays; reads take no
+    lock, as a row is only indexed once all of its columns are written.
+    """
+
+    def __init__(self, punches=()):
+        self.employee_ids = array("i")
+        self.timestamps = array("q")
+        self.codes = array("B")
+        self.flags = array("B")
+        self.lateness = array("h")
+        self.earliness = array("h")
+        # Day key -> row number for single-punch days, or an array of row
+        # numbers in timestamp order once a second punch arrives.
+        self._days: Dict[int, Union[int, array]] = {}
+        # Sealed index over rows loaded in bulk, held as NumPy arrays so it is
+        # built by one sort and pickles as flat buffers: sorted day keys, and
+        # for key i the rows _sealed_rows[_sealed_offsets[i]:_sealed_offsets[i + 1]].
+        self._sealed_keys = np.empty(0, dtype=np.int64)
+        self._sealed_offsets = np.zeros(1, dtype=np.int64)
+        self._sealed_rows = np.empty(0, dtype=np.uint32)
+        # Rows of replaced days, skipped until the next seal drops them, and
+        # the day keys whose sealed rows were replaced.
+        self._dead = set()
+        self._replaced = set()
+        self._totals = DayTotalsCache()
+        self._write_lock = threading.RLock()
+        self.extend(punches)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_write_lock"]
+        return state
+
+    def __setstate__(self, state) -> None:
+        state.setdefault("_dead", set())
+        state.setdefault("_replaced", set())
+        self.__dict__.update(state)
+        self._write_lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.timestamps) - len(self._dead)
+
+    def __iter__(self) -> Iterator[PunchRow]:
+        dead = self._dead
+        return (PunchRow(self, row) for row in range(len(self.timestamps)) if row not in dead)
+
+    def __getitem__(self, row: int) -> PunchRow:
+        if row < 0:
+            row += len(self.timestamps)
+        if not 0 <= row < len(self.timestamps):
+            raise IndexError(row)
+        return PunchRow(self, row)
+
+    def _timestamp_of(self, row: int) -> int:
+        return self.timestamps[row]
+
+    def append(self, punch) -> None:
+        self.append_record(*punch_record(punch))
+
+    def append_record(self, employee_id: int, micros: int, code: int, flags: int, lateness: int, earliness: int) -> None:
+        with self._write_lock:
+            row = len(self.timestamps)
+            self.employee_ids.append(employee_id)
+            self.timestamps.append(micros)
+            self.codes.append(code)
+            self.flags.append(flags)
+            self.lateness.append(lateness)
+            self.earliness.append(earliness)
+            key = _day_key(employee_id, micros // MICROS_PER_DAY + EPOCH_ORDINAL)
+            self._index_row(key, row, micros)
+            self._totals.appended(key, PunchRow(self, row), lambda: len(self._key_rows(key)))
+
+    def _index_row(self, key: int, row: int, micros: int) -> None:
+        bucket = self._days.get(key)
+        if bucket is None:
+            self._days[key] = row
+            return
+        if isinstance(bucket, int):
+            bucket = self._days[key] = array("I", (bucket,))
+        if self.timestamps[bucket[-1]] <= micros:
+            bucket.append(row)
+        else:
+            # Insert into a copy, so a concurrent reader never sees it half-sorted.
+            bucket = array("I", bucket)
+            insort(bucket, row, key=self._timestamp_of)
+            self._days[key] = bucket
+
+    def extend_records(self, records: np.ndarray) -> None:
+        """Append a ``RECORD_DTYPE`` array, e.g. straight from a journal.
+
+        The columns are extended with one copy each. Loaded into an empty
+        store, the rows become the sealed index with a single sort and no
+        per-row work; otherwise they are indexed day by day.
+        """
+        with self._write_lock:
+            if not len(records):
+                return
+            start = len(self.timestamps)
+            for column, field in zip(self._columns(), RECORD_DTYPE.names):
+                column.frombytes(np.ascontiguousarray(records[field], dtype=column.typecode).tobytes())
+            if start == 0:
+                self.seal()
+                self._totals.clear()
+                return
+
+            micros = records["timestamp"].astype(np.int64)
+            keys = _day_keys(records["employee_id"], micros)
+            rows = np.arange(start, start + len(records), dtype=np.int64)
+            order = np.lexsort((rows, micros, keys))
+            keys, rows = keys[order], rows[order].astype(np.uint32)
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(keys)])
+            days = self._days
+            for key, first, size in zip(keys[starts].tolist(), starts.tolist(), sizes.tolist()):
+                if key in days:
+                    for row in rows[first:first + size].tolist():
+                        self._index_row(key, row, self.timestamps[row])
+                elif size == 1:
+                    days[key] = int(rows[first])
+                else:
+                    days[key] = array("I", rows[first:first + size].tobytes())
+            self._totals.clear()
+
+    def replace_day(self, employee_id: int, punch_date: date, punches: Sequence[dict]) -> None:
+        self.replace_day_records(employee_id, punch_date,
+                                 np.array([punch_record(punch) for punch in punches], dtype=RECORD_DTYPE))
+
+    def replace_day_records(self, employee_id: int, punch_date: date, records: np.ndarray) -> None:
+        """Swap the day's rows for ``records``, all of that employee and day.
+
+        The new rows are appended and indexed; the old ones stay in the
+        columns, skipped, until the next ``seal`` drops them.
+        """
+        key = _day_key(employee_id, punch_date.toordinal())
+        with self._write_lock:
+            old = list(self._key_rows(key))
+            start = len(self.timestamps)
+            for column, field in zip(self._columns(), RECORD_DTYPE.names):
+                column.frombytes(np.ascontiguousarray(records[field], dtype=column.typecode).tobytes())
+            rows = sorted(range(start, start + len(records)), key=lambda row: (self.timestamps[row], row))
+            self._dead.update(old)
+            self._replaced.add(key)
+            if not rows:
+                self._days.pop(key, None)
+            else:
+                self._days[key] = rows[0] if len(rows) == 1 else array("I", rows)
+            self._totals.discard(key)
+
+    def seal(self) -> None:
+        """Fold every row into the sealed index and empty the per-day dict,
+        dropping the rows of replaced days.
+
+        Meant for loading: run it while no other thread reads the store.
+        """
+        with self._write_lock:
+            if self._dead:
+                live = self.records()
+                for column, field in zip(self._columns(), RECORD_DTYPE.names):
+                    del column[:]
+                    column.frombytes(np.ascontiguousarray(live[field], dtype=column.typecode).tobytes())
+                self._dead.clear()
+                # Row numbers moved, so cached totals point at the wrong rows.
+                self._totals.clear()
+            self._replaced.clear()
+            if not len(self):
+                self._days.clear()
+                self._sealed_keys = np.empty(0, dtype=np.int64)
+                self._sealed_offsets = np.zeros(1, dtype=np.int64)
+                self._sealed_rows = np.empty(0, dtype=np.uint32)
+                return
+            employee_ids = np.frombuffer(self.employee_ids, dtype=self.employee_ids.typecode)
+            micros = np.frombuffer(self.timestamps, dtype=np.int64)
+            keys = _day_keys(employee_ids, micros)
+            rows = np.arange(len(self), dtype=np.int64)
+            order = np.lexsort((rows, micros, keys))
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            self._sealed_keys = keys[starts]
+            self._sealed_offsets = np.r_[starts, len(keys)].astype(np.int64)
+            self._sealed_rows = order.astype(np.uint32)
+            self._days.clear()
+
+    def records(self) -> np.ndarray:
+        """All rows as one ``RECORD_DTYPE`` array, in insertion order."""
+        records = np.empty(len(self.timestamps), dtype=RECORD_DTYPE)
+        for column, field in zip(self._columns(), RECORD_DTYPE.names):
+            records[field] = np.frombuffer(column, dtype=column.typecode) if len(column) else []
+        if self._dead:
+            records = np.delete(records, sorted(self._dead))
+        return records
+
+    def _columns(self):
+        return (self.employee_ids, self.timestamps, self.codes, self.flags, self.lateness, self.earliness)
+
+    def extend(self, punches) -> None:
+        for punch in punches:
+            self.append(punch)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            for column in self._columns():
+                del column[:]
+            self._days.clear()
+            self._sealed_keys = np.empty(0, dtype=np.int64)
+            self._sealed_offsets = np.zeros(1, dtype=np.int64)
+            self._sealed_rows = np.empty(0, dtype=np.uint32)
+            self._dead.clear()
+            self._replaced.clear()
+            self._totals.clear()
+
+    def _sealed(self, key: int) -> List[int]:
+        i = int(np.searchsorted(self._sealed_keys, key))
+        if i == len(self._sealed_keys) or self._sealed_keys[i] != key:
+            return []
+        return self._sealed_rows[self._sealed_offsets[i]:self._sealed_offsets[i + 1]].tolist()
+
+    def _rows(self, employee_id: int, punch_date: date) -> Sequence[int]:
+        return self._key_rows(_day_key(employee_id, punch_date.toordinal()))
+
+    def _key_rows(self, key: int) -> Sequence[int]:
+        bucket = self._days.get(key)
+        if bucket is None:
+            bucket = ()
+        elif isinstance(bucket, int):
+            bucket = (bucket,)
+        if not len(self._sealed_keys) or key in self._replaced:
+            return bucket
+        sealed = self._sealed(key)
+        if not bucket:
+            return sealed
+        # The day has both sealed and newer rows; row numbers grow with
+        # insertion, so (timestamp, row) keeps the recorded order on ties.
+        return sorted(sealed + list(bucket), key=lambda row: (self.timestamps[row], row))
+
+    def last(self, employee_id: int, punch_date: date) -> Optional[PunchRow]:
+        bucket = self._rows(employee_id, punch_date)
+        if not bucket:
+            return None
+        latest = self.timestamps[bucket[-1]]
+        if len(bucket) == 1 or self.timestamps[bucket[-2]] != latest:
+            return PunchRow(self, bucket[-1])
+        # Same tie rule as PunchIndex.last: the first punch recorded wins.
+        return PunchRow(self, bucket[bisect_left(bucket, latest, key=self._timestamp_of)])
+
+    def day(self, employee_id: int, punch_date: date) -> List[PunchRow]:
+        return list(self.bucket(employee_id, punch_date))
+
+    def bucket(self, employee_id: int, punch_date: date) -> Sequence[PunchRow]:
+        return [PunchRow(self, row) for row in self._rows(employee_id, punch_date)]
+
+    def totals(self, employee_id: int, punch_date: date) -> DayTotals:
+        """Running work-hour totals for the day; do not mutate."""
+        key = _day_key(employee_id, punch_date.toordinal())
+        return self._totals.get(key, punch_date, lambda: [PunchRow(self, row) for row in self._key_rows(key)])
+
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays and the per-day row index."""
+        columns = self._columns()
+        index = sum(b.itemsize * len(b) if isinstance(b, array) else 4 for b in self._days.values())
+        sealed = self._sealed_keys.nbytes + self._sealed_rows.nbytes
+        if len(self._sealed_keys):
+            sealed += self._sealed_offsets.nbytes
+        return sum(c.itemsize * len(c) for c in columns) + index + sealed
@@ -0,0 +1,124 @@
+import threading
+from datetime import date, datetime, time
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from utils.punch_types import IN_TYPES, OUT_TYPES
+
+
+class DayTotals:
+    """Running ``calculate_work_hours`` state for one employee's day.
+
+    Punches are folded in timestamp order with ``add``, doing the same
+    float additions in the same order as a full walk of the day, so
+    ``summary`` is identical to recomputing from scratch. A DEFAULTER that
+    closes an open IN needs the employee's shift end; when ``add`` is not
+    given one, the totals are marked incomplete instead.
+    """
+    __slots__ = ("punch_date", "count", "complete", "work", "break_", "overtime",
+                 "last_in", "last_type", "previous_type", "previous_timestamp")
+
+    def __init__(self, punch_date: date):
+        self.punch_date = punch_date
+        self.count = 0
+        self.complete = True
+        self.work = self.break_ = self.overtime = 0.0
+        self.last_in = self.last_type = None
+        self.previous_type = self.previous_timestamp = None
+
+    def add(self, punch, shift_end: Optional[Callable[[], time]] = None) -> None:
+        punch_type = punch["punch_type"]
+        timestamp = punch["timestamp"]
+        self.count += 1
+        if punch_type in IN_TYPES:
+            self.last_in = timestamp
+            self.last_type = punch_type
+        elif punch_type in OUT_TYPES and self.last_in:
+            duration = (timestamp - self.last_in).total_seconds() / 3600.0
+            if self.last_type == "OVERTIME_IN":
+                self.overtime += duration
+            else:
+                self.work += duration
+            self.last_in = self.last_type = None
+        elif punch_type == "DEFAULTER" and self.last_in:
+            if shift_end is None:
+                self.complete = False
+            else:
+                shift_end_time = datetime.combine(self.punch_date, shift_end())
+                self.work += (shift_end_time - self.last_in).total_seconds() / 3600.0
+            self.last_in = self.last_type = None
+
+        if self.previous_type == "BREAK_OUT" and punch_type == "BREAK_IN":
+            self.break_ += (timestamp - self.previous_timestamp).total_seconds() / 3600.0
+        self.previous_type = punch_type
+        self.previous_timestamp = timestamp
+
+    def summary(self) -> dict:
+        return {
+            "work_hours": round(self.work, 2),
+            "break_hours": round(self.break_, 2),
+            "overtime_hours": round(self.overtime, 2)
+        }
+
+    @classmethod
+    def from_punches(cls, punch_date: date, punches: Iterable, shift_end: Optional[Callable[[], time]] = None) -> "DayTotals":
+        totals = cls(punch_date)
+        for punch in punches:
+            totals.add(punch, shift_end)
+        return totals
+
+
+class DayTotalsCache:
+    """``DayTotals`` for the days that have been read, kept current on append.
+
+    Owned by a punch store with per-day buckets. Totals are built from the
+    bucket on first read; after that the store reports each write with
+    ``appended``. A punch landing at the end of its bucket is folded in,
+    anything else (an out-of-order punch, or a write racing a read) drops
+    the day so that only it is rebuilt on the next read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[Hashable, DayTotals] = {}
+
+    def get(self, key: Hashable, punch_date: date, bucket: Callable[[], Iterable]) -> DayTotals:
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = DayTotals.from_punches(punch_date, bucket())
+            return totals
+
+    def appended(self, key: Hashable, punch, size: Callable[[], int]) -> None:
+        """Fold ``punch``, just written to the day at ``key``, into its cached totals.
+
+        ``size`` returns how many punches the day holds now.
+        """
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                return
+            count = size()
+            if totals.count == count:
+                # The read that built these totals already saw the punch.
+                return
+            at_tail = totals.previous_timestamp is None or totals.previous_timestamp <= punch["timestamp"]
+            if totals.count == count - 1 and totals.complete and at_tail:
+                totals.add(punch)
+            else:
+                del self._totals[key]
+
+    def discard(self, key: Hashable) -> None:
+        """Forget the day at ``key``, e.g. after its punches were replaced."""
+        with self._lock:
+            self._totals.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+    def __getstate__(self):
+        # Totals are rebuilt on demand, so a pickled store carries none.
+        return {}
+
+    def __setstate__(self, state) -> None:
+        self.__init__()
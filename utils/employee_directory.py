@@ -0,0 +1,155 @@
+import threading
+import time as clock
+from datetime import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from utils.shift_table import ShiftTable
+
+# Minutes either side of a shift boundary that still count as on time.
+TIME_WINDOW_MINUTES = 10
+
+
+class ShiftWindow:
+    """A shift's boundaries in minutes after midnight, with the
+    classification window around them already applied, and its
+    minute-by-minute ``ShiftTable`` built on first use."""
+    __slots__ = ("start_time", "end_time", "start_minutes", "end_minutes",
+                 "in_from", "late_after", "early_before", "overtime_after", "_table")
+
+    def __init__(self, start_time: time, end_time: time, window: int = TIME_WINDOW_MINUTES):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.start_minutes = start_time.hour * 60 + start_time.minute
+        self.end_minutes = end_time.hour * 60 + end_time.minute
+        self.in_from = self.start_minutes - window
+        self.late_after = self.start_minutes + window
+        self.early_before = self.end_minutes - window
+        self.overtime_after = self.end_minutes + window
+        self._table = None
+
+    @property
+    def table(self) -> ShiftTable:
+        if self._table is None:
+            self._table = ShiftTable(self)
+        return self._table
+
+@lru_cache(maxsize=4096)
+def shift_window(start_time: time, end_time: time, window: int = TIME_WINDOW_MINUTES) -> ShiftWindow:
+    """The shared ``ShiftWindow`` for a shift; employees on the same shift get the same object."""
+    return ShiftWindow(start_time, end_time, window)
+
+
+class DirectoryEntry:
+    __slots__ = ("employee", "shift")
+
+    def __init__(self, employee: dict):
+        self.employee = employee
+        self.shift = shift_window(employee["shift_start_time"], employee["shift_end_time"])
+
+
+class EmployeeDirectory:
+    """Employees hashed by badge_id and by id, each with its ``ShiftWindow``.
+
+    ``load`` returns the employee dicts; the indexes are rebuilt from it
+    when ``invalidate`` bumps ``version`` or when the number of employees
+    changes, before the lookup that notices it. Once ``ttl`` seconds have
+    passed since the last build they are also rebuilt, but by a background
+    thread: lookups keep using the current indexes until the new ones are
+    swapped in whole. Entries hold the loaded dicts themselves, so an
+    ``is_active`` flip shows up at once, and a shift edited in place is
+    picked up on the next lookup. A badge_id changed in place is only found
+    under its new value after the next rebuild.
+    """
+
+    def __init__(self, load: Callable[[], Sequence[dict]], ttl: Optional[float] = None):
+        self._load = load
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._built_version = -1
+        self._built_at = 0.0
+        self._size = 0
+        # (by badge_id, by id), replaced as a pair.
+        self._indexes: Tuple[Dict[str, DirectoryEntry], Dict[int, DirectoryEntry]] = ({}, {})
+        self._refresher: Optional[threading.Thread] = None
+
+    def invalidate(self) -> None:
+        """Drop the indexes; the next lookup reloads every employee."""
+        with self._lock:
+            self.version += 1
+
+    def _stale(self) -> bool:
+        return self._built_version != self.version or len(self._load()) != self._size
+
+    def _expired(self) -> bool:
+        return self.ttl is not None and clock.monotonic() - self._built_at >= self.ttl
+
+    def _refresh(self) -> None:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._install(self.version, self._load())
+        elif self._expired():
+            with self._lock:
+                if not self._expired() or (self._refresher is not None and self._refresher.is_alive()):
+                    return
+                self._refresher = threading.Thread(target=self._rebuild, name="employee-directory", daemon=True)
+                self._refresher.start()
+
+    def _rebuild(self) -> None:
+        """Build new indexes without holding the lock, then swap them in
+        unless a lookup rebuilt them for a newer version meanwhile."""
+        version = self.version
+        employees = self._load()
+        indexes = self._index(employees)
+        with self._lock:
+            if self._built_version == version and self.version == version:
+                self._install(version, employees, indexes)
+
+    def _install(self, version: int, employees: Sequence[dict], indexes=None) -> None:
+        """Swap in indexes of ``employees``; call holding the lock."""
+        self._indexes = indexes or self._index(employees)
+        self._size = len(employees)
+        self._built_at = clock.monotonic()
+        self._built_version = version
+
+    @staticmethod
+    def _index(employees: Sequence[dict]):
+        by_badge: Dict[str, DirectoryEntry] = {}
+        by_id: Dict[int, DirectoryEntry] = {}
+        for employee in employees:
+            entry = DirectoryEntry(employee)
+            # The first employee with a badge or id wins, as with a linear scan.
+            by_badge.setdefault(employee["badge_id"], entry)
+            by_id.setdefault(employee["id"], entry)
+        return by_badge, by_id
+
+    def _index_by(self, field: str) -> Dict:
+        by_badge, by_id = self._indexes
+        return by_badge if field == "badge_id" else by_id
+
+    def _entry(self, field: str, value) -> Optional[DirectoryEntry]:
+        self._refresh()
+        entry = self._index_by(field).get(value)
+        if entry is not None and entry.employee[field] != value:
+            # The badge or id was edited in place; reindex everyone.
+            self.invalidate()
+            self._refresh()
+            entry = self._index_by(field).get(value)
+        if entry is None:
+            return None
+        employee = entry.employee
+        if employee["shift_start_time"] is not entry.shift.start_time or employee["shift_end_time"] is not entry.shift.end_time:
+            entry.shift = shift_window(employee["shift_start_time"], employee["shift_end_time"])
+        return entry
+
+    def by_badge(self, badge_id: str) -> Optional[DirectoryEntry]:
+        return self._entry("badge_id", badge_id)
+
+    def by_id(self, employee_id: int) -> Optional[DirectoryEntry]:
+        return self._entry("id", employee_id)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._index_by("id"))
@@ -1,6 +1,13 @@
-from typing import Optional, List
+from typing import Callable, Optional, List, Sequence, Tuple, Dict, Iterable
 from datetime import date, time
 
+from utils.employee_directory import DirectoryEntry
+from utils.open_shifts import OpenShiftTracker
+from utils.overtime_approvals import OvertimeApprovalIndex, read_approvals
+from utils.punch_index import PunchIndex
+from utils.punch_rollups import PunchRollups
+from utils.storage import Storage, MemoryStorage
+
 # Mock employee and punch data stores
 mock_employees = [
     {
@@ -12,46 +19,151 @@ mock_employees = [
     }
 ]
 
-mock_punches = []
-mock_overtime_approvals = [
+mock_punches = PunchIndex()
+mock_overtime_approvals = OvertimeApprovalIndex([
     {
         "employee_id": 1,
         "date": date.today(),
         "is_approved": True
     }
-]
+])
+
+_storage: Storage = MemoryStorage(mock_employees, mock_punches, mock_overtime_approvals)
+
+# Called with every batch of punches written through insert_punch(es),
+# after the storage write.
+_insert_listeners: List[Callable[[Sequence[dict]], None]] = []
+# Called with (employee_id, punch_date, punches) for every day swapped in
+# through replace_day_punches, after the storage write.
+_replace_listeners: List[Callable[[int, date, Sequence[dict]], None]] = []
+
+# Other holders of overtime approvals, e.g. a shard router, sent every
+# approval write made here; each has add_overtime_approvals and
+# revoke_overtime_approval.
+_approval_mirrors: List[object] = []
+
+# Employees still clocked in, per day, kept current from every insert.
+open_shifts = OpenShiftTracker()
+# Per-employee daily and monthly punch counts and lateness sums, kept current from every insert.
+punch_rollups = PunchRollups()
+
+def get_storage() -> Storage:
+    return _storage
+
+def set_storage(storage: Storage) -> Storage:
+    """Route every helper below to ``storage``; returns the previous backend."""
+    global _storage
+    previous, _storage = _storage, storage
+    return previous
+
+def add_insert_listener(listener: Callable[[Sequence[dict]], None]) -> None:
+    _insert_listeners.append(listener)
+
+def remove_insert_listener(listener: Callable[[Sequence[dict]], None]) -> None:
+    _insert_listeners.remove(listener)
+
+def add_replace_listener(listener: Callable[[int, date, Sequence[dict]], None]) -> None:
+    _replace_listeners.append(listener)
+
+def remove_replace_listener(listener: Callable[[int, date, Sequence[dict]], None]) -> None:
+    _replace_listeners.remove(listener)
+
+def add_approval_mirror(mirror: object) -> None:
+    _approval_mirrors.append(mirror)
+
+def remove_approval_mirror(mirror: object) -> None:
+    _approval_mirrors.remove(mirror)
 
 def get_employee_by_badge(badge_id: str) -> Optional[object]:
-    for emp in mock_employees:
-        if emp["badge_id"] == badge_id:
-            return emp
-    return None
+    return _storage.get_employee_by_badge(badge_id)
+
+def get_employees_by_badges(badge_ids: Iterable[str]) -> Dict[str, object]:
+    return _storage.get_employees_by_badges(badge_ids)
+
+def get_employees_by_ids(employee_ids: Iterable[int]) -> Dict[int, object]:
+    return _storage.get_employees_by_ids(employee_ids)
+
+def get_employee_ids() -> List[int]:
+    return _storage.get_employee_ids()
+
+def get_employee_with_last_punch(badge_id: str, punch_date: date) -> Tuple[Optional[DirectoryEntry], Optional[object]]:
+    return _storage.get_employee_with_last_punch(badge_id, punch_date)
 
 def get_last_punch(employee_id: int, punch_date: date) -> Optional[object]:
-    punches = [p for p in mock_punches if p["employee_id"] == employee_id and p["timestamp"].date() == punch_date]
-    if punches:
-        return sorted(punches, key=lambda x: x["timestamp"], reverse=True)[0]
-    return None
+    return _storage.get_last_punch(employee_id, punch_date)
+
+def get_last_punches(keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], object]:
+    return _storage.get_last_punches(keys)
 
 def insert_punch(punch: dict) -> None:
-    mock_punches.append(punch)
+    _storage.insert_punch(punch)
+    for listener in _insert_listeners:
+        listener((punch,))
+
+def insert_punches(punches: Iterable[dict]) -> None:
+    punches = list(punches)
+    _storage.insert_punches(punches)
+    for listener in _insert_listeners:
+        listener(punches)
+
+def replace_day_punches(employee_id: int, punch_date: date, punches: Iterable[dict]) -> None:
+    """Make ``punches`` the employee's only punches on ``punch_date``.
+
+    Replace listeners are called rather than insert listeners, as the day's
+    old punches are removed rather than added to.
+    """
+    punches = list(punches)
+    _storage.replace_day_punches(employee_id, punch_date, punches)
+    for listener in _replace_listeners:
+        listener(employee_id, punch_date, punches)
+
+def compact_punches(current: date) -> List[date]:
+    return _storage.compact_punches(current)
 
 def get_overtime_approval(employee_id: int, punch_date: date) -> Optional[object]:
-    for approval in mock_overtime_approvals:
-        if approval["employee_id"] == employee_id and approval["date"] == punch_date and approval["is_approved"]:
-            return approval
-    return None
+    return _storage.get_overtime_approval(employee_id, punch_date)
+
+def get_overtime_approvals(keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], object]:
+    return _storage.get_overtime_approvals(keys)
+
+def get_overtime_approvals_for_range(employee_id: int, start_date: date, end_date: date) -> List[object]:
+    return _storage.get_overtime_approvals_for_range(employee_id, start_date, end_date)
+
+def add_overtime_approvals(approvals: Iterable[dict]) -> None:
+    approvals = list(approvals)
+    _storage.add_overtime_approvals(approvals)
+    for mirror in _approval_mirrors:
+        mirror.add_overtime_approvals(approvals)
+
+def load_overtime_approvals(path: str) -> int:
+    """Bulk-load approvals from a ``.csv`` or ``.ndjson`` file; returns how many were read."""
+    approvals = list(read_approvals(path))
+    add_overtime_approvals(approvals)
+    return len(approvals)
+
+def revoke_overtime_approval(employee_id: int, approval_date: date) -> bool:
+    revoked = _storage.revoke_overtime_approval(employee_id, approval_date)
+    for mirror in _approval_mirrors:
+        revoked = mirror.revoke_overtime_approval(employee_id, approval_date) or revoked
+    return revoked
 
 def get_all_punches_for_day(employee_id: int, punch_date: date) -> List[object]:
-    return sorted([
-        p for p in mock_punches if p["employee_id"] == employee_id and p["timestamp"].date() == punch_date
-    ], key=lambda x: x["timestamp"])
+    return _storage.get_all_punches_for_day(employee_id, punch_date)
+
+def get_day_totals(employee_id: int, punch_date: date) -> Optional[object]:
+    return _storage.get_day_totals(employee_id, punch_date)
+
+def get_punches_for_range(employee_ids: Iterable[int], start_date: date, end_date: date) -> Iterable[object]:
+    return _storage.get_punches_for_range(employee_ids, start_date, end_date)
 
 def get_employee_shift_time(employee_id: int) -> dict:
-    for emp in mock_employees:
-        if emp["id"] == employee_id:
-            return {
-                "start": emp["shift_start_time"],
-                "end": emp["shift_end_time"]
-            }
-    return {"start": time(9, 0), "end": time(17, 0)}
+    return _storage.get_employee_shift_time(employee_id)
+
+def invalidate_employees() -> None:
+    """Make badge deactivations and shift changes visible to the next lookup."""
+    _storage.invalidate_employees()
+
+add_insert_listener(open_shifts.observe)
+add_insert_listener(punch_rollups.observe)
+add_replace_listener(open_shifts.replace)
+add_replace_listener(punch_rollups.replace)
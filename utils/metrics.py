@@ -0,0 +1,225 @@
+"""Process-wide counters and latency histograms in Prometheus text format.
+
+Instrumented code checks ``metrics.enabled`` before reading the clock, so
+with ``PUNCH_METRICS=0`` the hot path pays one attribute lookup and
+nothing else. When enabled, an update takes no lock: every thread writes
+its own shard, and shards are summed when the metrics are rendered.
+Durations are recorded in integer nanoseconds into power-of-two buckets
+picked with ``int.bit_length``, and rendered in seconds.
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Counter and histogram totals by metric name and label values, as taken
+# by ``snapshot`` in another process (e.g. a shard) to add into ``render``.
+Snapshot = Dict[str, Dict[Tuple[str, ...], List[int]]]
+
+enabled = os.environ.get("PUNCH_METRICS", "1") != "0"
+
+# Histogram buckets: a value of n nanoseconds lands in slot n.bit_length(),
+# i.e. below 2**slot ns. Rendered bounds run from 2**10 ns (~1us) to
+# 2**33 ns (~8.6s); everything beyond is only in +Inf.
+SLOTS = 64
+SUM_SLOT = SLOTS
+FIRST_SLOT = 10
+LAST_SLOT = 33
+
+_registry: List["Metric"] = []
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Per-thread lists of ``size`` ints, summed on read."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[int]] = []
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> List[int]:
+        shard = self._local.shard = [0] * self._size
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def _totals(self) -> List[int]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self._size
+
+    def _totals_with(self, extra: Sequence[List[int]]) -> List[int]:
+        totals = self._totals()
+        return [sum(column) for column in zip(totals, *extra)] if extra else totals
+
+
+class Metric:
+    kind = ""
+    # Appended to ``name`` for the family in HELP/TYPE lines and its samples.
+    suffix = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def labels(self, *values: str):
+        """The child for these label values; resolve once and keep it on hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[int]]:
+        return {values: child._totals() for values, child in list(self._children.items())}
+
+    def render(self, remote: Sequence[Dict[Tuple[str, ...], List[int]]] = ()) -> List[str]:
+        """Lines for this metric, adding in ``remote`` totals taken by ``snapshot`` elsewhere."""
+        name = self.name + self.suffix
+        lines = [f"# HELP {name} {self.help_text}", f"# TYPE {name} {self.kind}"]
+        for totals in remote:
+            for values in totals:
+                self.labels(*values)
+        for values, child in sorted(self._children.items()):
+            extra = [totals[values] for totals in remote if values in totals]
+            lines.extend(child.render(name, _labels(self.labelnames, values), self.labelnames, values, extra))
+        return lines
+
+
+class CounterChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: int = 1) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+    @property
+    def value(self) -> int:
+        return self._totals()[0]
+
+    def render(self, name, labels, labelnames, values, extra=()) -> List[str]:
+        return [f"{name}{labels} {self._totals_with(extra)[0]}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+    suffix = "_total"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            self.labels()
+
+    def _child(self):
+        return CounterChild()
+
+    def inc(self, amount: int = 1) -> None:
+        self.labels().inc(amount)
+
+
+class HistogramChild(_Sharded):
+    def __init__(self):
+        super().__init__(SLOTS + 1)
+
+    def observe_ns(self, nanoseconds: int) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[nanoseconds.bit_length()] += 1
+        shard[SUM_SLOT] += nanoseconds
+
+    @property
+    def count(self) -> int:
+        return sum(self._totals()[:SLOTS])
+
+    def render(self, name, labels, labelnames, values, extra=()) -> List[str]:
+        totals = self._totals_with(extra)
+        lines = []
+        cumulative = sum(totals[:FIRST_SLOT])
+        for slot in range(FIRST_SLOT, LAST_SLOT + 1):
+            cumulative += totals[slot]
+            bucket_labels = _labels(labelnames, values, f'le="{(1 << slot) / 1e9!r}"')
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        count = sum(totals[:SLOTS])
+        inf_labels = _labels(labelnames, values, 'le="+Inf"')
+        lines.append(f"{name}_bucket{inf_labels} {count}")
+        lines.append(f"{name}_sum{labels} {_number(totals[SUM_SLOT] / 1e9)}")
+        lines.append(f"{name}_count{labels} {count}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            self.labels()
+
+    def _child(self):
+        return HistogramChild()
+
+    def observe_ns(self, nanoseconds: int) -> None:
+        self.labels().observe_ns(nanoseconds)
+
+
+class GaugeChild:
+    __slots__ = ("read",)
+
+    def __init__(self, read: Callable[[], float]):
+        self.read = read
+
+    def render(self, name, labels, labelnames, values, extra=()) -> List[str]:
+        return [f"{name}{labels} {_number(self.read())}"]
+
+
+class Gauge(Metric):
+    """A value read from ``read`` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        super().__init__(name, help_text)
+        self._children[()] = GaugeChild(read)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[int]]:
+        # Read at scrape time in the process that owns them; never summed.
+        return {}
+
+
+def snapshot() -> Snapshot:
+    """Totals of every counter and histogram, to be added into another process's ``render``."""
+    snapshots = ((metric.name, metric.snapshot()) for metric in list(_registry))
+    return {name: totals for name, totals in snapshots if totals}
+
+def render(remote: Sequence[Snapshot] = ()) -> str:
+    """Every registered metric in the Prometheus text exposition format,
+    with the totals of the ``remote`` snapshots added in."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render([snapshot[metric.name] for snapshot in remote if metric.name in snapshot]))
+    return "\n".join(lines) + "\n"
+
+def unregister(metric: Metric) -> None:
+    _registry.remove(metric)
@@ -0,0 +1,73 @@
+import threading
+from datetime import date
+from typing import Dict, Iterable, Set, Tuple
+
+from utils.punch_types import IN_TYPES
+
+
+class OpenShiftTracker:
+    """Employees whose latest punch of a day is an IN-type punch.
+
+    Fed every inserted punch through ``observe`` (an insert listener in
+    ``utils.helper``), it keeps each employee's latest (timestamp, type) per
+    day and the set of employees left clocked in, so the end-of-day sweep
+    only has to look at those. Late-arriving punches older than the
+    recorded latest one are ignored, and on a timestamp tie the first punch
+    recorded stays latest, as with ``get_last_punch``.
+
+    ``begin_sweep`` claims a day for the defaulter sweep exactly once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest: Dict[date, Dict[int, Tuple[object, str]]] = {}
+        self._open: Dict[date, Set[int]] = {}
+        self._swept: Set[date] = set()
+
+    def observe(self, punches: Iterable) -> None:
+        with self._lock:
+            for punch in punches:
+                timestamp = punch["timestamp"]
+                punch_date = timestamp.date()
+                employee_id = punch["employee_id"]
+                latest = self._latest.setdefault(punch_date, {})
+                previous = latest.get(employee_id)
+                if previous is not None and timestamp <= previous[0]:
+                    continue
+                punch_type = punch["punch_type"]
+                latest[employee_id] = (timestamp, punch_type)
+                if punch_type in IN_TYPES:
+                    self._open.setdefault(punch_date, set()).add(employee_id)
+                else:
+                    self._open.get(punch_date, set()).discard(employee_id)
+
+    def replace(self, employee_id: int, punch_date: date, punches: Iterable) -> None:
+        """Track ``punches`` as the employee's whole day, e.g. after it was reclassified."""
+        with self._lock:
+            self._latest.get(punch_date, {}).pop(employee_id, None)
+            self._open.get(punch_date, set()).discard(employee_id)
+        self.observe(punches)
+
+    def open_employees(self, punch_date: date) -> Set[int]:
+        with self._lock:
+            return set(self._open.get(punch_date, ()))
+
+    def begin_sweep(self, punch_date: date) -> bool:
+        """Claim ``punch_date`` for the sweep; False if it was already claimed."""
+        with self._lock:
+            if punch_date in self._swept:
+                return False
+            self._swept.add(punch_date)
+            return True
+
+    def forget(self, punch_date: date) -> None:
+        """Drop what is tracked for ``punch_date``, e.g. once it has been swept."""
+        with self._lock:
+            self._latest.pop(punch_date, None)
+            self._open.pop(punch_date, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latest.clear()
+            self._open.clear()
+            self._swept.clear()
@@ -0,0 +1,94 @@
+import csv
+import json
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+
+class OvertimeApprovalIndex(list):
+    """Overtime approval list that also keeps an index keyed by (employee_id, date).
+
+    There is one record per key: appending an approval for a key already
+    present updates that record in place, the same upsert SqliteStorage
+    does, so repeated HR loads do not grow the list. Each employee's dates
+    are also kept sorted for range queries. The index is kept in step by
+    ``append``, ``extend``, ``clear`` and ``set_approved``; other list
+    mutators are not supported.
+    """
+
+    def __init__(self, approvals=()):
+        super().__init__()
+        self._by_key: Dict[Tuple[int, date], dict] = {}
+        self._dates: Dict[int, List[date]] = {}
+        self.extend(approvals)
+
+    def append(self, approval: dict) -> None:
+        key = (approval["employee_id"], approval["date"])
+        record = self._by_key.get(key)
+        if record is not None:
+            record.update(approval)
+            return
+        super().append(approval)
+        self._by_key[key] = approval
+        insort(self._dates.setdefault(key[0], []), key[1])
+
+    def extend(self, approvals) -> None:
+        for approval in approvals:
+            self.append(approval)
+
+    def clear(self) -> None:
+        super().clear()
+        self._by_key.clear()
+        self._dates.clear()
+
+    def approval(self, employee_id: int, approval_date: date) -> Optional[dict]:
+        """The approval for the day if it is currently approved."""
+        record = self._by_key.get((employee_id, approval_date))
+        return record if record is not None and record["is_approved"] else None
+
+    def set_approved(self, employee_id: int, approval_date: date, is_approved: bool) -> bool:
+        """Flip an existing approval in place; False if there is none for the day."""
+        record = self._by_key.get((employee_id, approval_date))
+        if record is None:
+            return False
+        record["is_approved"] = is_approved
+        return True
+
+    def approved_between(self, employee_id: int, start_date: date, end_date: date) -> List[dict]:
+        """Approved overtime for the employee from ``start_date`` to ``end_date`` inclusive, by date."""
+        dates = self._dates.get(employee_id, [])
+        records = (self._by_key[(employee_id, day)] for day in dates[bisect_left(dates, start_date):bisect_right(dates, end_date)])
+        return [record for record in records if record["is_approved"]]
+
+
+def _approval(employee_id, approval_date, is_approved) -> dict:
+    if isinstance(is_approved, str):
+        is_approved = is_approved.strip().lower() in TRUE_VALUES
+    return {
+        "employee_id": int(employee_id),
+        "date": date.fromisoformat(approval_date),
+        "is_approved": bool(is_approved)
+    }
+
+def read_approvals_csv(path: str) -> Iterator[dict]:
+    """Approvals from a CSV file with an ``employee_id,date,is_approved`` header."""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield _approval(row["employee_id"], row["date"], row.get("is_approved") or "true")
+
+def read_approvals_ndjson(path: str) -> Iterator[dict]:
+    """Approvals from a file with one JSON object per line."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield _approval(row["employee_id"], row["date"], row.get("is_approved", True))
+
+def read_approvals(path: str) -> Iterable[dict]:
+    if path.endswith(".csv"):
+        return read_approvals_csv(path)
+    if path.endswith((".ndjson", ".jsonl")):
+        return read_approvals_ndjson(path)
+    raise ValueError(f"Unsupported approval file format: {path}")
@@ -0,0 +1,299 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from utils.columnar_store import ColumnarPunchStore, RECORD_DTYPE, punch_record
+from utils.day_totals import DayTotals
+from utils.punch_index import PunchIndex
+from utils.storage import date_range
+
+PARTITION_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.npz$")
+
+
+def _punches(records: np.ndarray) -> List[dict]:
+    store = ColumnarPunchStore()
+    store.extend_records(records)
+    return [row.to_dict() for row in store]
+
+
+class PartitionedPunchStore:
+    """Punch history split into one partition per day, hot in memory or cold on disk.
+
+    The ``hot_days`` most recent days are ``PunchIndex`` partitions in
+    memory. When the first punch of a newer day arrives, or ``compact`` is
+    called, older days are written to ``directory`` as zlib-compressed
+    ``RECORD_DTYPE`` arrays, one file per day under a directory per month,
+    and dropped from memory. A cold day is read back only when it is
+    queried, into a sealed ``ColumnarPunchStore``; the ``cache_partitions``
+    most recently used ones stay loaded. A write to a cold day (a late or
+    reclassified punch) makes it hot again until the next compaction.
+    With ``retention_days`` set, compaction also deletes partitions that
+    many days older than the newest day, then calls ``on_expire``, if
+    set, with the cutoff, e.g. to prune rollups of the deleted days.
+    ``on_compact``, if set, is called with the days each compaction took
+    out of memory, e.g. to checkpoint a journal that only needs the hot
+    days.
+
+    It is a drop-in replacement for ``PunchIndex`` as the punch list of
+    ``MemoryStorage``; cold lookups return ``PunchRow`` views. Readers take
+    no lock: a compacted day is on disk before it leaves memory.
+    """
+
+    def __init__(self, directory: str, hot_days: int = 2, cache_partitions: int = 31,
+                 retention_days: Optional[int] = None,
+                 on_compact: Optional[Callable[[List[date]], None]] = None,
+                 on_expire: Optional[Callable[[date], None]] = None):
+        if hot_days < 1:
+            raise ValueError("hot_days must be at least 1")
+        self.directory = directory
+        self.hot_days = hot_days
+        self.cache_partitions = cache_partitions
+        self.retention_days = retention_days
+        self.on_compact = on_compact
+        self.on_expire = on_expire
+        self._lock = threading.RLock()
+        self._hot: Dict[date, PunchIndex] = {}
+        # Bumped on every write to a hot day, so compaction can tell if a
+        # day changed while its file was being written.
+        self._writes: Dict[date, int] = {}
+        self._cold = set()
+        self._cache: "OrderedDict[date, ColumnarPunchStore]" = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        for month in os.listdir(directory):
+            month_path = os.path.join(directory, month)
+            if os.path.isdir(month_path):
+                for name in os.listdir(month_path):
+                    match = PARTITION_FILE.match(name)
+                    if match:
+                        self._cold.add(date.fromisoformat(match.group(1)))
+
+    def partition_path(self, day: date) -> str:
+        return os.path.join(self.directory, day.strftime("%Y-%m"), f"{day.isoformat()}.npz")
+
+    @property
+    def hot_partitions(self) -> List[date]:
+        return sorted(self._hot)
+
+    @property
+    def cold_partitions(self) -> List[date]:
+        return sorted(self._cold)
+
+    @property
+    def cached_partitions(self) -> List[date]:
+        return list(self._cache)
+
+    def __len__(self) -> int:
+        """Punches held in memory in hot partitions."""
+        return sum(len(partition) for partition in list(self._hot.values()))
+
+    # Writes
+
+    def _writable(self, day: date):
+        """``(partition, rolled)``: the day's hot partition, made hot if need be,
+        and whether it is the first of a day newer than every hot one.
+        Call holding the lock."""
+        partition = self._hot.get(day)
+        if partition is not None:
+            return partition, False
+        newest = max(self._hot, default=None)
+        if day in self._cold:
+            cold = self._load(day)
+            partition = PunchIndex(row.to_dict() for row in cold)
+        else:
+            partition = PunchIndex()
+        self._hot[day] = partition
+        self._writes[day] = 0
+        self._cold.discard(day)
+        self._cache.pop(day, None)
+        return partition, newest is not None and day > newest
+
+    def append(self, punch) -> None:
+        day = punch["timestamp"].date()
+        with self._lock:
+            partition, rolled = self._writable(day)
+            partition.append(punch)
+            self._writes[day] += 1
+        if rolled:
+            self.compact(day)
+
+    def extend(self, punches) -> None:
+        for punch in punches:
+            self.append(punch)
+
+    def replace_day(self, employee_id: int, punch_date: date, punches: Sequence[dict]) -> None:
+        with self._lock:
+            partition, rolled = self._writable(punch_date)
+            partition.replace_day(employee_id, punch_date, punches)
+            self._writes[punch_date] += 1
+        if rolled:
+            self.compact(punch_date)
+
+    def extend_records(self, records: np.ndarray) -> None:
+        """Append a ``RECORD_DTYPE`` array, e.g. the tail of a journal.
+
+        A punch its day's partition already holds is skipped, so replaying
+        a journal over a day it had already written to disk adds nothing
+        twice.
+        """
+        for punch in _punches(records):
+            day = punch["timestamp"].date()
+            if punch not in self.bucket(punch["employee_id"], day):
+                self.append(punch)
+
+    def replace_day_records(self, employee_id: int, punch_date: date, records: np.ndarray) -> None:
+        self.replace_day(employee_id, punch_date, _punches(records))
+
+    def compact(self, current: date) -> List[date]:
+        """Move every hot day more than ``hot_days - 1`` days before ``current``
+        to disk, and apply the retention policy; returns the days written.
+
+        Files are written without holding the store's lock. A day written
+        to while its file was being written stays hot until the next call.
+        """
+        oldest_hot = current - timedelta(days=self.hot_days - 1)
+        cutoff = current - timedelta(days=self.retention_days) if self.retention_days is not None else None
+        with self._lock:
+            closed = {day: (self._hot[day], self._writes[day]) for day in self._hot if day < oldest_hot}
+        written = []
+        moved = []
+        for day, (partition, writes) in sorted(closed.items()):
+            expired = cutoff is not None and day < cutoff
+            if not expired:
+                self._write(day, np.array([punch_record(punch) for punch in list(partition)], dtype=RECORD_DTYPE))
+            with self._lock:
+                if self._hot.get(day) is not partition or self._writes[day] != writes:
+                    continue
+                # An expired day is listed cold too, so _expire deletes any
+                # file it had before it was made hot again.
+                self._cold.add(day)
+                self._cache.pop(day, None)
+                if not expired:
+                    written.append(day)
+                moved.append(day)
+                del self._hot[day]
+                del self._writes[day]
+        if cutoff is not None:
+            self._expire(cutoff)
+        if moved and self.on_compact is not None:
+            self.on_compact(moved)
+        return written
+
+    def _write(self, day: date, records: np.ndarray) -> None:
+        path = self.partition_path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, punches=records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _expire(self, cutoff: date) -> None:
+        with self._lock:
+            expired = [day for day in self._cold if day < cutoff]
+            for day in expired:
+                self._cold.discard(day)
+                self._cache.pop(day, None)
+        for day in expired:
+            try:
+                os.remove(self.partition_path(day))
+            except FileNotFoundError:
+                pass
+        if self.on_expire is not None:
+            self.on_expire(cutoff)
+
+    def clear(self) -> None:
+        """Drop every punch, including the partition files."""
+        with self._lock:
+            cold = list(self._cold)
+            self._hot.clear()
+            self._writes.clear()
+            self._cold.clear()
+            self._cache.clear()
+        for day in cold:
+            try:
+                os.remove(self.partition_path(day))
+            except FileNotFoundError:
+                pass
+
+    # Reads
+
+    def _load(self, day: date) -> ColumnarPunchStore:
+        with self._lock:
+            store = self._cache.get(day)
+            if store is not None:
+                self._cache.move_to_end(day)
+                return store
+        with np.load(self.partition_path(day)) as data:
+            records = data["punches"]
+        store = ColumnarPunchStore()
+        store.extend_records(records)
+        with self._lock:
+            if day not in self._cold:
+                # Made hot again while it was loading; the copy is stale.
+                return store
+            self._cache[day] = store
+            while len(self._cache) > self.cache_partitions:
+                self._cache.popitem(last=False)
+        return store
+
+    def partition_records(self, day: date) -> np.ndarray:
+        """The day's punches as ``RECORD_DTYPE`` records, e.g. to roll them up.
+
+        A cold day is read from its file without going through the cache.
+        """
+        with self._lock:
+            partition = self._hot.get(day)
+            if partition is not None:
+                return np.array([punch_record(punch) for punch in list(partition)], dtype=RECORD_DTYPE)
+            if day not in self._cold:
+                return np.empty(0, dtype=RECORD_DTYPE)
+            store = self._cache.get(day)
+        if store is not None:
+            return store.records()
+        with np.load(self.partition_path(day)) as data:
+            return data["punches"]
+
+    def _partition(self, day: date):
+        """The day's partition, loading it if it is cold; None if the day has no punches."""
+        partition = self._hot.get(day)
+        if partition is not None:
+            return partition
+        if day in self._cold:
+            try:
+                return self._load(day)
+            except FileNotFoundError:
+                # Promoted to hot, or expired, since the check above.
+                return self._hot.get(day)
+        return None
+
+    def last(self, employee_id: int, punch_date: date):
+        partition = self._partition(punch_date)
+        return partition.last(employee_id, punch_date) if partition is not None else None
+
+    def day(self, employee_id: int, punch_date: date) -> list:
+        return list(self.bucket(employee_id, punch_date))
+
+    def bucket(self, employee_id: int, punch_date: date) -> Sequence:
+        partition = self._partition(punch_date)
+        return partition.bucket(employee_id, punch_date) if partition is not None else ()
+
+    def totals(self, employee_id: int, punch_date: date) -> DayTotals:
+        partition = self._partition(punch_date)
+        if partition is None:
+            return DayTotals(punch_date)
+        return partition.totals(employee_id, punch_date)
+
+    def punches_for_range(self, employee_ids: Iterable[int], start_date: date, end_date: date) -> Iterator:
+        """Punches ordered by employee_id, then date, then timestamp, with each
+        day's partition looked up once however many employees are read."""
+        partitions = [(day, self._partition(day)) for day in date_range(start_date, end_date)]
+        partitions = [(day, partition) for day, partition in partitions if partition is not None]
+        for employee_id in sorted(set(employee_ids)):
+            for day, partition in partitions:
+                yield from partition.bucket(employee_id, day)
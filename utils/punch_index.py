@@ -0,0 +1,105 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.day_totals import DayTotals, DayTotalsCache
+
+
+def _timestamp(punch: dict):
+    return punch["timestamp"]
+
+
+class PunchIndex(list):
+    """Append-only punch list that also keeps an index keyed by (employee_id, date).
+
+    Each day's punches are held in timestamp order, so the latest punch is the
+    tail of its bucket and a full day is a single dict lookup. Work-hour
+    totals of days that have been read are kept current as punches arrive.
+    The index is kept in step by ``append``, ``extend``, ``replace_day`` and
+    ``clear``; other list mutators are not supported.
+
+    Readers need no lock while another thread writes: a bucket only ever
+    grows at its tail in place, and a punch landing mid-day or a replaced
+    day swaps in a new bucket, so a reader sees a day before or after a
+    write, never halfway through one. Writers to the same day must be
+    serialized by the caller.
+    """
+
+    def __init__(self, punches=()):
+        super().__init__()
+        self._days: Dict[Tuple[int, date], List[dict]] = {}
+        self._totals = DayTotalsCache()
+        # Serializes removals from the flat list, which shift its indexes.
+        self._remove_lock = threading.Lock()
+        self.extend(punches)
+
+    def append(self, punch: dict) -> None:
+        super().append(punch)
+        key = (punch["employee_id"], punch["timestamp"].date())
+        bucket = self._days.get(key)
+        if bucket is None:
+            bucket = self._days[key] = [punch]
+        elif bucket[-1]["timestamp"] <= punch["timestamp"]:
+            bucket.append(punch)
+        else:
+            bucket = list(bucket)
+            insort(bucket, punch, key=_timestamp)
+            self._days[key] = bucket
+        self._totals.appended(key, punch, bucket.__len__)
+
+    def extend(self, punches) -> None:
+        for punch in punches:
+            self.append(punch)
+
+    def replace_day(self, employee_id: int, punch_date: date, punches: Sequence[dict]) -> None:
+        """Swap the day's punches for ``punches``.
+
+        The old punches are found by scanning back from the end of the list,
+        so replacing a recent day costs little however long the history is.
+        """
+        key = (employee_id, punch_date)
+        bucket = sorted(punches, key=_timestamp)
+        old = {id(punch) for punch in (self._days.get(key) or ())}
+        if bucket:
+            self._days[key] = bucket
+        else:
+            self._days.pop(key, None)
+        self._totals.discard(key)
+        with self._remove_lock:
+            i = len(self)
+            while old and i:
+                i -= 1
+                if id(self[i]) in old:
+                    old.discard(id(self[i]))
+                    del self[i]
+        super().extend(bucket)
+
+    def clear(self) -> None:
+        with self._remove_lock:
+            super().clear()
+        self._days.clear()
+        self._totals.clear()
+
+    def last(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        bucket = self._days.get((employee_id, punch_date))
+        if not bucket:
+            return None
+        latest = bucket[-1]
+        if len(bucket) == 1 or bucket[-2]["timestamp"] != latest["timestamp"]:
+            return latest
+        # Several punches share the latest timestamp: return the first one
+        # recorded, the same punch a stable descending sort would pick.
+        return bucket[bisect_left(bucket, latest["timestamp"], key=_timestamp)]
+
+    def day(self, employee_id: int, punch_date: date) -> List[dict]:
+        return list(self.bucket(employee_id, punch_date))
+
+    def bucket(self, employee_id: int, punch_date: date) -> Sequence[dict]:
+        """The day's punches in timestamp order, without copying; do not mutate."""
+        return self._days.get((employee_id, punch_date), ())
+
+    def totals(self, employee_id: int, punch_date: date) -> DayTotals:
+        """Running work-hour totals for the day; do not mutate."""
+        key = (employee_id, punch_date)
+        return self._totals.get(key, punch_date, lambda: self._days.get(key, ()))
@@ -0,0 +1,264 @@
+import logging
+import mmap
+import os
+import pickle
+import threading
+from datetime import date
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from utils.columnar_store import ColumnarPunchStore, RECORD_DTYPE, punch_record
+from utils.work_hours import EPOCH_ORDINAL, MICROS_PER_DAY
+
+MAGIC = b"PNCHJRN1"
+HEADER_SIZE = len(MAGIC)
+RECORD_SIZE = RECORD_DTYPE.itemsize
+# Punch type code of a marker record: the ``lateness`` records after it are
+# the employee's whole day, replacing what the journal held for it before.
+REPLACE_DAY_CODE = 255
+MAX_REPLACED_PUNCHES = np.iinfo(RECORD_DTYPE["lateness"]).max
+
+
+def replay_records(store: ColumnarPunchStore, records: np.ndarray) -> None:
+    """Apply journal ``records`` to ``store``: punches appended, replace-day groups swapped in."""
+    markers = np.flatnonzero(records["code"] == REPLACE_DAY_CODE).tolist()
+    start = 0
+    for marker in markers:
+        store.extend_records(records[start:marker])
+        count = int(records["lateness"][marker])
+        day = date.fromordinal(int(records["timestamp"][marker]) // MICROS_PER_DAY + EPOCH_ORDINAL)
+        store.replace_day_records(int(records["employee_id"][marker]), day, records[marker + 1:marker + 1 + count])
+        start = marker + 1 + count
+    store.extend_records(records[start:])
+
+
+def torn_group_start(records: np.ndarray) -> Optional[int]:
+    """Index of a replace-day marker whose group runs past the end of ``records``, if any."""
+    markers = np.flatnonzero(records["code"] == REPLACE_DAY_CODE)
+    if len(markers):
+        last = int(markers[-1])
+        if last + int(records["lateness"][last]) >= len(records):
+            return last
+    return None
+
+
+def read_records(path: str, offset: int = 0) -> np.ndarray:
+    """Whole records in the journal at ``path`` from record ``offset`` on.
+
+    The file is memory-mapped and decoded in one pass; a torn record at the
+    tail (from a crash mid-write) is ignored.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) <= HEADER_SIZE:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:HEADER_SIZE] != MAGIC:
+            raise ValueError(f"{path} is not a punch journal")
+        count = (len(mapped) - HEADER_SIZE) // RECORD_SIZE
+        if offset >= count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        start = HEADER_SIZE + offset * RECORD_SIZE
+        return np.frombuffer(mapped, dtype=RECORD_DTYPE, count=count - offset, offset=start).copy()
+
+
+class PunchJournal:
+    """Append-only binary log of accepted punches with group commit.
+
+    ``append`` only encodes into an in-memory buffer. The buffer is written
+    and fsynced once ``commit_records`` punches are pending, or by a flusher
+    thread every ``commit_interval`` seconds, so one fsync covers a whole
+    group of punches. A punch is durable once ``sync`` returns.
+    ``replace_day`` logs a reclassified day as a marker record followed by
+    the day's new punches, which replace the day's earlier ones on replay.
+
+    Every ``snapshot_every`` records the flusher also writes a snapshot: the
+    previous snapshot plus the new journal records, rebuilt into a
+    ``ColumnarPunchStore`` and pickled next to the journal. ``recover``
+    loads the latest snapshot and replays only the records after it, so
+    startup time stays bounded however long the journal grows.
+
+    In front of a ``PartitionedPunchStore``, which keeps older days on disk
+    itself, the journal is instead ``checkpoint``-ed down to the days still
+    in memory, and ``replay`` applies what is left at startup.
+    """
+
+    def __init__(self, path: str, commit_interval: float = 0.05, commit_records: int = 1024,
+                 snapshot_every: Optional[int] = None):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.commit_interval = commit_interval
+        self.commit_records = commit_records
+        self.snapshot_every = snapshot_every
+        self._buffer = bytearray()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        new_file = size < HEADER_SIZE
+        self.records_written = 0 if new_file else (size - HEADER_SIZE) // RECORD_SIZE
+        whole = 0 if new_file else HEADER_SIZE + self.records_written * RECORD_SIZE
+        if size != whole:
+            # Drop a torn header or record left by a crash mid-write, so new
+            # records start on a record boundary.
+            os.truncate(path, whole)
+        window = max(0, self.records_written - MAX_REPLACED_PUNCHES - 1)
+        torn = torn_group_start(read_records(path, window))
+        if torn is not None:
+            # Likewise a replace-day group cut short: new records would be read as the rest of it.
+            self.records_written = window + torn
+            os.truncate(path, HEADER_SIZE + self.records_written * RECORD_SIZE)
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(MAGIC)
+            self._fsync()
+        self._snapshot_offset = self._read_snapshot_offset()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="punch-journal", daemon=True)
+        self._flusher.start()
+
+    def append(self, punch) -> None:
+        self.append_many((punch,))
+
+    def append_many(self, punches: Iterable) -> None:
+        self._append_encoded([punch_record(punch) for punch in punches])
+
+    def replace_day(self, employee_id: int, punch_date: date, punches: Iterable) -> None:
+        """Log that ``punches`` are now the employee's whole day: a marker record, then the punches."""
+        encoded = [punch_record(punch) for punch in punches]
+        if len(encoded) > MAX_REPLACED_PUNCHES:
+            raise ValueError(f"Cannot journal a day of {len(encoded)} punches")
+        marker = (employee_id, (punch_date.toordinal() - EPOCH_ORDINAL) * MICROS_PER_DAY, REPLACE_DAY_CODE, 0, len(encoded), 0)
+        self._append_encoded([marker] + encoded)
+
+    def _append_encoded(self, encoded: list) -> None:
+        if not encoded:
+            return
+        data = np.array(encoded, dtype=RECORD_DTYPE).tobytes()
+        with self._lock:
+            self._buffer += data
+            self._pending += len(encoded)
+            full = self._pending >= self.commit_records
+        if full:
+            self.sync()
+
+    def sync(self) -> None:
+        """Write and fsync everything appended so far."""
+        with self._io_lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            data, self._buffer, self._pending = self._buffer, bytearray(), 0
+        if data:
+            self._file.write(data)
+            self._fsync()
+            self.records_written += len(data) // RECORD_SIZE
+
+    def checkpoint(self, live_days: Callable[[], Iterable[date]]) -> int:
+        """Drop the records of every day not in ``live_days()``; returns the records kept.
+
+        ``live_days`` is called once everything appended so far is synced,
+        so each record in the file is for a day its store already holds:
+        one either still live or safely elsewhere. The kept records are
+        written to a new file that replaces the journal whole. Record
+        offsets change, so any snapshot is removed.
+        """
+        with self._io_lock:
+            self._write_pending()
+            records = read_records(self.path)
+            live = np.array([day.toordinal() - EPOCH_ORDINAL for day in live_days()], dtype=np.int64)
+            # A replace-day group shares its marker's day, so it is kept or dropped whole.
+            kept = records[np.isin(records["timestamp"] // MICROS_PER_DAY, live)]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(kept.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "ab")
+            self.records_written = len(kept)
+            if os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+            self._snapshot_offset = 0
+        return len(kept)
+
+    def replay(self, store) -> int:
+        """Apply every record in the journal to ``store``, which has
+        ``extend_records`` and ``replace_day_records``; returns the records read."""
+        self.sync()
+        records = read_records(self.path)
+        replay_records(store, records)
+        return len(records)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._flusher.join()
+        self.sync()
+        self._file.close()
+
+    def _fsync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.commit_interval):
+            try:
+                self.sync()
+                if self.snapshot_every and self.records_written - self._snapshot_offset >= self.snapshot_every:
+                    self.snapshot()
+            except Exception:
+                logging.exception(f"Punch journal flush failed for {self.path}")
+
+    def _read_snapshot_offset(self) -> int:
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, "rb") as f:
+            return pickle.load(f)
+
+    def _load_snapshot(self):
+        with open(self.snapshot_path, "rb") as f:
+            offset = pickle.load(f)
+            store = pickle.load(f)
+        return offset, store
+
+    def snapshot(self) -> int:
+        """Fold the journal into a new snapshot; returns the records it covers."""
+        self.sync()
+        offset, store = self.load()
+        store.seal()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(offset, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._snapshot_offset = offset
+        return offset
+
+    def load(self):
+        """``(records covered, ColumnarPunchStore)`` rebuilt from snapshot plus journal tail."""
+        if os.path.exists(self.snapshot_path):
+            offset, store = self._load_snapshot()
+        else:
+            offset, store = 0, ColumnarPunchStore()
+        tail = read_records(self.path, offset)
+        replay_records(store, tail)
+        return offset + len(tail), store
+
+    def recover(self, store_factory: Callable[[], object] = ColumnarPunchStore):
+        """Rebuild the punch store at startup.
+
+        The default columnar store comes back from the snapshot and the
+        journal tail. Any other store type is filled from decoded punch
+        dicts, which is slower.
+        """
+        _, store = self.load()
+        if store_factory is ColumnarPunchStore:
+            return store
+        rebuilt = store_factory()
+        rebuilt.extend(row.to_dict() for row in store)
+        return rebuilt
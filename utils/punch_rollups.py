@@ -0,0 +1,258 @@
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.columnar_store import EARLY_FLAG, LATE_FLAG
+from utils.punch_types import PUNCH_TYPES, punch_code_type
+from utils.work_hours import EPOCH_ORDINAL, MICROS_PER_DAY
+
+
+class Rollup:
+    """Punch counts and lateness/earliness sums for one employee over some days."""
+    __slots__ = ("days", "punches", "late", "lateness_minutes", "early", "earliness_minutes")
+
+    def __init__(self, days: int = 0, punches: int = 0, late: int = 0, lateness_minutes: int = 0,
+                 early: int = 0, earliness_minutes: int = 0):
+        self.days = days
+        self.punches = punches
+        self.late = late
+        self.lateness_minutes = lateness_minutes
+        self.early = early
+        self.earliness_minutes = earliness_minutes
+
+    def add(self, punch) -> None:
+        self.punches += 1
+        if punch.get("is_late"):
+            self.late += 1
+            self.lateness_minutes += punch.get("lateness_minutes", 0)
+        if punch.get("is_early"):
+            self.early += 1
+            self.earliness_minutes += punch.get("earliness_minutes", 0)
+
+    def merge(self, other: "Rollup") -> None:
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Rollup) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Rollup({self.to_dict()!r})"
+
+
+def _month(day: date) -> Tuple[int, int]:
+    return day.year, day.month
+
+def _month_ordinals(day_ordinals: np.ndarray) -> np.ndarray:
+    """Ordinal of the first day of each day's month."""
+    days = (day_ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+def _runs(values: np.ndarray) -> Iterable[Tuple[int, int]]:
+    """``(start, stop)`` of each run of equal values in sorted ``values``."""
+    bounds = np.flatnonzero(np.diff(values)) + 1
+    return zip([0] + bounds.tolist(), bounds.tolist() + [len(values)])
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+class PunchRollups:
+    """Daily and monthly per-employee rollups of every inserted punch.
+
+    Fed through ``observe`` (an insert listener in ``utils.helper``), or
+    ``observe_records`` for punches loaded in bulk at startup, it
+    keeps a ``Rollup`` per employee for every day and every month, indexed
+    by date, plus per-employee punch counts indexed by (date, punch_type).
+    A range query reads whole months from the monthly rollups and only the
+    days at either end from the daily ones, so a quarter costs three
+    month lookups and a handful of days, never a scan of punches.
+    ``replace`` swaps in a reclassified day, and ``prune`` drops the
+    daily entries of days whose punches are gone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Day (a date) or month (a (year, month) tuple) -> employee_id -> Rollup.
+        self._rollups: Dict[Hashable, Dict[int, Rollup]] = {}
+        # (day or month, punch_type) -> employee_id -> punches of that type.
+        self._types: Dict[Tuple[Hashable, str], Dict[int, int]] = {}
+
+    def _rollups_for(self, employee_id: int, day: date) -> Tuple[Rollup, Rollup]:
+        """The employee's rollups for ``day`` and its month, created if need be."""
+        daily = self._rollups.setdefault(day, {})
+        monthly = self._rollups.setdefault(_month(day), {})
+        rollup = daily.get(employee_id)
+        if rollup is None:
+            rollup = daily[employee_id] = Rollup()
+            rollup.days = 1
+            total = monthly.get(employee_id)
+            if total is None:
+                total = monthly[employee_id] = Rollup()
+            total.days += 1
+            return rollup, total
+        return rollup, monthly[employee_id]
+
+    def _count_type(self, employee_id: int, day: date, punch_type: str, count: int) -> None:
+        for key in (day, _month(day)):
+            counts = self._types.setdefault((key, punch_type), {})
+            counts[employee_id] = counts.get(employee_id, 0) + count
+
+    def _add(self, employee_id: int, day: date, punches: Iterable) -> None:
+        rollup, total = self._rollups_for(employee_id, day)
+        for punch in punches:
+            rollup.add(punch)
+            total.add(punch)
+            self._count_type(employee_id, day, punch["punch_type"], 1)
+
+    def observe(self, punches: Iterable) -> None:
+        with self._lock:
+            for punch in punches:
+                self._add(punch["employee_id"], punch["timestamp"].date(), (punch,))
+
+    def observe_records(self, records: np.ndarray) -> None:
+        """Roll up punches given as ``RECORD_DTYPE`` records, e.g. a recovered store.
+
+        Sums are grouped per employee and day, and again per employee and
+        month, with NumPy, so only employee-days cost a Python step each.
+        """
+        if not len(records):
+            return
+        ordinals = records["timestamp"] // MICROS_PER_DAY + EPOCH_ORDINAL
+        late = (records["flags"] & LATE_FLAG) != 0
+        early = (records["flags"] & EARLY_FLAG) != 0
+        columns = (None, late, np.where(late, records["lateness"], 0), early, np.where(early, records["earliness"], 0))
+        # (day ordinal, employee_id) packed into one sortable key.
+        keys, groups = np.unique((ordinals << 32) | records["employee_id"].astype(np.int64), return_inverse=True)
+        sums = np.stack([np.bincount(groups, weights=column, minlength=len(keys)) for column in columns]).astype(np.int64)
+        type_keys, type_counts = np.unique((groups << 8) | records["code"], return_counts=True)
+        type_groups = type_keys >> 8
+        type_codes = type_keys & 255
+        day_ordinals = keys >> 32
+        employee_ids = keys & 0xFFFFFFFF
+        month_starts = _month_ordinals(day_ordinals)
+
+        with self._lock:
+            new_days = np.zeros(len(keys), dtype=np.int64)
+            for start, stop in _runs(day_ordinals):
+                daily = self._rollups.setdefault(date.fromordinal(int(day_ordinals[start])), {})
+                for group, employee_id, values in zip(range(start, stop), employee_ids[start:stop].tolist(), sums[:, start:stop].T.tolist()):
+                    rollup = daily.get(employee_id)
+                    if rollup is None:
+                        daily[employee_id] = Rollup(1, *values)
+                        new_days[group] = 1
+                    else:
+                        rollup.merge(Rollup(0, *values))
+            self._merge_types(day_ordinals[type_groups], employee_ids[type_groups], type_codes, type_counts, date.fromordinal)
+
+            # Months: the employee-days summed again, per (month, employee).
+            month_keys, month_groups = np.unique((month_starts << 32) | employee_ids, return_inverse=True)
+            month_sums = np.stack([np.bincount(month_groups, weights=row, minlength=len(month_keys)) for row in (new_days, *sums)])
+            month_ordinals = month_keys >> 32
+            for start, stop in _runs(month_ordinals):
+                monthly = self._rollups.setdefault(_month(date.fromordinal(int(month_ordinals[start]))), {})
+                employees = (month_keys[start:stop] & 0xFFFFFFFF).tolist()
+                for employee_id, values in zip(employees, month_sums[:, start:stop].astype(np.int64).T.tolist()):
+                    total = monthly.get(employee_id)
+                    if total is None:
+                        monthly[employee_id] = Rollup(*values)
+                    else:
+                        total.merge(Rollup(*values))
+            self._merge_types(month_starts[type_groups], employee_ids[type_groups], type_codes, type_counts,
+                              lambda ordinal: _month(date.fromordinal(ordinal)))
+
+    def _merge_types(self, periods: np.ndarray, employee_ids: np.ndarray, codes: np.ndarray, counts: np.ndarray,
+                     period_key: Callable[[int], Hashable]) -> None:
+        """Add per-employee punch ``counts`` by (period ordinal, code), summing repeats. Call holding the lock."""
+        keys, groups = np.unique((periods << 40) | (codes.astype(np.int64) << 32) | employee_ids, return_inverse=True)
+        counts = np.bincount(groups, weights=counts).astype(np.int64)
+        periods, codes, employee_ids = keys >> 40, (keys >> 32) & 255, keys & 0xFFFFFFFF
+        for start, stop in _runs((periods << 8) | codes):
+            key = (period_key(int(periods[start])), punch_code_type(int(codes[start])))
+            added = zip(employee_ids[start:stop].tolist(), counts[start:stop].tolist())
+            type_counts = self._types.get(key)
+            if type_counts is None:
+                self._types[key] = dict(added)
+                continue
+            for employee_id, count in added:
+                type_counts[employee_id] = type_counts.get(employee_id, 0) + count
+
+    def replace(self, employee_id: int, punch_date: date, punches: Iterable) -> None:
+        """Roll up ``punches`` as the employee's whole day, e.g. after it was reclassified."""
+        punches = list(punches)
+        with self._lock:
+            old = self._rollups.get(punch_date, {}).get(employee_id)
+            if old is not None:
+                month = _month(punch_date)
+                total = self._rollups[month][employee_id]
+                for field in Rollup.__slots__:
+                    setattr(total, field, getattr(total, field) - getattr(old, field))
+                del self._rollups[punch_date][employee_id]
+                for punch_type in PUNCH_TYPES:
+                    count = self._types.get((punch_date, punch_type), {}).pop(employee_id, 0)
+                    if count:
+                        self._types[(month, punch_type)][employee_id] -= count
+            if punches:
+                self._add(employee_id, punch_date, punches)
+
+    def prune(self, before: date) -> None:
+        """Drop the daily rollups and type counts of days before ``before``.
+
+        The monthly ones are kept, so whole months of pruned days still add
+        up in range queries.
+        """
+        with self._lock:
+            for key in [key for key in self._rollups if isinstance(key, date) and key < before]:
+                del self._rollups[key]
+            for key in [key for key in self._types if isinstance(key[0], date) and key[0] < before]:
+                del self._types[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rollups.clear()
+            self._types.clear()
+
+    def _keys(self, start_date: date, end_date: date) -> Iterable[Hashable]:
+        """Whole months and leftover days that exactly cover the range."""
+        day = start_date
+        while day <= end_date:
+            month_end = _next_month(day)
+            if day.day == 1 and month_end - timedelta(days=1) <= end_date:
+                yield _month(day)
+                day = month_end
+            else:
+                yield day
+                day += timedelta(days=1)
+
+    def day(self, employee_id: int, punch_date: date) -> Optional[Rollup]:
+        with self._lock:
+            return self._rollups.get(punch_date, {}).get(employee_id)
+
+    def totals(self, start_date: date, end_date: date) -> Dict[int, Rollup]:
+        """Each employee's rollup summed over the range, for employees with punches in it."""
+        totals: Dict[int, Rollup] = {}
+        with self._lock:
+            for key in self._keys(start_date, end_date):
+                for employee_id, rollup in self._rollups.get(key, {}).items():
+                    if not rollup.punches:
+                        continue
+                    total = totals.get(employee_id)
+                    if total is None:
+                        total = totals[employee_id] = Rollup()
+                    total.merge(rollup)
+        return totals
+
+    def type_counts(self, punch_type: str, start_date: date, end_date: date) -> Dict[int, int]:
+        """Punches of ``punch_type`` per employee over the range, for employees with any."""
+        counts: Dict[int, int] = {}
+        with self._lock:
+            for key in self._keys(start_date, end_date):
+                for employee_id, count in self._types.get((key, punch_type), {}).items():
+                    if count:
+                        counts[employee_id] = counts.get(employee_id, 0) + count
+        return counts
@@ -0,0 +1,16 @@
+PUNCH_TYPES = ("IN", "LATE_IN", "OUT", "BREAK_IN", "BREAK_OUT", "OVERTIME_IN", "OVERTIME_OUT", "DEFAULTER")
+
+# Compact integer codes for column and array storage; 0 is reserved for
+# anything outside PUNCH_TYPES (e.g. "UNKNOWN").
+UNKNOWN_CODE = 0
+PUNCH_TYPE_CODES = {punch_type: code for code, punch_type in enumerate(PUNCH_TYPES, start=1)}
+PUNCH_CODE_TYPES = {code: punch_type for punch_type, code in PUNCH_TYPE_CODES.items()}
+
+IN_TYPES = ("IN", "BREAK_IN", "OVERTIME_IN")
+OUT_TYPES = ("OUT", "BREAK_OUT", "OVERTIME_OUT")
+
+def punch_type_code(punch_type: str) -> int:
+    return PUNCH_TYPE_CODES.get(punch_type, UNKNOWN_CODE)
+
+def punch_code_type(code: int) -> str:
+    return PUNCH_CODE_TYPES.get(code, "UNKNOWN")
@@ -0,0 +1,171 @@
+"""Drop punches that badge readers upload more than once.
+
+A reader that loses its connection retries the upload, so the same
+(badge_id, timestamp) can arrive several times. ``ReplayFilter`` remembers
+recently seen keys and recognises an exact replay with one dict lookup,
+before any employee or punch lookup.
+"""
+import math
+import threading
+import time as clock
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Hashable, Optional
+
+MATCH_RECENT = "recent"
+MATCH_VERIFIED = "verified"
+# Returned by ``check(..., verify=False)`` for a key only ``confirm`` can settle.
+MATCH_UNVERIFIED = "unverified"
+
+
+class BloomFilter:
+    """Blocked Bloom filter sized for ``capacity`` keys at about ``error_rate``.
+
+    Each key sets ``BITS_PER_KEY`` bits in one 64-bit word, so a lookup is a
+    single word read and mask compare. The word and the bits are taken from
+    the key's ``hash()``, so a filter is only meaningful within the process
+    that filled it.
+    """
+    BITS_PER_KEY = 6
+
+    def __init__(self, capacity: int, error_rate: float = 1e-3):
+        self.capacity = capacity
+        # A blocked filter needs ~80% more bits than the classic formula for the same rate.
+        bits = 1.8 * -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.count = 0
+        self._words = array("Q", bytes(8 * max(1, math.ceil(bits / 64))))
+
+    def _slot(self, key: Hashable):
+        hashed = hash(key) & 0xFFFFFFFFFFFFFFFF
+        mask = (1 << (hashed & 63) | 1 << (hashed >> 6 & 63) | 1 << (hashed >> 12 & 63)
+                | 1 << (hashed >> 18 & 63) | 1 << (hashed >> 24 & 63) | 1 << (hashed >> 30 & 63))
+        return (hashed >> 36) % len(self._words), mask
+
+    def add(self, key: Hashable) -> None:
+        self._add_slot(*self._slot(key))
+
+    def _add_slot(self, word: int, mask: int) -> None:
+        self._words[word] |= mask
+        self.count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        word, mask = self._slot(key)
+        return self._words[word] & mask == mask
+
+    def clear(self) -> None:
+        self._words = array("Q", bytes(8 * len(self._words)))
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._words.itemsize * len(self._words)
+
+
+class ReplayFilter:
+    """Bounded memory of recently seen (badge_id, timestamp) keys.
+
+    Keys are held in an LRU of at most ``max_entries`` that also forgets a
+    key ``window`` seconds after it was seen; a key found there is an exact
+    replay. With ``bloom_capacity`` set, keys are also added to a pair of
+    Bloom filters that rotate every ``bloom_capacity`` keys, which remember
+    roughly that many more keys in a few bits each. A key that has left the
+    LRU but may be in a filter is only a replay if ``verify`` confirms the
+    punch was recorded, so a false positive never drops a punch. ``verify``
+    reads the store; async callers pass ``verify=False`` to ``check`` and
+    run ``confirm`` in a thread for the keys that need it.
+    """
+
+    def __init__(self, max_entries: int = 100_000, window: float = 900.0, bloom_capacity: int = 0,
+                 bloom_error_rate: float = 1e-3, verify: Optional[Callable[[str, datetime], bool]] = None):
+        self.max_entries = max_entries
+        self.window = window
+        self.verify = verify
+        # Key -> monotonic time last seen, oldest first; _expires_at is when
+        # the oldest entry leaves the window.
+        self._recent: "OrderedDict[tuple, float]" = OrderedDict()
+        self._expires_at = math.inf
+        self._lock = threading.Lock()
+        self._blooms = None
+        if bloom_capacity:
+            self._blooms = [BloomFilter(bloom_capacity, bloom_error_rate), BloomFilter(bloom_capacity, bloom_error_rate)]
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def _expire(self, now: float) -> None:
+        recent = self._recent
+        cutoff = now - self.window
+        while recent:
+            seen = next(iter(recent.values()))
+            if seen >= cutoff:
+                self._expires_at = seen + self.window
+                return
+            recent.popitem(last=False)
+        self._expires_at = math.inf
+
+    def _remember(self, key: tuple, now: float, slot=None) -> None:
+        recent = self._recent
+        if not recent:
+            self._expires_at = now + self.window
+        recent[key] = now
+        if len(recent) > self.max_entries:
+            recent.popitem(last=False)
+            self._expires_at = next(iter(recent.values())) + self.window
+        if self._blooms is not None:
+            current = self._blooms[0]
+            if current.count >= current.capacity:
+                previous = self._blooms[1]
+                previous.clear()
+                self._blooms = [previous, current]
+                current = previous
+            current._add_slot(*(slot or current._slot(key)))
+
+    def check(self, badge_id: str, timestamp: datetime, verify: bool = True) -> Optional[str]:
+        """Record the punch; returns how it matched an earlier one
+        (``MATCH_RECENT`` or ``MATCH_VERIFIED``), or None if it is new.
+
+        With ``verify`` False a key that needs verifying is not recorded
+        and ``MATCH_UNVERIFIED`` is returned; pass it to ``confirm``.
+        """
+        key = (badge_id, timestamp)
+        now = clock.monotonic()
+        with self._lock:
+            if now >= self._expires_at:
+                self._expire(now)
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                self._recent[key] = now
+                return MATCH_RECENT
+            slot = maybe_seen = None
+            if self._blooms is not None:
+                # Both filters have the same size, so a key has the same slot in each.
+                word, mask = slot = self._blooms[0]._slot(key)
+                maybe_seen = any(bloom._words[word] & mask == mask for bloom in self._blooms)
+            if not maybe_seen or self.verify is None:
+                self._remember(key, now, slot)
+                return None
+        if not verify:
+            return MATCH_UNVERIFIED
+        return self.confirm(badge_id, timestamp)
+
+    def confirm(self, badge_id: str, timestamp: datetime) -> Optional[str]:
+        """Verify and record a punch ``check`` could not settle; ``MATCH_VERIFIED`` or None."""
+        # Verifying reads the store, so it runs outside the lock.
+        replayed = self.verify(badge_id, timestamp)
+        with self._lock:
+            self._remember((badge_id, timestamp), clock.monotonic())
+        return MATCH_VERIFIED if replayed else None
+
+    def forget(self, badge_id: str, timestamp: datetime) -> None:
+        """Drop a recorded key, e.g. when its punch could not be processed."""
+        with self._lock:
+            self._recent.pop((badge_id, timestamp), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._expires_at = math.inf
+            if self._blooms is not None:
+                for bloom in self._blooms:
+                    bloom.clear()
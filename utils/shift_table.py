@@ -0,0 +1,152 @@
+"""Punch classification precomputed for every minute of the day.
+
+A punch's type within a shift depends only on its minute of the day,
+except between the windows, where it also depends on the employee's last
+punch. ``ShiftTable`` runs the classification once for each of the 1440
+minutes of a shift and keeps the outcome, so classifying a punch is one
+lookup plus, for the BREAK and OVERTIME minutes, a check of the last punch
+type. ``classify_minutes`` looks up a whole batch of punches on one shift
+with NumPy, leaving the BREAK and OVERTIME minutes to be resolved in
+punch order.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+MINUTES_PER_DAY = 1440
+
+# Table kinds. BREAK and OVERTIME minutes are resolved against the last punch.
+UNKNOWN, IN, LATE_IN, OUT, EARLY_OUT, BREAK, OVERTIME = range(7)
+KIND_TYPES = ("UNKNOWN", "IN", "LATE_IN", "OUT", "OUT", None, None)
+
+BREAK_OUT_AFTER = ("IN", "BREAK_IN")
+OVERTIME_IN_AFTER = ("OUT", "BREAK_OUT")
+
+
+def _classify_minute(shift, punch_minutes: int):
+    """``(kind, lateness, earliness)`` for a punch at ``punch_minutes`` on ``shift``."""
+    if shift.in_from <= punch_minutes <= shift.late_after:
+        return IN, 0, 0
+    elif punch_minutes > shift.late_after:
+        return LATE_IN, punch_minutes - shift.start_minutes, 0
+    elif shift.early_before <= punch_minutes <= shift.overtime_after:
+        return OUT, 0, 0
+    elif punch_minutes < shift.early_before:
+        return EARLY_OUT, 0, shift.end_minutes - punch_minutes
+    elif shift.start_minutes < punch_minutes < shift.end_minutes:
+        return BREAK, 0, 0
+    elif punch_minutes > shift.overtime_after:
+        return OVERTIME, 0, 0
+    return UNKNOWN, 0, 0
+
+
+def _result(kind: int, lateness: int, earliness: int) -> Dict:
+    return {
+        "type": KIND_TYPES[kind],
+        "is_late": kind == LATE_IN,
+        "lateness_minutes": lateness,
+        "is_early": kind == EARLY_OUT,
+        "earliness_minutes": earliness
+    }
+
+
+def resolve_type(kind: int, last_punch_type: Optional[str]) -> str:
+    """The punch type for a BREAK or OVERTIME minute after ``last_punch_type``."""
+    if kind == BREAK:
+        return "BREAK_OUT" if last_punch_type in BREAK_OUT_AFTER else "BREAK_IN"
+    return "OVERTIME_IN" if last_punch_type in OVERTIME_IN_AFTER else "OVERTIME_OUT"
+
+
+class ShiftTable:
+    """Classification of every minute of the day for one ``ShiftWindow``.
+
+    ``kinds``, ``lateness`` and ``earliness`` are 1440-entry arrays indexed
+    by minute of the day. ``results`` holds the ready-made result fields for
+    minutes that do not depend on the last punch, and the kind for the rest.
+    """
+    __slots__ = ("kinds", "lateness", "earliness", "results")
+
+    def __init__(self, shift):
+        classified = [_classify_minute(shift, minute) for minute in range(MINUTES_PER_DAY)]
+        self.kinds = np.array([kind for kind, _, _ in classified], dtype=np.uint8)
+        self.lateness = np.array([lateness for _, lateness, _ in classified], dtype=np.int16)
+        self.earliness = np.array([earliness for _, _, earliness in classified], dtype=np.int16)
+        self.results = tuple(
+            kind if kind in (BREAK, OVERTIME) else _result(kind, lateness, earliness)
+            for kind, lateness, earliness in classified
+        )
+
+    def classify(self, punch_minutes: int, last_punch_type: Optional[str]) -> Dict:
+        """The ``determine_punch_type`` result for one punch; a new dict each call."""
+        result = self.results[punch_minutes]
+        if isinstance(result, dict):
+            return dict(result)
+        return {
+            "type": resolve_type(result, last_punch_type),
+            "is_late": False,
+            "lateness_minutes": 0,
+            "is_early": False,
+            "earliness_minutes": 0
+        }
+
+
+class ShiftClassification:
+    """Column-wise results of ``classify_minutes``.
+
+    ``types`` is None where the type depends on the punch before it; pass
+    that punch's type to ``result``, in punch order, to resolve it.
+    """
+    __slots__ = ("kinds", "types", "is_late", "lateness_minutes", "is_early", "earliness_minutes")
+
+    def __init__(self, kinds: List[int], types: List[Optional[str]], is_late: np.ndarray, lateness_minutes: np.ndarray,
+                 is_early: np.ndarray, earliness_minutes: np.ndarray):
+        self.kinds = kinds
+        self.types = types
+        self.is_late = is_late
+        self.lateness_minutes = lateness_minutes
+        self.is_early = is_early
+        self.earliness_minutes = earliness_minutes
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def result(self, i: int, last_punch_type: Optional[str]) -> Dict:
+        """The ``determine_punch_type`` result for punch ``i`` after ``last_punch_type``."""
+        punch_type = self.types[i]
+        return {
+            "type": punch_type if punch_type is not None else resolve_type(self.kinds[i], last_punch_type),
+            "is_late": bool(self.is_late[i]),
+            "lateness_minutes": int(self.lateness_minutes[i]),
+            "is_early": bool(self.is_early[i]),
+            "earliness_minutes": int(self.earliness_minutes[i])
+        }
+
+
+_TYPE_NAMES = np.array(["UNKNOWN", "IN", "LATE_IN", "OUT", "OUT", None, None], dtype=object)
+
+
+def minutes_of_day(timestamps: Sequence[datetime]) -> np.ndarray:
+    """Minute of the day of each ``datetime``, as an int array."""
+    # Reading the fields beats converting datetime objects to datetime64 by ~20x.
+    return np.fromiter((t.hour * 60 + t.minute for t in timestamps), dtype=np.int64, count=len(timestamps))
+
+
+def classify_minutes(table: ShiftTable, punch_minutes: np.ndarray) -> ShiftClassification:
+    """Classify punches on one shift at ``punch_minutes`` with NumPy lookups.
+
+    Only the window-based labels are settled here. BREAK and OVERTIME
+    minutes depend on the type accepted for the punch before, so the caller
+    resolves them with ``ShiftClassification.result`` as it walks the
+    punches in order.
+    """
+    punch_minutes = np.asarray(punch_minutes, dtype=np.int64)
+    kinds = table.kinds[punch_minutes]
+    return ShiftClassification(
+        kinds.tolist(),
+        _TYPE_NAMES[kinds].tolist(),
+        kinds == LATE_IN,
+        table.lateness[punch_minutes],
+        kinds == EARLY_OUT,
+        table.earliness[punch_minutes]
+    )
@@ -0,0 +1,311 @@
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from typing import Optional, List, Tuple, Dict, Iterable
+
+from utils.employee_directory import DirectoryEntry
+from utils.storage import Storage, DEFAULT_SHIFT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Employee (
+    id INTEGER PRIMARY KEY,
+    badge_id TEXT NOT NULL UNIQUE,
+    is_active INTEGER NOT NULL,
+    shift_start_time TEXT NOT NULL,
+    shift_end_time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Punch (
+    id INTEGER PRIMARY KEY,
+    employee_id INTEGER NOT NULL,
+    punch_type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    punch_date TEXT NOT NULL,
+    is_late INTEGER NOT NULL DEFAULT 0,
+    lateness_minutes INTEGER NOT NULL DEFAULT 0,
+    is_early INTEGER NOT NULL DEFAULT 0,
+    earliness_minutes INTEGER NOT NULL DEFAULT 0
+);
+-- timestamp DESC keeps (timestamp DESC, id ASC) in index order, so the last
+-- punch of a day is the first entry of the seek with no sort step.
+CREATE INDEX IF NOT EXISTS idx_punch_employee_day ON Punch (employee_id, punch_date, timestamp DESC);
+CREATE TABLE IF NOT EXISTS OvertimeApproval (
+    employee_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    is_approved INTEGER NOT NULL,
+    PRIMARY KEY (employee_id, date)
+);
+"""
+
+EMPLOYEE_COLUMNS = "e.id, e.badge_id, e.is_active, e.shift_start_time, e.shift_end_time"
+PUNCH_COLUMNS = "p.employee_id, p.punch_type, p.timestamp, p.is_late, p.lateness_minutes, p.is_early, p.earliness_minutes"
+
+# The statements below are fixed strings so each pooled connection compiles
+# them once and reuses the prepared statement from its statement cache.
+SELECT_EMPLOYEE_BY_BADGE = f"SELECT {EMPLOYEE_COLUMNS} FROM Employee e WHERE e.badge_id = ?"
+SELECT_LAST_PUNCH_ID = (
+    "SELECT id FROM Punch WHERE employee_id = {employee} AND punch_date = {day} "
+    "ORDER BY timestamp DESC, id ASC LIMIT 1"
+)
+SELECT_LAST_PUNCH = f"SELECT {PUNCH_COLUMNS} FROM Punch p WHERE p.id = ({SELECT_LAST_PUNCH_ID.format(employee='?', day='?')})"
+SELECT_EMPLOYEE_WITH_LAST_PUNCH = (
+    f"SELECT {EMPLOYEE_COLUMNS}, {PUNCH_COLUMNS} FROM Employee e "
+    f"LEFT JOIN Punch p ON p.id = ({SELECT_LAST_PUNCH_ID.format(employee='e.id', day='?')}) "
+    "WHERE e.badge_id = ?"
+)
+SELECT_PUNCHES_FOR_DAY = (
+    f"SELECT {PUNCH_COLUMNS} FROM Punch p WHERE p.employee_id = ? AND p.punch_date = ? "
+    "ORDER BY p.timestamp ASC, p.id ASC"
+)
+DELETE_PUNCHES_FOR_DAY = "DELETE FROM Punch WHERE employee_id = ? AND punch_date = ?"
+INSERT_PUNCH = (
+    "INSERT INTO Punch (employee_id, punch_type, timestamp, punch_date, is_late, lateness_minutes, is_early, earliness_minutes) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_APPROVAL = "SELECT employee_id, date, is_approved FROM OvertimeApproval WHERE employee_id = ? AND date = ? AND is_approved = 1"
+SELECT_EMPLOYEE_IDS = "SELECT id FROM Employee ORDER BY id"
+SELECT_SHIFT = "SELECT shift_start_time, shift_end_time FROM Employee WHERE id = ?"
+UPSERT_EMPLOYEE = (
+    "INSERT OR REPLACE INTO Employee (id, badge_id, is_active, shift_start_time, shift_end_time) VALUES (?, ?, ?, ?, ?)"
+)
+UPSERT_APPROVAL = "INSERT OR REPLACE INTO OvertimeApproval (employee_id, date, is_approved) VALUES (?, ?, ?)"
+SET_APPROVED = "UPDATE OvertimeApproval SET is_approved = ? WHERE employee_id = ? AND date = ?"
+SELECT_APPROVALS_FOR_RANGE = (
+    "SELECT employee_id, date, is_approved FROM OvertimeApproval "
+    "WHERE employee_id = ? AND date BETWEEN ? AND ? AND is_approved = 1 ORDER BY date"
+)
+
+# Keeps batched statements well under SQLite's bound-parameter limit.
+BATCH_SIZE = 400
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _employee_row(row) -> dict:
+    return {
+        "id": row[0],
+        "badge_id": row[1],
+        "is_active": bool(row[2]),
+        "shift_start_time": time.fromisoformat(row[3]),
+        "shift_end_time": time.fromisoformat(row[4])
+    }
+
+def _punch_row(row) -> dict:
+    return {
+        "employee_id": row[0],
+        "punch_type": row[1],
+        "timestamp": datetime.fromisoformat(row[2]),
+        "is_late": bool(row[3]),
+        "lateness_minutes": row[4],
+        "is_early": bool(row[5]),
+        "earliness_minutes": row[6]
+    }
+
+def _approval_row(row) -> dict:
+    return {"employee_id": row[0], "date": date.fromisoformat(row[1]), "is_approved": bool(row[2])}
+
+def _punch_params(punch: dict) -> tuple:
+    timestamp = punch["timestamp"]
+    return (
+        punch["employee_id"],
+        punch["punch_type"],
+        timestamp.isoformat(),
+        timestamp.date().isoformat(),
+        int(punch.get("is_late", False)),
+        punch.get("lateness_minutes", 0),
+        int(punch.get("is_early", False)),
+        punch.get("earliness_minutes", 0)
+    )
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections to one database file."""
+
+    def __init__(self, path: str, size: int = 4, statement_cache_size: int = 128):
+        self.path = path
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect(statement_cache_size))
+
+    def _connect(self, statement_cache_size: int) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=statement_cache_size)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SqliteStorage(Storage):
+    """Storage backed by a SQLite database file in WAL mode.
+
+    Punches carry a ``punch_date`` column next to ``timestamp`` so that the
+    composite index on (employee_id, punch_date, timestamp) answers "last
+    punch of the day" with an index seek instead of evaluating
+    ``DATE(timestamp)`` on every row.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def add_employees(self, employees: Iterable[dict]) -> None:
+        rows = [
+            (emp["id"], emp["badge_id"], int(emp["is_active"]),
+             emp["shift_start_time"].isoformat(), emp["shift_end_time"].isoformat())
+            for emp in employees
+        ]
+        with self.pool.connection() as conn, conn:
+            conn.executemany(UPSERT_EMPLOYEE, rows)
+
+    def add_overtime_approvals(self, approvals: Iterable[dict]) -> None:
+        rows = [
+            (approval["employee_id"], approval["date"].isoformat(), int(approval["is_approved"]))
+            for approval in approvals
+        ]
+        with self.pool.connection() as conn, conn:
+            conn.executemany(UPSERT_APPROVAL, rows)
+
+    def get_employee_by_badge(self, badge_id: str) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_EMPLOYEE_BY_BADGE, (badge_id,)).fetchone()
+        return _employee_row(row) if row else None
+
+    def get_employees_by_badges(self, badge_ids: Iterable[str]) -> Dict[str, dict]:
+        employees = {}
+        with self.pool.connection() as conn:
+            for chunk in _chunks(list(set(badge_ids))):
+                sql = f"SELECT {EMPLOYEE_COLUMNS} FROM Employee e WHERE e.badge_id IN ({', '.join('?' * len(chunk))})"
+                for row in conn.execute(sql, chunk):
+                    employees[row[1]] = _employee_row(row)
+        return employees
+
+    def get_employees_by_ids(self, employee_ids: Iterable[int]) -> Dict[int, dict]:
+        employees = {}
+        with self.pool.connection() as conn:
+            for chunk in _chunks(list(set(employee_ids))):
+                sql = f"SELECT {EMPLOYEE_COLUMNS} FROM Employee e WHERE e.id IN ({', '.join('?' * len(chunk))})"
+                for row in conn.execute(sql, chunk):
+                    employees[row[0]] = _employee_row(row)
+        return employees
+
+    def get_employee_ids(self) -> List[int]:
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(SELECT_EMPLOYEE_IDS)]
+
+    def get_employee_with_last_punch(self, badge_id: str, punch_date: date) -> Tuple[Optional[DirectoryEntry], Optional[dict]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_EMPLOYEE_WITH_LAST_PUNCH, (punch_date.isoformat(), badge_id)).fetchone()
+        if not row:
+            return None, None
+        last_punch = _punch_row(row[5:]) if row[5] is not None else None
+        return DirectoryEntry(_employee_row(row[:5])), last_punch
+
+    def get_last_punch(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_LAST_PUNCH, (employee_id, punch_date.isoformat())).fetchone()
+        return _punch_row(row) if row else None
+
+    def get_last_punches(self, keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], dict]:
+        last_punches = {}
+        with self.pool.connection() as conn:
+            for chunk in _chunks(list(set(keys))):
+                values = ", ".join("(?, ?)" for _ in chunk)
+                sql = (
+                    f"WITH k(employee_id, punch_date) AS (VALUES {values}) "
+                    f"SELECT k.punch_date, {PUNCH_COLUMNS} FROM k "
+                    f"JOIN Punch p ON p.id = ({SELECT_LAST_PUNCH_ID.format(employee='k.employee_id', day='k.punch_date')})"
+                )
+                params = [value for employee_id, punch_date in chunk for value in (employee_id, punch_date.isoformat())]
+                for row in conn.execute(sql, params):
+                    punch = _punch_row(row[1:])
+                    last_punches[(punch["employee_id"], date.fromisoformat(row[0]))] = punch
+        return last_punches
+
+    def insert_punch(self, punch: dict) -> None:
+        with self.pool.connection() as conn, conn:
+            conn.execute(INSERT_PUNCH, _punch_params(punch))
+
+    def insert_punches(self, punches: Iterable[dict]) -> None:
+        rows = [_punch_params(punch) for punch in punches]
+        with self.pool.connection() as conn, conn:
+            conn.executemany(INSERT_PUNCH, rows)
+
+    def replace_day_punches(self, employee_id: int, punch_date: date, punches: Iterable[dict]) -> None:
+        rows = [_punch_params(punch) for punch in punches]
+        with self.pool.connection() as conn, conn:
+            conn.execute(DELETE_PUNCHES_FOR_DAY, (employee_id, punch_date.isoformat()))
+            conn.executemany(INSERT_PUNCH, rows)
+
+    def revoke_overtime_approval(self, employee_id: int, approval_date: date) -> bool:
+        with self.pool.connection() as conn, conn:
+            return conn.execute(SET_APPROVED, (0, employee_id, approval_date.isoformat())).rowcount > 0
+
+    def get_overtime_approval(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_APPROVAL, (employee_id, punch_date.isoformat())).fetchone()
+        return _approval_row(row) if row else None
+
+    def get_overtime_approvals_for_range(self, employee_id: int, start_date: date, end_date: date) -> List[dict]:
+        params = (employee_id, start_date.isoformat(), end_date.isoformat())
+        with self.pool.connection() as conn:
+            return [_approval_row(row) for row in conn.execute(SELECT_APPROVALS_FOR_RANGE, params)]
+
+    def get_overtime_approvals(self, keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], dict]:
+        approvals = {}
+        with self.pool.connection() as conn:
+            for chunk in _chunks(list(set(keys))):
+                values = ", ".join("(?, ?)" for _ in chunk)
+                sql = (
+                    f"WITH k(employee_id, date) AS (VALUES {values}) "
+                    "SELECT a.employee_id, a.date, a.is_approved FROM k "
+                    "JOIN OvertimeApproval a ON a.employee_id = k.employee_id AND a.date = k.date AND a.is_approved = 1"
+                )
+                params = [value for employee_id, punch_date in chunk for value in (employee_id, punch_date.isoformat())]
+                for row in conn.execute(sql, params):
+                    approval = _approval_row(row)
+                    approvals[(approval["employee_id"], approval["date"])] = approval
+        return approvals
+
+    def get_all_punches_for_day(self, employee_id: int, punch_date: date) -> List[dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SELECT_PUNCHES_FOR_DAY, (employee_id, punch_date.isoformat())).fetchall()
+        return [_punch_row(row) for row in rows]
+
+    def get_punches_for_range(self, employee_ids: Iterable[int], start_date: date, end_date: date) -> Iterable[dict]:
+        for chunk in _chunks(sorted(set(employee_ids))):
+            sql = (
+                f"SELECT {PUNCH_COLUMNS} FROM Punch p "
+                f"WHERE p.employee_id IN ({', '.join('?' * len(chunk))}) AND p.punch_date BETWEEN ? AND ? "
+                "ORDER BY p.employee_id, p.punch_date, p.timestamp, p.id"
+            )
+            # Read the chunk and hand the connection back before yielding, so
+            # a slow consumer never holds one of the pool's connections.
+            with self.pool.connection() as conn:
+                rows = conn.execute(sql, [*chunk, start_date.isoformat(), end_date.isoformat()]).fetchall()
+            for row in rows:
+                yield _punch_row(row)
+
+    def get_employee_shift_time(self, employee_id: int) -> dict:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_SHIFT, (employee_id,)).fetchone()
+        if not row:
+            return dict(DEFAULT_SHIFT)
+        return {"start": time.fromisoformat(row[0]), "end": time.fromisoformat(row[1])}
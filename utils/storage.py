@@ -0,0 +1,238 @@
+from typing import Optional, List, Tuple, Dict, Iterable
+from datetime import date, time, timedelta
+
+from utils.day_totals import DayTotals
+from utils.employee_directory import DirectoryEntry, EmployeeDirectory
+from utils.overtime_approvals import OvertimeApprovalIndex
+
+DEFAULT_SHIFT = {"start": time(9, 0), "end": time(17, 0)}
+
+# Seconds before MemoryStorage reloads its employee indexes on its own.
+EMPLOYEE_CACHE_TTL = 60.0
+
+
+def date_range(start_date: date, end_date: date) -> Iterable[date]:
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+class Storage:
+    """Backend interface behind the functions in ``utils.helper``.
+
+    Employees, punches and approvals are exchanged as plain dicts with the
+    same keys as the models in ``models/schema.py``; punches may also be
+    ``PunchRecord`` or ``PunchRow`` objects, which read the same way by
+    key. The batch methods have
+    generic fallbacks; backends override them when they can do better than
+    one lookup per key.
+    """
+
+    def get_employee_by_badge(self, badge_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def get_employees_by_badges(self, badge_ids: Iterable[str]) -> Dict[str, dict]:
+        employees = {}
+        for badge_id in set(badge_ids):
+            employee = self.get_employee_by_badge(badge_id)
+            if employee:
+                employees[badge_id] = employee
+        return employees
+
+    def get_employees_by_ids(self, employee_ids: Iterable[int]) -> Dict[int, dict]:
+        raise NotImplementedError
+
+    def get_employee_ids(self) -> List[int]:
+        """Every employee id, ascending."""
+        raise NotImplementedError
+
+    def get_employee_with_last_punch(self, badge_id: str, punch_date: date) -> Tuple[Optional[DirectoryEntry], Optional[dict]]:
+        """The employee's ``DirectoryEntry``, with its shift, and the day's last punch."""
+        employee = self.get_employee_by_badge(badge_id)
+        if not employee:
+            return None, None
+        return DirectoryEntry(employee), self.get_last_punch(employee["id"], punch_date)
+
+    def get_last_punch(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        raise NotImplementedError
+
+    def get_last_punches(self, keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], dict]:
+        last_punches = {}
+        for employee_id, punch_date in keys:
+            last_punch = self.get_last_punch(employee_id, punch_date)
+            if last_punch:
+                last_punches[(employee_id, punch_date)] = last_punch
+        return last_punches
+
+    def insert_punch(self, punch: dict) -> None:
+        raise NotImplementedError
+
+    def insert_punches(self, punches: Iterable[dict]) -> None:
+        for punch in punches:
+            self.insert_punch(punch)
+
+    def get_overtime_approval(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        raise NotImplementedError
+
+    def get_overtime_approvals(self, keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], dict]:
+        approvals = {}
+        for employee_id, punch_date in set(keys):
+            approval = self.get_overtime_approval(employee_id, punch_date)
+            if approval:
+                approvals[(employee_id, punch_date)] = approval
+        return approvals
+
+    def get_overtime_approvals_for_range(self, employee_id: int, start_date: date, end_date: date) -> List[dict]:
+        """Approved overtime for ``employee_id`` from ``start_date`` to ``end_date`` inclusive, by date."""
+        approvals = []
+        for approval_date in date_range(start_date, end_date):
+            approval = self.get_overtime_approval(employee_id, approval_date)
+            if approval:
+                approvals.append(approval)
+        return approvals
+
+    def add_overtime_approvals(self, approvals: Iterable[dict]) -> None:
+        """Insert approvals, replacing any existing one for the same employee and date."""
+        raise NotImplementedError
+
+    def revoke_overtime_approval(self, employee_id: int, approval_date: date) -> bool:
+        """Mark an existing approval as not approved; False if there is none."""
+        raise NotImplementedError
+
+    def get_all_punches_for_day(self, employee_id: int, punch_date: date) -> List[dict]:
+        raise NotImplementedError
+
+    def replace_day_punches(self, employee_id: int, punch_date: date, punches: Iterable[dict]) -> None:
+        """Make ``punches`` the employee's only punches on ``punch_date``."""
+        raise NotImplementedError
+
+    def get_day_totals(self, employee_id: int, punch_date: date) -> Optional[DayTotals]:
+        """Running work-hour totals for the day, or None if the backend keeps none."""
+        return None
+
+    def compact_punches(self, current: date) -> List[date]:
+        """Move punches of closed days out of memory, if the backend tiers
+        them; returns the days moved."""
+        return []
+
+    def get_punches_for_range(self, employee_ids: Iterable[int], start_date: date, end_date: date) -> Iterable[dict]:
+        """Punches for ``employee_ids`` from ``start_date`` to ``end_date`` inclusive,
+        ordered by employee_id, then date, then timestamp."""
+        for employee_id in sorted(set(employee_ids)):
+            for punch_date in date_range(start_date, end_date):
+                yield from self.get_all_punches_for_day(employee_id, punch_date)
+
+    def get_employee_shift_time(self, employee_id: int) -> dict:
+        raise NotImplementedError
+
+    def invalidate_employees(self) -> None:
+        """Forget any cached employee data, e.g. after a badge or shift change."""
+
+
+class MemoryStorage(Storage):
+    """Storage over in-process lists; the punch list must be a ``PunchIndex``
+    (or a store with its interface, such as ``ColumnarPunchStore`` or
+    ``PartitionedPunchStore``) and the approval list an ``OvertimeApprovalIndex``.
+
+    Employees are looked up through an ``EmployeeDirectory`` over the list,
+    so badge and id lookups are hash hits however many employees there are.
+    """
+
+    def __init__(self, employees: list, punches, overtime_approvals: OvertimeApprovalIndex, employee_ttl: Optional[float] = EMPLOYEE_CACHE_TTL):
+        self.employees = employees
+        self.punches = punches
+        self.overtime_approvals = overtime_approvals
+        self.directory = EmployeeDirectory(lambda: self.employees, ttl=employee_ttl)
+
+    def get_employee_by_badge(self, badge_id: str) -> Optional[dict]:
+        entry = self.directory.by_badge(badge_id)
+        return entry.employee if entry else None
+
+    def get_employees_by_badges(self, badge_ids: Iterable[str]) -> Dict[str, dict]:
+        employees = {}
+        for badge_id in set(badge_ids):
+            entry = self.directory.by_badge(badge_id)
+            if entry:
+                employees[badge_id] = entry.employee
+        return employees
+
+    def get_employees_by_ids(self, employee_ids: Iterable[int]) -> Dict[int, dict]:
+        employees = {}
+        for employee_id in set(employee_ids):
+            entry = self.directory.by_id(employee_id)
+            if entry:
+                employees[employee_id] = entry.employee
+        return employees
+
+    def get_employee_ids(self) -> List[int]:
+        return sorted({emp["id"] for emp in self.employees})
+
+    def get_employee_with_last_punch(self, badge_id: str, punch_date: date) -> Tuple[Optional[DirectoryEntry], Optional[dict]]:
+        entry = self.directory.by_badge(badge_id)
+        if entry is None:
+            return None, None
+        return entry, self.get_last_punch(entry.employee["id"], punch_date)
+
+    def get_last_punch(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        return self.punches.last(employee_id, punch_date)
+
+    def insert_punch(self, punch: dict) -> None:
+        self.punches.append(punch)
+
+    def insert_punches(self, punches: Iterable[dict]) -> None:
+        self.punches.extend(punches)
+
+    def get_overtime_approval(self, employee_id: int, punch_date: date) -> Optional[dict]:
+        return self.overtime_approvals.approval(employee_id, punch_date)
+
+    def get_overtime_approvals(self, keys: Iterable[Tuple[int, date]]) -> Dict[Tuple[int, date], dict]:
+        approvals = {}
+        for employee_id, punch_date in set(keys):
+            approval = self.overtime_approvals.approval(employee_id, punch_date)
+            if approval:
+                approvals[(employee_id, punch_date)] = approval
+        return approvals
+
+    def get_overtime_approvals_for_range(self, employee_id: int, start_date: date, end_date: date) -> List[dict]:
+        return self.overtime_approvals.approved_between(employee_id, start_date, end_date)
+
+    def add_overtime_approvals(self, approvals: Iterable[dict]) -> None:
+        self.overtime_approvals.extend(approvals)
+
+    def revoke_overtime_approval(self, employee_id: int, approval_date: date) -> bool:
+        return self.overtime_approvals.set_approved(employee_id, approval_date, False)
+
+    def get_all_punches_for_day(self, employee_id: int, punch_date: date) -> List[dict]:
+        return self.punches.day(employee_id, punch_date)
+
+    def replace_day_punches(self, employee_id: int, punch_date: date, punches: Iterable[dict]) -> None:
+        replace_day = getattr(self.punches, "replace_day", None)
+        if replace_day is None:
+            raise NotImplementedError(f"{type(self.punches).__name__} does not support replacing a day's punches")
+        replace_day(employee_id, punch_date, list(punches))
+
+    def get_day_totals(self, employee_id: int, punch_date: date) -> Optional[DayTotals]:
+        totals = self.punches.totals(employee_id, punch_date)
+        return totals if totals.complete else None
+
+    def compact_punches(self, current: date) -> List[date]:
+        compact = getattr(self.punches, "compact", None)
+        return compact(current) if compact is not None else []
+
+    def get_punches_for_range(self, employee_ids: Iterable[int], start_date: date, end_date: date) -> Iterable[dict]:
+        punches_for_range = getattr(self.punches, "punches_for_range", None)
+        if punches_for_range is not None:
+            yield from punches_for_range(employee_ids, start_date, end_date)
+            return
+        days = list(date_range(start_date, end_date))
+        for employee_id in sorted(set(employee_ids)):
+            for punch_date in days:
+                yield from self.punches.bucket(employee_id, punch_date)
+
+    def get_employee_shift_time(self, employee_id: int) -> dict:
+        entry = self.directory.by_id(employee_id)
+        if not entry:
+            return dict(DEFAULT_SHIFT)
+        return {"start": entry.shift.start_time, "end": entry.shift.end_time}
+
+    def invalidate_employees(self) -> None:
+        self.directory.invalidate()
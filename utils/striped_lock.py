@@ -0,0 +1,50 @@
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterable
+
+
+class StripedLock:
+    """A fixed pool of re-entrant locks shared out by key.
+
+    ``lock(key)`` is the lock of the stripe ``key`` hashes to, so work on
+    different keys mostly runs in parallel while work on one key is
+    serialized, and memory stays at ``stripes`` locks however many keys
+    there are. Keys are badge ids here, whose string hashes spread evenly.
+    A single stripe is one global lock.
+
+    Locks are re-entrant, so a caller holding a key's stripe can call code
+    that takes it again. ``hold`` takes the stripes of several keys at once,
+    always in stripe order, so two callers holding overlapping key sets
+    cannot deadlock.
+    """
+
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    def lock(self, key: Hashable) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def hold(self, keys: Iterable[Hashable]):
+        """Hold the stripes of every key in ``keys`` for the ``with`` block."""
+        locks = [self._locks[stripe] for stripe in sorted({self.stripe(key) for key in keys})]
+        for taken, lock in enumerate(locks):
+            try:
+                lock.acquire()
+            except BaseException:
+                for held in reversed(locks[:taken]):
+                    held.release()
+                raise
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
@@ -0,0 +1,138 @@
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Tuple
+
+import numpy as np
+
+from utils.punch_types import IN_TYPES, OUT_TYPES, punch_type_code
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+ONE_MICROSECOND = timedelta(microseconds=1)
+MICROS_PER_SECOND = 1_000_000
+MICROS_PER_DAY = 86_400 * MICROS_PER_SECOND
+
+IN_CODES = [punch_type_code(t) for t in IN_TYPES]
+OUT_CODES = [punch_type_code(t) for t in OUT_TYPES]
+BREAK_IN_CODE = punch_type_code("BREAK_IN")
+BREAK_OUT_CODE = punch_type_code("BREAK_OUT")
+OVERTIME_IN_CODE = punch_type_code("OVERTIME_IN")
+DEFAULTER_CODE = punch_type_code("DEFAULTER")
+
+
+def to_micros(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // ONE_MICROSECOND
+
+def time_to_micros(value: time) -> int:
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * MICROS_PER_SECOND + value.microsecond
+
+
+class PunchColumns:
+    """Punches as parallel arrays, ordered by employee, day and timestamp.
+
+    ``day`` holds proleptic ordinals (``date.toordinal()``), ``timestamp``
+    holds naive microseconds since 1970-01-01 and ``code`` holds the codes
+    from ``utils.punch_types``.
+    """
+    __slots__ = ("employee_id", "day", "timestamp", "code")
+
+    def __init__(self, employee_id: np.ndarray, day: np.ndarray, timestamp: np.ndarray, code: np.ndarray):
+        self.employee_id = employee_id
+        self.day = day
+        self.timestamp = timestamp
+        self.code = code
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def from_punches(cls, punches: Iterable[dict]) -> "PunchColumns":
+        rows = [
+            (p["employee_id"], p["timestamp"].toordinal(), to_micros(p["timestamp"]), punch_type_code(p["punch_type"]))
+            for p in punches
+        ]
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty, empty, empty, np.empty(0, dtype=np.uint8))
+        employee_id, day, timestamp, code = zip(*rows)
+        return cls(
+            np.array(employee_id, dtype=np.int64),
+            np.array(day, dtype=np.int64),
+            np.array(timestamp, dtype=np.int64),
+            np.array(code, dtype=np.uint8)
+        )
+
+
+def summarize_columns(columns: PunchColumns, shift_end: Callable[[int], time]):
+    """Work, break and overtime hours for every (employee, day) run in ``columns``.
+
+    Follows ``main.calculate_work_hours`` step for step: a closing punch
+    (an OUT type, or DEFAULTER) is paired with the latest IN type since the
+    previous closing punch of the same day, and a break is a BREAK_OUT
+    directly followed by a BREAK_IN. Durations are summed in punch order so
+    the totals are bit-for-bit the ones the per-day loop produces.
+
+    Returns ``(employee_id, day, work, break, overtime)`` arrays with one
+    entry per group, unrounded.
+    """
+    n = len(columns)
+    emp, day, ts, code = columns.employee_id, columns.day, columns.timestamp, columns.code
+    if n == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return emp, day, empty, empty, empty
+
+    idx = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (emp[1:] != emp[:-1]) | (day[1:] != day[:-1])
+    group_id = np.cumsum(new_group) - 1
+    starts = idx[new_group]
+    group_start = starts[group_id]
+    groups = len(starts)
+
+    is_in = np.isin(code, IN_CODES)
+    is_out = np.isin(code, OUT_CODES)
+    is_defaulter = code == DEFAULTER_CODE
+    is_closer = is_out | is_defaulter
+
+    last_in = np.maximum.accumulate(np.where(is_in, idx, -1))
+    prev_closer = np.empty(n, dtype=idx.dtype)
+    prev_closer[0] = -1
+    prev_closer[1:] = np.maximum.accumulate(np.where(is_closer, idx, -1))[:-1]
+    closes = is_closer & (last_in >= group_start) & (last_in > prev_closer)
+
+    close_at = idx[closes]
+    opened_at = last_in[closes]
+    end_ts = ts[close_at].copy()
+    defaulted = is_defaulter[close_at]
+    if defaulted.any():
+        employees = np.unique(emp[close_at][defaulted])
+        offsets = np.array([time_to_micros(shift_end(int(e))) for e in employees], dtype=np.int64)
+        defaulter_emp = emp[close_at][defaulted]
+        defaulter_day = day[close_at][defaulted]
+        end_ts[defaulted] = (
+            (defaulter_day - EPOCH_ORDINAL) * MICROS_PER_DAY + offsets[np.searchsorted(employees, defaulter_emp)]
+        )
+    duration = (end_ts - ts[opened_at]) / MICROS_PER_SECOND / 3600.0
+    overtime = is_out[close_at] & (code[opened_at] == OVERTIME_IN_CODE)
+    close_group = group_id[close_at]
+    work_hours = np.bincount(close_group[~overtime], weights=duration[~overtime], minlength=groups)
+    overtime_hours = np.bincount(close_group[overtime], weights=duration[overtime], minlength=groups)
+
+    is_break = (code[:-1] == BREAK_OUT_CODE) & (code[1:] == BREAK_IN_CODE) & (group_id[:-1] == group_id[1:])
+    break_at = idx[:-1][is_break]
+    break_duration = (ts[break_at + 1] - ts[break_at]) / MICROS_PER_SECOND / 3600.0
+    break_hours = np.bincount(group_id[break_at], weights=break_duration, minlength=groups)
+
+    return emp[starts], day[starts], work_hours, break_hours, overtime_hours
+
+
+def work_hours_by_day(columns: PunchColumns, shift_end: Callable[[int], time]) -> Dict[Tuple[int, date], Dict]:
+    """Rounded ``calculate_work_hours`` summaries keyed by (employee_id, date)."""
+    emp, day, work, breaks, overtime = summarize_columns(columns, shift_end)
+    return {
+        (e, date.fromordinal(d)): {
+            "work_hours": round(w, 2),
+            "break_hours": round(b, 2),
+            "overtime_hours": round(o, 2)
+        }
+        for e, d, w, b, o in zip(emp.tolist(), day.tolist(), work.tolist(), breaks.tolist(), overtime.tolist())
+    }